@@ -2,28 +2,18 @@
 import os
 import argparse
 import logging
+import multiprocessing
 import sys
 
 # 确定程序启动目录。
 from app_config import (
     SYSTEM, MACHINE, checkCUDAInfomation,
-    setIsDEBUG
+    setIsDEBUG, setMemoryBudgetMB, setMemorySpillDir
 )
 
 # 在所有其他导入之前，首先设置日志系统
 from core.app_logging import setup_logging, log_system_info
 
-
-
-
-
-
-# 优先导入main_ui，它会间接加载PyTorch等库，以解决Windows上可能的底层DLL冲突。
-from main_ui import MainUI
-
-from PyQt5.QtCore import QLocale, QTimer
-from PyQt5.QtWidgets import QApplication, QMessageBox
-
 logger = logging.getLogger(__name__)
 
 # 解决Windows上可能的OpenMP库冲突导致的静默崩溃问题。
@@ -33,7 +23,25 @@ if sys.platform == "win32":
     # 禁用tokenizers库的并行处理，以避免底层库冲突导致的静默崩溃。
     os.environ['TOKENIZERS_PARALLELISM'] = 'false'
 
+# 界面相关的模块只在 __main__ 中按需导入：批处理的工作进程（spawn 方式）会以 __mp_main__ 的身份
+# 重新导入本文件，模块顶层不能加载 PyQt5 和 PyTorch。
+
 if __name__ == "__main__":
+    # 打包后的程序中，多进程批处理的工作进程也由本程序启动，必须最先交给 multiprocessing 处理
+    multiprocessing.freeze_support()
+
+    # 命令行批处理: "app.py batch --project <工程> --out <输出文件夹> ..."，不导入和启动界面
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # 不调用 setup_logging：它把日志写到 stdout，会混入 --progress jsonl 的输出
+        from core.batch_runner import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+
+    # 优先导入main_ui，它会间接加载PyTorch等库，以解决Windows上可能的底层DLL冲突。
+    from main_ui import MainUI
+
+    from PyQt5.QtCore import QLocale, QTimer
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+
     # 将日志初始化作为程序的第一步
     setup_logging()
     checkCUDAInfomation()
@@ -48,9 +56,17 @@ if __name__ == "__main__":
         parser = argparse.ArgumentParser(description="图片处理与OCR工具")
         parser.add_argument("--project", help="启动时自动打开的工程路径")
         parser.add_argument("--debug", action="store_true", help="启用调试模式，输出中间图像和日志")
+        parser.add_argument("--memory-budget", type=int, metavar="MB", help="图像数据可使用的内存上限 (MB)，0 表示不限制")
+        parser.add_argument("--spill-dir", metavar="DIR", help="超出内存上限时转存图像数据的目录，默认为系统临时目录")
         # Qt会处理它自己的参数，我们只解析我们自己的
         args, unknown = parser.parse_known_args(app.arguments()[1:])
         setIsDEBUG(args.debug)
+        if args.memory_budget is not None:
+            if args.memory_budget < 0:
+                parser.error("--memory-budget 不能为负数")
+            setMemoryBudgetMB(args.memory_budget)
+        if args.spill_dir:
+            setMemorySpillDir(args.spill_dir)
         window = MainUI(is_debug=args.debug)
         window.showMaximized()
 
@@ -39,6 +39,29 @@ def getCUDADeviceCount():
 def getCUDADevice():
     return _CUDA_DEVICE
 
+# --- 内存预算 ---
+# 图像数据（当前图片、预取缓存、显示缓冲、缩略图）合计可使用的内存上限 (MB)。
+# 按部署环境配置：环境变量 OCR_READER_MEMORY_BUDGET_MB，或启动参数 --memory-budget（优先）。0 表示不限制。
+_MEMORY_BUDGET_MB = 1024
+try:
+    _MEMORY_BUDGET_MB = int(os.environ.get("OCR_READER_MEMORY_BUDGET_MB", _MEMORY_BUDGET_MB))
+except ValueError:
+    pass
+def setMemoryBudgetMB(val):
+    global _MEMORY_BUDGET_MB
+    _MEMORY_BUDGET_MB = val
+def getMemoryBudgetMB():
+    return _MEMORY_BUDGET_MB
+
+# 超出预算时当前图片转存 (memmap) 的目录。默认是系统临时目录，它可能是内存文件系统 (tmpfs)，
+# 这时转存并不能减少内存占用，应配置到磁盘上：环境变量 OCR_READER_SPILL_DIR，或启动参数 --spill-dir（优先）。
+_MEMORY_SPILL_DIR = os.environ.get("OCR_READER_SPILL_DIR") or None
+def setMemorySpillDir(val):
+    global _MEMORY_SPILL_DIR
+    _MEMORY_SPILL_DIR = val
+def getMemorySpillDir():
+    return _MEMORY_SPILL_DIR
+
 def getAppRoot():
     # 确定应用程序根目录，此方法对开发模式和PyInstaller打包后的程序均有效。
     if getattr(sys, 'frozen', False):
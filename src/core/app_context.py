@@ -1,5 +1,6 @@
 # src/core/app_context.py
 import dataclasses
+import threading
 from typing import Union
 
 from PyQt5.QtCore import QObject, pyqtSignal
@@ -7,6 +8,12 @@ from PyQt5.QtCore import QObject, pyqtSignal
 from .parameters import ProcessingParameters
 from .param_utils import serialize_rect_list
 from .image_identifier import ImageIdentifier
+from .packed_binary import pack_if_binary, as_array
+from .prefetcher import NeighbourPrefetcher
+from .memory_budget import image_nbytes, PRIORITY_PREFETCH, PRIORITY_CURRENT_IMAGE
+
+# 切换图片时先以降低的分辨率解码一张代理图立即显示，长边不小于该值（约为适应窗口显示时的大小）
+PROXY_IMAGE_SIZE = 1600
 
 
 class AppContext(QObject):
@@ -17,6 +24,8 @@ class AppContext(QObject):
     # --- Signals ---
     # 当需要加载新图像并更新UI时发出
     signal_appcontext_image_loaded = pyqtSignal()
+    # 完整图像仍在后台解码、代理图 (proxy_image) 可以先显示时发出
+    signal_appcontext_proxy_ready = pyqtSignal()
     # 当图像处理完成，需要刷新显示时发出
     signal_appcontext_image_updated = pyqtSignal()
     # 在上下文（当前图片或阶段）即将改变时发出
@@ -25,12 +34,15 @@ class AppContext(QObject):
     signal_appcontext_stage_changed = pyqtSignal(int)
     # 当参数需要被应用到UI时发出
     signal_appcontext_params_applied_to_ui = pyqtSignal(ProcessingParameters)
+    # 后台线程解码完整图像完成 (identifier, image)，排队交回GUI线程处理
+    _signal_appcontext_full_image_loaded = pyqtSignal(object, object)
 
-    def __init__(self, project_manager, image_pipeline, is_debug=False, parent=None):
+    def __init__(self, project_manager, image_pipeline, is_debug=False, memory_budget=None, parent=None):
         super().__init__(parent)
         self.project_manager = project_manager
         self.image_pipeline = image_pipeline
         self.is_debug_mode = is_debug
+        self.memory_budget = memory_budget
 
         # --- State Variables ---
         self.current_image_identifier: Union[ImageIdentifier, None] = None
@@ -38,8 +50,103 @@ class AppContext(QObject):
         self.params: ProcessingParameters = ProcessingParameters()
         self.original_image = None
         self.preview_image = None
-        self.main_result_image = None
+        self.preview_overlays = None   # 预览图上的矢量叠加层（噪点轮廓），见 core/overlay.py
+        self._main_result_image = None
         self.current_stage_index = 0
+        # 最近一次流水线的完整结果，离开当前图片时交给预取缓存
+        self._last_result = None
+        # 完整图像解码完成之前显示的缩小版本，及其相对原图的比例
+        self.proxy_image = None
+        self.proxy_scale = 1.0
+        # 完整图像的后台解码：只有一个线程，只保留最新的请求。
+        # 快速翻页时，尚未开始的旧请求直接被新请求取代，不会为每次切换都解码一张大图。
+        self._load_target = None
+        self._load_closed = False
+        self._load_cond = threading.Condition()
+        self._signal_appcontext_full_image_loaded.connect(self._on_full_image_loaded)
+        self._load_thread = threading.Thread(target=self._run_loader, name="FullImageLoader", daemon=True)
+        self._load_thread.start()
+        # 当前图片的文件在显示之后被修改，离开时不再放入预取缓存
+        self._current_image_stale = False
+        # 上一次内存检查时见到的预览图 (id)，只转存至少经过一次检查仍未改变的预览图
+        self._seen_preview_id = None
+
+        # 相邻图片的后台预取；切换工程时清空，文件被修改或删除时丢弃对应的条目
+        self.prefetcher = NeighbourPrefetcher(project_manager, image_pipeline)
+        self.project_manager.signal_projectmanager_project_activated.connect(lambda *_: self.prefetcher.invalidate())
+        self.project_manager.signal_projectmanager_files_modified.connect(self._on_files_modified)
+
+        # 登记到内存预算：预取缓存最先淘汰，当前图片最后才转存到磁盘
+        if memory_budget is not None:
+            memory_budget.register("prefetch", lambda: self.prefetcher.nbytes, self.prefetcher.release,
+                                   PRIORITY_PREFETCH)
+            memory_budget.register("current_image", self._memory_usage, self._release_memory,
+                                   PRIORITY_CURRENT_IMAGE)
+
+    @property
+    def main_result_image(self):
+        # 主结果可能以按位压缩的形式保存，读取时（OCR、保存、对比）再解包
+        return as_array(self._main_result_image)
+
+    @main_result_image.setter
+    def main_result_image(self, image):
+        # 与预览图相同时直接共享引用；否则二值结果只在显示之外的场合使用，按位压缩保存以节省内存
+        if image is None or image is self.preview_image:
+            self._main_result_image = image
+        else:
+            self._main_result_image = pack_if_binary(image)
+
+    def _on_files_modified(self, identifiers):
+        for identifier in identifiers:
+            self.prefetcher.invalidate(identifier)
+        if self.current_image_identifier in identifiers:
+            self._current_image_stale = True
+
+    def close(self):
+        # 退出前停止预取，等待后台解码线程结束
+        self.prefetcher.close()
+        with self._load_cond:
+            self._load_closed = True
+            self._load_cond.notify_all()
+        self._load_thread.join()
+
+    def _memory_usage(self):
+        total = image_nbytes(self.original_image) + image_nbytes(self.proxy_image)
+        if self.preview_image is not self.original_image:
+            total += image_nbytes(self.preview_image)
+        if self._main_result_image is not self.preview_image:
+            total += image_nbytes(self._main_result_image)
+        return total
+
+    def _release_memory(self, nbytes):
+        # 当前图片的数据仍要使用，不能丢弃：把原图和预览图转存为磁盘映射，由操作系统按需换入。
+        # 写盘在后台线程中进行，完成后再替换引用（见 _replace_spilled）。
+        # 调整参数时每次都会生成新的预览图，刚生成的预览图先不转存，避免反复写盘。
+        freed = 0
+        preview_is_new = id(self.preview_image) != self._seen_preview_id
+        self._seen_preview_id = id(self.preview_image)
+        images = [self.original_image]
+        if self.preview_image is not self.original_image and not preview_is_new:
+            images.append(self.preview_image)
+        for image in images:
+            if freed >= nbytes:
+                break
+            size = image_nbytes(image)
+            if size and self.memory_budget.spill_async(image, self._replace_spilled):
+                freed += size
+        return freed
+
+    def _replace_spilled(self, image, spilled):
+        # 转存完成（在GUI线程中调用）：只替换仍然引用同一个数组的位置，期间已被新结果取代的不受影响。
+        # 同一个数组在多处被引用（例如预览图即主结果）时全部替换。
+        def replace(item):
+            return spilled if item is image else item
+
+        self.original_image = replace(self.original_image)
+        self.preview_image = replace(self.preview_image)
+        self._main_result_image = replace(self._main_result_image)
+        if self._last_result is not None:
+            self._last_result = tuple(replace(item) for item in self._last_result)
 
     def set_current_image(self, index):
         # 加载指定索引的图像及其状态。
@@ -48,6 +155,15 @@ class AppContext(QObject):
 
         self.signal_appcontext_context_will_change.emit()
 
+        # 切换图片前，把上一张图片尚在合并窗口中的参数写入
+        self.project_manager.flush_parameters()
+
+        # 离开的图片放入预取缓存，返回时无需重新解码
+        if (self.current_image_identifier is not None and self.original_image is not None
+                and not self._current_image_stale):
+            self.prefetcher.remember(self.current_image_identifier, self.original_image, self.params, self._last_result)
+        self._current_image_stale = False
+
         self.current_image_index = index
         self.current_image_identifier = self.project_manager.file_list[index]
 
@@ -55,17 +171,92 @@ class AppContext(QObject):
         self.params = ProcessingParameters.from_dict(loaded_params_dict)
         self.current_stage_index = self.params.current_stage
 
-        self.original_image = self.image_pipeline.opencv_ops.load_raw_image(self.current_image_identifier)
+        # 优先使用后台预取的原图和处理结果；参数已变化时只复用原图
+        prefetched = self.prefetcher.get(self.current_image_identifier)
+        # 上一张图片尚未开始的完整解码已无用
+        self._request_full_image(None)
+        self._last_result = None
+        self.proxy_image = None
+        if prefetched is not None:
+            self.original_image = prefetched.original_image
+            self._finish_loading(prefetched.result_for(self.params))
+            return
+
+        # 没有预取结果时，先以降低的分辨率解码一张代理图立即显示，完整图像在后台线程中解码。
+        # 只用于阶段1：之后各阶段显示的是处理结果，与原图的代理图差别太大。
+        proxy, proxy_scale = None, 1.0
+        if self.current_stage_index == 0:
+            proxy, proxy_scale = self.image_pipeline.opencv_ops.load_reduced_image(
+                self.current_image_identifier, PROXY_IMAGE_SIZE)
+        if proxy is None:
+            self.original_image = self.image_pipeline.opencv_ops.load_raw_image(self.current_image_identifier)
+            self._finish_loading()
+            return
+
+        self.original_image = None
+        self.preview_image = None
+        self.preview_overlays = None
+        self.main_result_image = None
+        self.proxy_image, self.proxy_scale = proxy, proxy_scale
+        self.signal_appcontext_params_applied_to_ui.emit(self.params)
+        self.signal_appcontext_stage_changed.emit(self.current_stage_index)
+        self.signal_appcontext_proxy_ready.emit()
+
+        self._request_full_image(self.current_image_identifier)
+
+    def _request_full_image(self, identifier):
+        # 替换待解码的图片；None 表示放弃尚未开始的请求
+        with self._load_cond:
+            self._load_target = identifier
+            self._load_cond.notify_all()
+
+    def _run_loader(self):
+        while True:
+            with self._load_cond:
+                while self._load_target is None and not self._load_closed:
+                    self._load_cond.wait()
+                if self._load_closed:
+                    return
+                identifier = self._load_target
+                self._load_target = None
+
+            try:
+                image = self.image_pipeline.opencv_ops.load_raw_image(identifier)
+            except Exception as e:
+                print(f"加载图像失败 {identifier}: {e}")
+                image = None
+            self._signal_appcontext_full_image_loaded.emit(identifier, image)
+
+    def _on_full_image_loaded(self, identifier, image):
+        # 后台解码完成（在GUI线程中调用）；期间已切换到其他图片时丢弃结果
+        if identifier != self.current_image_identifier or self.original_image is not None:
+            return
+        self.original_image = image
+        self.proxy_image = None
+        self._finish_loading()
+
+    def _finish_loading(self, prefetched_result=None):
         if self.original_image is None:
             # Handle error case
             self.preview_image = None
+            self.preview_overlays = None
             self.main_result_image = None
 
         self.signal_appcontext_params_applied_to_ui.emit(self.params)
         self.signal_appcontext_stage_changed.emit(self.current_stage_index)
         self.signal_appcontext_image_loaded.emit()
         # 关键修复：加载完新图片后，必须立即执行一次流水线处理
-        self._execute_pipeline()
+        self._execute_pipeline(prefetched_result)
+
+        # 当前图片显示之后，开始在后台预取前后相邻的图片
+        self.prefetcher.prefetch(self.prefetcher.neighbours(self.project_manager.file_list, self.current_image_index))
+
+    def sync_current_image_index(self):
+        # 文件列表增量更新后，按标识重新定位当前图片的索引；当前图片已被删除时为 -1
+        try:
+            self.current_image_index = self.project_manager.file_list.index(self.current_image_identifier)
+        except ValueError:
+            self.current_image_index = -1
 
     def update_parameters(self, params_to_update: dict):
         # Updates image parameters, saves them, and then triggers the processing pipeline.
@@ -83,7 +274,7 @@ class AppContext(QObject):
                 except (ValueError, TypeError):
                     print(f"Warning: Could not convert UI value '{value}' for key '{key}' to {expected_type}.")
 
-        # 每次更新都完整保存所有参数，确保原子性和一致性
+        # 每次更新都提交完整的参数快照，短时间内的多次保存会被合并为一次写入
         if self.current_image_identifier:
             self.project_manager.save_parameters(self.current_image_identifier, self.params)
 
@@ -111,12 +302,17 @@ class AppContext(QObject):
         self.signal_appcontext_stage_changed.emit(self.current_stage_index)
         self._execute_pipeline()
 
-    def _execute_pipeline(self):
+    def _execute_pipeline(self, prefetched_result=None):
         # The core logic for processing the image based on the current state.
         # This should be the single entry point for any image refresh.
+        # prefetched_result: 预取线程按相同参数得到的结果，提供时跳过处理。
         if self.original_image is None:
             return
 
+        if prefetched_result is not None:
+            self._apply_pipeline_result(prefetched_result)
+            return
+
         # 确定当前阶段应该使用哪个图像作为输入
         if self.current_stage_index == 0:
             input_image = self.original_image
@@ -134,10 +330,17 @@ class AppContext(QObject):
                 "identifier": self.current_image_identifier
             }
 
-        preview, main_result, crop_rect, relative_areas, rel_std_char, _ = self.image_pipeline.process(
+        result = self.image_pipeline.process(
             input_image, self.current_stage_index, self.params, debug_info=debug_info
         )
+        self._apply_pipeline_result(result)
+
+    def _apply_pipeline_result(self, result):
+        # 更新状态、回写派生参数、保存阶段结果并通知UI
+        self._last_result = result
+        preview, main_result, crop_rect, relative_areas, rel_std_char, overlays = result
         self.preview_image = preview
+        self.preview_overlays = overlays
         self.main_result_image = main_result
 
         params_changed = False
@@ -158,7 +361,7 @@ class AppContext(QObject):
                 params_changed = True
 
         # After processing, immediately save the results for this stage.
-        if self.main_result_image is not None:
+        if self._main_result_image is not None:
             self._save_stage_results()
 
         if params_changed and self.current_image_identifier:
@@ -169,16 +372,9 @@ class AppContext(QObject):
 
     def _save_stage_results(self):
         # Saves the result images for the current stage.
-        main_to_save = self.main_result_image
-        preview_to_save = self.preview_image
-
-        # For stages where preview and main are the same, we don't need to save a separate preview file.
-        if main_to_save is preview_to_save:
-            preview_to_save = None
-
+        # 预览只用于界面显示（噪点轮廓是矢量叠加层），不再写出预览文件。
         self.project_manager.save_stage_result(
             self.current_image_identifier,
             self.current_stage_index,
-            main_to_save,
-            preview_to_save
+            self._main_result_image
         )
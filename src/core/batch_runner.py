@@ -0,0 +1,335 @@
+# src/core/batch_runner.py
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from .parameters import ProcessingParameters
+
+# 批量处理时并行解码和预处理的线程数
+BATCH_DECODE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# 并行方式：
+# - thread: 线程池只并行解码和预处理，OCR、翻译和导出在调用线程中按顺序执行（GUI 使用此方式）；
+# - process: 每个进程独立完成整张图片（包括 OCR 和导出），各进程持有自己的流水线、服务和文件句柄。
+BACKEND_THREAD = "thread"
+BACKEND_PROCESS = "process"
+BATCH_BACKENDS = (BACKEND_THREAD, BACKEND_PROCESS)
+
+# 单张图片的处理结果
+STATUS_EXPORTED = "exported"
+STATUS_SKIPPED = "skipped"    # 无法读取或处理
+STATUS_FAILED = "failed"      # 导出失败
+STATUS_ERROR = "error"        # 处理过程中出现异常
+
+# 命令行的退出状态（2 为 argparse 的参数错误）
+EXIT_OK = 0
+EXIT_ERROR = 1               # 无法运行（OCR 不可用、翻译模型无法加载等）、中止，或没有任何图片导出成功
+EXIT_INCOMPLETE = 3           # 处理完成，但有图片被跳过或失败
+EXIT_INTERRUPTED = 130
+
+
+@dataclass
+class BatchResult:
+    total: int = 0
+    exported: list = field(default_factory=list)   # 结果已导出的 ImageIdentifier
+    skipped: list = field(default_factory=list)    # 无法读取或处理的 ImageIdentifier
+    failed: list = field(default_factory=list)     # 导出失败的 ImageIdentifier
+    errors: list = field(default_factory=list)     # [(ImageIdentifier, 错误信息)]
+
+    @property
+    def complete(self):
+        return not (self.skipped or self.failed or self.errors)
+
+    def record(self, identifier, status, error=None):
+        if status == STATUS_ERROR:
+            self.errors.append((identifier, error))
+        else:
+            getattr(self, status).append(identifier)
+
+
+class BatchRunner:
+    # 按每张图片保存的参数执行完整流水线、OCR 和翻译，并把结果导出到文件夹。
+    # 不依赖Qt：GUI 中由 TaskManager 在工作线程里调用，进度回调转换为Qt信号；命令行入口见 main()。
+
+    def __init__(self, project_store, image_pipeline, ocr_service, translation_service,
+                 workers=BATCH_DECODE_WORKERS, backend=BACKEND_THREAD):
+        self.project_store = project_store
+        self.image_pipeline = image_pipeline
+        self.ocr_service = ocr_service
+        self.translation_service = translation_service
+        self.workers = workers
+        self.backend = backend
+
+    def run(self, file_list, output_folder, progress=None, on_result=None, stop_on_error=True):
+        # progress(current, total, display_name) 在开始处理每张图片时调用；
+        # on_result(current, identifier, status, error) 在每张图片处理完成后调用。
+        # stop_on_error=False 时单张图片的异常只记录在结果中，继续处理其余图片。
+        result = BatchResult(total=len(file_list))
+        # 一次性读出所有图片的参数，避免逐张打开参数文件
+        all_params = self.project_store.load_params_for_images(file_list)
+        params_list = [ProcessingParameters.from_dict(all_params.get(identifier, {})) for identifier in file_list]
+
+        if self.backend == BACKEND_PROCESS:
+            translation_device = (self.translation_service.current_device
+                                  if self.translation_service.is_model_loaded() else None)
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_process_worker,
+                                           initargs=(self.image_pipeline.tile_size, translation_device))
+
+            def submit(index):
+                return executor.submit(_process_image_in_worker, file_list[index], params_list[index], output_folder)
+        else:
+            # 解码和图像处理在线程池中提前并行进行（同一文档的多页也可同时解码，各线程使用自己的文件句柄）
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+
+            def submit(index):
+                return executor.submit(self.prepare_image, file_list[index], params_list[index])
+
+        with executor:
+            pending = deque()
+            next_index = 0
+            try:
+                for i, identifier in enumerate(file_list):
+                    # 未取走的结果不超过并行数的两倍，限制同时驻留内存的图像数量
+                    while next_index < len(file_list) and len(pending) < self.workers * 2:
+                        pending.append(submit(next_index))
+                        next_index += 1
+                    future = pending.popleft()
+
+                    if progress is not None:
+                        progress(i + 1, len(file_list), identifier.display_name)
+
+                    error = None
+                    try:
+                        if self.backend == BACKEND_PROCESS:
+                            status = future.result()
+                        else:
+                            status = self.finish_image(identifier, params_list[i], future.result(), output_folder)
+                    except Exception as e:
+                        if stop_on_error:
+                            raise
+                        status, error = STATUS_ERROR, f"{type(e).__name__}: {e}"
+                    result.record(identifier, status, error)
+                    if on_result is not None:
+                        on_result(i + 1, identifier, status, error)
+            except BaseException:
+                # 中止时不再等待排队中的图片
+                for future in pending:
+                    future.cancel()
+                raise
+        return result
+
+    def prepare_image(self, identifier, params_obj):
+        # 读取原图并完成全部预处理，失败时返回 None。可以在任意线程中调用。
+        original_image = self.image_pipeline.opencv_ops.load_raw_image(identifier)
+        if original_image is None:
+            return None
+        return self.image_pipeline.process_fully(original_image, params_obj)
+
+    def finish_image(self, identifier, params_obj, final_ocr_image, output_folder):
+        # OCR、翻译并导出一张已预处理的图片，返回处理状态
+        if final_ocr_image is None:
+            return STATUS_SKIPPED
+        ocr_text = self.ocr_service.run(final_ocr_image, params_obj.ocr_lang)
+
+        translated_text = ""
+        if ocr_text.strip() and self.translation_service.is_model_loaded():
+            translated_text = self.translation_service.run(ocr_text, self.translation_service.current_device)
+
+        exported = self.project_store.export_results_to_folder(
+            output_folder, identifier, final_ocr_image, ocr_text, translated_text
+        )
+        return STATUS_EXPORTED if exported else STATUS_FAILED
+
+
+# --- process 方式的工作进程 ---
+_worker_runner = None
+
+
+def _init_process_worker(tile_size, translation_device):
+    # 每个工作进程创建自己的流水线和服务；进程内的诊断输出写到 stderr，不混入 stdout 上的进度流
+    global _worker_runner
+    from .image_pipeline import ImagePipeline
+    from .ocr_service import OcrService
+    from .project_store import ProjectStore
+    from .translation_service import TranslationService
+
+    sys.stdout = sys.stderr
+    translation_service = TranslationService()
+    if translation_device is not None:
+        translation_service.load_model(translation_device)
+    _worker_runner = BatchRunner(ProjectStore(), ImagePipeline(tile_size=tile_size), OcrService(),
+                                 translation_service, workers=1)
+
+
+def _process_image_in_worker(identifier, params_obj, output_folder):
+    final_ocr_image = _worker_runner.prepare_image(identifier, params_obj)
+    return _worker_runner.finish_image(identifier, params_obj, final_ocr_image, output_folder)
+
+
+# --- 命令行 ---
+
+def parse_page_ranges(spec):
+    # "1-3,7" -> {1, 2, 3, 7}（页码从1开始）
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        first, last = int(start), int(end) if end else int(start)
+        if first < 1 or last < first:
+            raise ValueError(f"无效的页码范围: {part}")
+        pages.update(range(first, last + 1))
+    return pages
+
+
+def filter_file_list(file_list, pages=None, patterns=None):
+    # 按页码（单页图片视为第1页）和文件名通配符筛选
+    result = []
+    for identifier in file_list:
+        if pages is not None and max(identifier.page, 0) + 1 not in pages:
+            continue
+        name = os.path.basename(identifier.path)
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        result.append(identifier)
+    return result
+
+
+class _ProgressReporter:
+    # 进度输出：text 为便于阅读的文本，jsonl 为每行一个 JSON 对象（事件 start / image / done / error）
+    def __init__(self, mode, stream):
+        self.mode = mode
+        self.stream = stream
+        self.total = 0
+        self.start_time = time.perf_counter()
+
+    def _emit(self, event, text, **data):
+        if self.mode == "jsonl":
+            data = {"event": event, "elapsed": round(time.perf_counter() - self.start_time, 3), **data}
+            self.stream.write(json.dumps(data, ensure_ascii=False) + "\n")
+        elif self.mode == "text":
+            self.stream.write(text + "\n")
+        self.stream.flush()
+
+    def start(self, total, project, output_folder):
+        self.total = total
+        self._emit("start", f"开始批量处理 {total} 张图片: {project} -> {output_folder}",
+                   total=total, project=project, out=output_folder)
+
+    def image(self, current, identifier, status, error):
+        text = f"[{current}/{self.total}] {identifier.display_name}: {status}" + (f" ({error})" if error else "")
+        self._emit("image", text, index=current, total=self.total, file=os.path.basename(identifier.path),
+                   page=identifier.page + 1 if identifier.page > -1 else None, status=status, error=error)
+
+    def done(self, result: BatchResult):
+        self._emit("done", f"批量处理完成: 导出 {len(result.exported)}，跳过 {len(result.skipped)}，"
+                           f"导出失败 {len(result.failed)}，出错 {len(result.errors)}",
+                   total=result.total, exported=len(result.exported), skipped=len(result.skipped),
+                   failed=len(result.failed), errors=len(result.errors))
+
+    def error(self, message):
+        if self.mode == "none":
+            # 不输出进度时，错误仍然写到 stderr
+            print(f"错误: {message}", file=sys.stderr)
+            return
+        self._emit("error", f"错误: {message}", message=message)
+
+
+def main(argv=None):
+    # 命令行批处理（不启动界面）: python -m core.batch_runner --project <工程> --out <输出文件夹> [--workers N]
+    # 打包后的程序也可以用 "<程序> batch ..." 调用，见 app.py。
+    parser = argparse.ArgumentParser(description="不启动界面，按工程中每张图片保存的参数批量处理、OCR 并导出结果")
+    parser.add_argument("--project", required=True, help="工程文件夹路径")
+    parser.add_argument("--out", required=True, help="结果输出文件夹（不存在时创建）")
+    parser.add_argument("--workers", type=int, default=BATCH_DECODE_WORKERS, help="并行的线程或进程数")
+    parser.add_argument("--backend", choices=BATCH_BACKENDS, default=BACKEND_THREAD,
+                        help="thread: 只并行解码和预处理，OCR 按顺序执行; process: 每个进程独立完成整张图片")
+    parser.add_argument("--pages", help="只处理这些页，从1开始，例如 1-3,7（单页图片视为第1页）")
+    parser.add_argument("--include", action="append", metavar="PATTERN",
+                        help="只处理文件名匹配该通配符的图片（可重复）")
+    parser.add_argument("--translate", metavar="DEVICE", nargs="?", const="cpu",
+                        help="加载翻译模型并翻译OCR结果，可指定设备（默认 cpu）")
+    parser.add_argument("--progress", choices=["text", "jsonl", "none"], default="text",
+                        help="进度输出格式；jsonl 时其他诊断信息写到 stderr")
+    parser.add_argument("--stop-on-error", action="store_true", help="任意一张图片出错时立即停止")
+    args = parser.parse_args(argv)
+
+    pages = None
+    if args.pages:
+        try:
+            pages = parse_page_ranges(args.pages)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.workers < 1:
+        parser.error("--workers 必须大于 0")
+
+    reporter = _ProgressReporter(args.progress, sys.stdout)
+    # jsonl 模式下 stdout 只输出进度事件，各模块 print 的诊断信息转到 stderr
+    redirect = contextlib.redirect_stdout(sys.stderr) if args.progress == "jsonl" else contextlib.nullcontext()
+    with redirect:
+        return _run_batch_command(args, pages, reporter)
+
+
+def _run_batch_command(args, pages, reporter):
+    from .image_pipeline import ImagePipeline
+    from .ocr_service import OcrService
+    from .project_store import ProjectStore
+    from .translation_service import TranslationService
+
+    if not os.path.isdir(args.project):
+        reporter.error(f"工程路径不存在: {args.project}")
+        return EXIT_ERROR
+    try:
+        os.makedirs(args.out, exist_ok=True)
+    except OSError as e:
+        reporter.error(f"无法创建输出文件夹 {args.out}: {e}")
+        return EXIT_ERROR
+
+    store = ProjectStore()
+    try:
+        store.activate_project(args.project)
+        file_list = filter_file_list(store.file_list, pages, args.include)
+
+        # OCR 或翻译模型不可用时每张图片都会失败，在开始之前检查
+        ocr_service = OcrService()
+        try:
+            ocr_service.check_available()
+        except FileNotFoundError as e:
+            reporter.error(str(e))
+            return EXIT_ERROR
+        translation_service = TranslationService()
+        if args.translate:
+            try:
+                translation_service.load_model(args.translate)
+            except Exception as e:
+                reporter.error(f"无法加载翻译模型: {e}")
+                return EXIT_ERROR
+        runner = BatchRunner(store, ImagePipeline(), ocr_service, translation_service,
+                             workers=args.workers, backend=args.backend)
+
+        reporter.start(len(file_list), args.project, args.out)
+        result = runner.run(file_list, args.out, on_result=reporter.image, stop_on_error=args.stop_on_error)
+        reporter.done(result)
+        if result.complete:
+            return EXIT_OK
+        return EXIT_INCOMPLETE if result.exported else EXIT_ERROR
+    except KeyboardInterrupt:
+        reporter.error("已中断")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        reporter.error(f"{type(e).__name__}: {e}")
+        return EXIT_ERROR
+    finally:
+        store.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,47 @@
 # src/core/image_data_store.py
 import os
 
-import cv2
-
 from .parameters import ProcessingParameters
 from .image_identifier import ImageIdentifier
-
-STAGE_NAMES = [
-    "stage1_redress",
-    "stage2_binary",
-    "stage3_noisefree",
-    "stage4_final"
-]
+from .stage_storage import (
+    STAGE_NAMES, STAGE_STORAGE_BACKENDS, get_stage_backend, remove_other_formats, DEFAULT_STAGE_BACKEND
+)
+from .project_index import index_key
 
 
 class ImageDataStore:
     
 
-    def __init__(self, project_path, identifier: ImageIdentifier, ini_manager):
+    def __init__(self, project_path, identifier: ImageIdentifier, ini_manager, stage_backend=None, index=None):
         self.project_path = project_path
         self.identifier = identifier
         self.ini_manager = ini_manager
+        self.stage_backend = stage_backend or get_stage_backend(DEFAULT_STAGE_BACKEND)
+        # 工程索引 (ProjectIndex)。为 None 时退回到旧的 per-image INI 布局。
+        self.index = index
 
     def load_params(self):
         
+        if self.index is not None:
+            key = index_key(self.identifier)
+            params = self.index.load_params(key)
+            if params:
+                return params
+            # 索引中还没有记录，但存在旧的 INI 文件（例如之后才复制进工程）时，透明地导入
+            param_file_path = self._get_param_path()
+            if param_file_path and os.path.exists(param_file_path):
+                return self.index.import_ini_file(key, param_file_path)
+            return {}
+
         param_file_path = self._get_param_path()
         return self.ini_manager.load_params(param_file_path)
 
     def save_params(self, params: ProcessingParameters):
         
+        if self.index is not None:
+            self.index.save_params(index_key(self.identifier), params.to_dicts())
+            return
+
         param_file_path = self._get_param_path(create_if_needed=True)
         if param_file_path:
             param_sections = params.to_dicts()
@@ -36,29 +49,41 @@ class ImageDataStore:
 
     def load_stage_result(self, stage_index):
         
-        stage_path = self._get_stage_result_path(stage_index)
-        if stage_path and os.path.exists(stage_path):
-            return cv2.imread(stage_path, cv2.IMREAD_UNCHANGED)
+        base_path = self._get_base_path_for_stage(stage_index)
+        if not base_path:
+            return None
+        # 优先使用当前后端；切换后端但尚未迁移的旧结果仍可按其原格式读取
+        backends = [self.stage_backend] + [b for b in STAGE_STORAGE_BACKENDS.values() if b is not self.stage_backend]
+        for backend in backends:
+            if os.path.exists(backend.path_for(base_path)):
+                return backend.load(base_path)
         return None
 
-    def save_stage_result(self, stage_index, main_image_data, preview_image_data=None):
+    def stage_result_path(self, stage_index):
+        # 当前后端下阶段结果文件的路径，不创建目录
+        base_path = self._get_base_path_for_stage(stage_index)
+        return self.stage_backend.path_for(base_path) if base_path else None
+
+    def save_stage_result(self, stage_index, main_image_data):
         
         base_path = self._get_base_path_for_stage(stage_index, create_if_needed=True)
         if not base_path:
             return
 
-        main_image_path = f"{base_path}.png"
+        main_image_path = self.stage_backend.path_for(base_path)
         try:
-            cv2.imwrite(main_image_path, main_image_data)
+            self.stage_backend.save(base_path, main_image_data)
         except Exception as e:
             print(f"无法保存阶段性文件 {main_image_path}: {e}")
+            return
+        # 当前后端写入之后，其他格式的旧结果已经过时，删除以免读取时退回到它们
+        remove_other_formats(base_path, self.stage_backend)
 
-        if preview_image_data is not None:
-            preview_image_path = f"{base_path}_preview.png"
-            try:
-                cv2.imwrite(preview_image_path, preview_image_data)
-            except Exception as e:
-                print(f"无法保存预览文件 {preview_image_path}: {e}")
+        if self.index is not None:
+            self.index.record_stage_result(
+                index_key(self.identifier), stage_index, self.stage_backend.name,
+                main_image_data.shape, main_image_data.dtype
+            )
 
     def _get_param_path(self, create_if_needed=False):
         
@@ -92,8 +117,3 @@ class ImageDataStore:
             return os.path.join(subfolder_path, f"p{self.identifier.page + 1}_{STAGE_NAMES[stage_index]}")
         else:
             return os.path.join(subfolder_path, STAGE_NAMES[stage_index])
-
-    def _get_stage_result_path(self, stage_index):
-        
-        base_path = self._get_base_path_for_stage(stage_index)
-        return f"{base_path}.png" if base_path else None
\ No newline at end of file
@@ -0,0 +1,189 @@
+# src/core/image_importer.py
+import errno
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+# 导入时的最大并发数。复制主要受磁盘/网络I/O限制，线程数不宜过多，以免在网络共享上造成拥塞。
+MAX_IMPORT_WORKERS = 8
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Linux 的 FICLONE ioctl：在支持写时复制的文件系统 (btrfs, xfs, ...) 上共享数据块，不复制内容
+_FICLONE = 0x40049409
+
+
+@dataclass
+class ImportResult:
+    imported: list = field(default_factory=list)   # 新导入的文件名
+    duplicates: list = field(default_factory=list) # 内容已存在于工程中而跳过的源文件
+    failed: list = field(default_factory=list)     # 导入失败的源文件
+    hashes: dict = field(default_factory=dict)     # 文件名 -> (大小, 修改时间, 内容摘要)，用于更新工程索引
+
+
+def file_content_hash(path):
+    # 文件内容摘要，分块读取，不会把大文件整个读入内存
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _try_reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+_LINK_METHODS = ("reflink", "hardlink", "copy")
+
+
+def link_or_copy(src, dst, methods=_LINK_METHODS):
+    # 按 reflink -> 硬链接 -> 复制 的顺序尝试，返回实际使用的方式。
+    # reflink 是写时复制，最安全；硬链接与源文件共享同一份数据（流水线只读取原图，不会修改它）；
+    # 跨文件系统（例如从网络共享导入）时两者都不可用，退回普通复制。
+    # methods 可以跳过已知不可用的方式（见 import_files）。
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return "same"
+        # 与原先 shutil.copy 的行为一致：同名文件被覆盖
+        os.remove(dst)
+    if "reflink" in methods and _try_reflink(src, dst):
+        return "reflink"
+    if "hardlink" in methods:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EACCES):
+                raise
+    shutil.copy(src, dst)
+    return "copy"
+
+
+def import_files(project_path, source_files, known_hashes, project_entries, progress=None,
+                 max_workers=MAX_IMPORT_WORKERS):
+    # 并行导入图片到工程文件夹，跳过内容已存在的文件。
+    # - known_hashes: 工程索引中缓存的 {文件名: (大小, 修改时间, 摘要)}；
+    # - project_entries: 最近一次扫描的 {文件名: (大小, 修改时间, ...)}；
+    # - progress(done, total, name): 每处理完一个源文件调用一次（在工作线程中调用）。
+    # 只有大小相同的文件才可能内容相同，因此只对大小冲突的文件计算摘要，大部分文件无需读取内容。
+    result = ImportResult()
+    total = len(source_files)
+    lock = threading.Lock()
+    done = [0]
+    # 每个源设备上第一次成功的方式，之后同一设备上的文件直接从该方式开始，不再重复尝试失败的方式
+    methods_by_device = {}
+
+    sizes = {}
+    for src in source_files:
+        try:
+            sizes[src] = os.path.getsize(src)
+        except OSError as e:
+            print(f"无法读取文件 {src}: {e}")
+            result.failed.append(src)
+    sources = [src for src in source_files if src in sizes]
+
+    project_sizes = {}
+    for name, entry in project_entries.items():
+        project_sizes.setdefault(entry[0], []).append(name)
+    source_size_counts = {}
+    for src in sources:
+        source_size_counts[sizes[src]] = source_size_counts.get(sizes[src], 0) + 1
+
+    unreadable = set()
+
+    def project_hash(name):
+        size, mtime = project_entries[name][:2]
+        cached = known_hashes.get(name)
+        if cached is not None and cached[:2] == (size, mtime):
+            return cached[2]
+        try:
+            digest = file_content_hash(os.path.join(project_path, name))
+        except OSError:
+            # 上次扫描之后被删除或无法读取的工程文件，不参与比较
+            return None
+        with lock:
+            result.hashes[name] = (size, mtime, digest)
+        return digest
+
+    def source_hash(src):
+        size = sizes[src]
+        if size not in project_sizes and source_size_counts[size] < 2:
+            return None
+        try:
+            return file_content_hash(src)
+        except OSError as e:
+            print(f"无法读取文件 {src}: {e}")
+            with lock:
+                unreadable.add(src)
+            return None
+
+    workers = max(1, min(max_workers, len(sources) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # 1. 计算需要比较的摘要：与某个工程文件或其他源文件大小相同的源文件，以及这些大小对应的工程文件
+        candidate_names = [name for size in source_size_counts for name in project_sizes.get(size, [])]
+        existing = set(executor.map(project_hash, candidate_names))
+        existing.discard(None)
+        source_hashes = dict(zip(sources, executor.map(source_hash, sources)))
+
+        # 2. 去重（包括本次导入中彼此重复的文件），决定需要导入的文件
+        to_import = {}
+        seen = set(existing)
+        for src in sources:
+            if src in unreadable:
+                result.failed.append(src)
+                continue
+            digest = source_hashes[src]
+            if digest is not None and digest in seen:
+                result.duplicates.append(src)
+                continue
+            if digest is not None:
+                seen.add(digest)
+            # 同名的源文件只导入最后一个，与逐个复制时后者覆盖前者的结果相同
+            to_import[os.path.basename(src)] = src
+
+        done[0] = total - len(to_import)
+        if progress and done[0]:
+            progress(done[0], total, "")
+
+        # 3. 并行导入
+        def import_one(src):
+            name = os.path.basename(src)
+            dst = os.path.join(project_path, name)
+            try:
+                device = os.stat(src).st_dev
+                methods = methods_by_device.get(device, _LINK_METHODS)
+                method = link_or_copy(src, dst, methods)
+                if method in _LINK_METHODS:
+                    methods_by_device[device] = _LINK_METHODS[_LINK_METHODS.index(method):]
+                stat = os.stat(dst)
+                with lock:
+                    result.imported.append(name)
+                    if source_hashes[src] is not None:
+                        result.hashes[name] = (stat.st_size, stat.st_mtime, source_hashes[src])
+            except Exception as e:
+                print(f"无法复制文件 {src}: {e}")
+                with lock:
+                    result.failed.append(src)
+            with lock:
+                done[0] += 1
+                current = done[0]
+            if progress:
+                progress(current, total, name)
+
+        list(executor.map(import_one, to_import.values()))
+
+    return result
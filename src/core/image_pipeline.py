@@ -2,13 +2,17 @@
 
 from .opencv_operations import OpenCVOperations
 from .parameters import ProcessingParameters
+from .pipeline_plan import compile_plan
+from .tiled_processing import DEFAULT_TILE_SIZE
 
 
 class ImagePipeline:
     # 封装多阶段图像处理流程。
     # 它接收输入图像、处理阶段和参数，并返回处理结果。
-    def __init__(self):
-        self.opencv_ops = OpenCVOperations()
+    def __init__(self, tile_size=DEFAULT_TILE_SIZE):
+        # 阶段2/3对超过 tile_size 的大图分块并行处理，传入 None 则始终整图处理
+        self.tile_size = tile_size
+        self.opencv_ops = OpenCVOperations(tile_size=tile_size)
 
     def process(self, input_image, stage_index, params: ProcessingParameters, debug_info=None):
         # 根据给定的阶段和参数处理图像。
@@ -25,19 +29,13 @@ class ImagePipeline:
         else:  # 第四阶段及以后，不进行处理
             return input_image, input_image, None, None, None, None
 
-    def process_fully(self, original_image, params: ProcessingParameters, debug_info=None):
+    def process_fully(self, original_image, params: ProcessingParameters, debug_info=None, pack=False):
         # Applies the full processing pipeline based on a parameter dictionary.
         # Returns the final image ready for OCR.
+        # pack=True 时二值结果以 PackedBinaryImage 返回（每像素 1 bit）。
         if original_image is None:
             return None
 
-        # Stage 1
-        _, main_result_s1, _, _, _, _ = self.opencv_ops.apply_stage1_geometry(
-            original_image, params, debug_info=debug_info
-        )
-        # Stage 2
-        _, main_result_s2, _, _, _, _ = self.opencv_ops.apply_stage2_binarization(main_result_s1, params)
-        # Stage 3
-        _, main_result_s3, _, _, _, _ = self.opencv_ops.apply_stage3_noise_removal(main_result_s2, params)
-
-        return main_result_s3
\ No newline at end of file
+        # 按参数编译（或复用已编译的）执行计划，跳过空操作步骤并尽量原地处理
+        plan = compile_plan(params, tile_size=self.tile_size)
+        return plan.run(original_image, debug_info=debug_info, pack=pack)
@@ -28,8 +28,11 @@ class IniManager:
             if params:
                 config[section_name] = {k: str(v) for k, v in params.items()}
 
+        # 先写临时文件再替换，写入中途出错或退出时不会留下半个文件
+        tmp_path = f"{file_path}.tmp"
         try:
-            with open(file_path, 'w', encoding='utf-8') as configfile:
+            with open(tmp_path, 'w', encoding='utf-8') as configfile:
                 config.write(configfile)
+            os.replace(tmp_path, file_path)
         except Exception as e:
             print(f"Error: Could not save parameter file {file_path}: {e}")
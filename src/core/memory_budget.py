@@ -0,0 +1,206 @@
+# src/core/memory_budget.py
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from .packed_binary import PackedBinaryImage
+
+MB = 1024 * 1024
+# 默认的内存预算（图像、显示缓冲和各类缓存合计），可在 app_config 中按部署环境配置
+DEFAULT_MEMORY_BUDGET = 1024 * MB
+
+# 释放优先级：数值小的先释放。可以重新生成的缓存排在前面，当前图片的数据排在最后。
+PRIORITY_PREFETCH = 0
+PRIORITY_THUMBNAILS = 10
+PRIORITY_DISPLAY = 20
+PRIORITY_CURRENT_IMAGE = 50
+
+# 超出上限时释放到上限的这个比例以下，留出余量，避免占用在上限附近时每次检查都要释放
+RELEASE_TARGET_RATIO = 0.9
+
+
+def image_nbytes(image):
+    # 图像实际占用的内存字节数。磁盘映射的数组由操作系统按需换入换出，不计入。
+    if isinstance(image, np.memmap):
+        return 0
+    if isinstance(image, np.ndarray):
+        # 视图与其基础数组共享内存，按基础数组计算
+        base = image
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        return 0 if isinstance(base, np.memmap) else image.nbytes
+    if isinstance(image, PackedBinaryImage):
+        return image.nbytes
+    return 0
+
+
+@dataclass
+class MemoryConsumer:
+    name: str
+    usage: Callable[[], int]             # 当前占用的字节数
+    release: Callable[[int], int]        # 尝试释放至少 n 字节，返回实际释放的字节数
+    priority: int = PRIORITY_PREFETCH
+
+
+class MemoryBudget:
+    # 集中管理图像相关内存的预算。
+    # 各模块（预取缓存、缩略图、显示缓冲、当前图片）把自己登记为 MemoryConsumer，提供占用量和释放方法；
+    # 总占用超过上限时，按优先级从低到高请求各模块释放：缓存直接淘汰，当前图片则转存到磁盘映射 (memmap)。
+    # 本类不依赖Qt；enforce() 应在GUI线程中调用（登记的释放方法可能修改GUI线程使用的数据）。
+    # limit_bytes 为 0 时不限制；spill_dir 为转存文件的父目录，默认为系统临时目录。
+
+    def __init__(self, limit_bytes=DEFAULT_MEMORY_BUDGET, spill_dir=None):
+        self.limit_bytes = limit_bytes
+        self._consumers = {}
+        self._lock = threading.Lock()
+        self._spill_parent = spill_dir
+        self._spill_dir = None
+        # 后台转存：写盘在单独的线程中进行，完成的结果由下一次 enforce() 在GUI线程中交回
+        self._spill_queue = queue.Queue()
+        self._spill_thread = None
+        self._pending_spills = {}     # id(image) -> image，正在转存的数组
+        self._finished_spills = []    # (image, spilled, on_spilled)
+
+    def register(self, name, usage, release, priority=PRIORITY_PREFETCH):
+        with self._lock:
+            self._consumers[name] = MemoryConsumer(name, usage, release, priority)
+
+    def unregister(self, name):
+        with self._lock:
+            self._consumers.pop(name, None)
+
+    def usage(self):
+        # {名称: 字节数}，供界面显示
+        with self._lock:
+            consumers = list(self._consumers.values())
+        result = {}
+        for consumer in consumers:
+            try:
+                result[consumer.name] = consumer.usage()
+            except Exception as e:
+                print(f"无法获取内存占用 {consumer.name}: {e}")
+                result[consumer.name] = 0
+        return result
+
+    def total(self):
+        return sum(self.usage().values())
+
+    def enforce(self):
+        # 超出预算时按优先级释放到 RELEASE_TARGET_RATIO 以下，返回释放后的总占用
+        self._apply_finished_spills()
+        usage = self.usage()
+        total = sum(usage.values())
+        if not self.limit_bytes or total <= self.limit_bytes:
+            return total
+        target = int(self.limit_bytes * RELEASE_TARGET_RATIO)
+        with self._lock:
+            consumers = sorted(self._consumers.values(), key=lambda c: c.priority)
+        for consumer in consumers:
+            excess = total - target
+            if excess <= 0:
+                break
+            if not usage.get(consumer.name):
+                continue
+            try:
+                total -= consumer.release(excess)
+            except Exception as e:
+                print(f"释放内存失败 {consumer.name}: {e}")
+        return total
+
+    def spill(self, image):
+        # 把数组转存到磁盘映射文件，返回内容相同的只读 memmap；其他类型原样返回
+        if not isinstance(image, np.ndarray) or isinstance(image, np.memmap) or image_nbytes(image) == 0:
+            return image
+        spill_dir = self._get_spill_dir()
+        fd, path = tempfile.mkstemp(suffix=".spill", dir=spill_dir)
+        os.close(fd)
+        mapped = np.lib.format.open_memmap(path, mode="w+", dtype=image.dtype, shape=image.shape)
+        mapped[...] = image
+        mapped.flush()
+        del mapped
+        spilled = np.load(path, mmap_mode="r")
+        if os.name == "posix":
+            # 映射建立后即可删除文件，数据在映射释放之前一直有效
+            os.remove(path)
+        else:
+            weakref.finalize(spilled, _remove_quietly, path)
+        return spilled
+
+    def spill_async(self, image, on_spilled):
+        # 在后台线程中转存 image，不阻塞GUI线程；完成后由 enforce() 在GUI线程中调用 on_spilled(image, spilled)。
+        # 返回是否已安排转存（同一个数组正在转存时不重复安排）。
+        if not isinstance(image, np.ndarray) or isinstance(image, np.memmap) or image_nbytes(image) == 0:
+            return False
+        with self._lock:
+            if id(image) in self._pending_spills:
+                return True
+            self._pending_spills[id(image)] = image
+            if self._spill_thread is None:
+                self._spill_thread = threading.Thread(target=self._run_spills, name="MemorySpill", daemon=True)
+                self._spill_thread.start()
+        self._spill_queue.put((image, on_spilled))
+        return True
+
+    def close(self):
+        with self._lock:
+            self._consumers.clear()
+            thread = self._spill_thread
+            self._spill_thread = None
+        if thread is not None:
+            self._spill_queue.put(None)
+            thread.join()
+        with self._lock:
+            self._pending_spills.clear()
+            self._finished_spills = []
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _run_spills(self):
+        while True:
+            item = self._spill_queue.get()
+            if item is None:
+                return
+            image, on_spilled = item
+            try:
+                spilled = self.spill(image)
+            except Exception as e:
+                print(f"无法转存图像数据: {e}")
+                spilled = None
+            with self._lock:
+                self._finished_spills.append((image, spilled, on_spilled))
+
+    def _apply_finished_spills(self):
+        with self._lock:
+            finished, self._finished_spills = self._finished_spills, []
+            for image, _, _ in finished:
+                self._pending_spills.pop(id(image), None)
+        for image, spilled, on_spilled in finished:
+            if spilled is None:
+                continue
+            try:
+                on_spilled(image, spilled)
+            except Exception as e:
+                print(f"无法替换转存的图像数据: {e}")
+
+    def _get_spill_dir(self):
+        with self._lock:
+            if self._spill_dir is None:
+                if self._spill_parent:
+                    os.makedirs(self._spill_parent, exist_ok=True)
+                self._spill_dir = tempfile.mkdtemp(prefix="ocr-reader-spill-", dir=self._spill_parent)
+            return self._spill_dir
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
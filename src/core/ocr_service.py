@@ -14,13 +14,17 @@ class OcrService:
         # 初始化逻辑被推迟到run方法中，以便在任务执行时处理错误，而不是在程序启动时。
         pass
 
-    def run(self, image_np, lang_code="eng"):
-        # 1. 验证路径
+    def check_available(self):
+        # Tesseract 不可用时抛出 FileNotFoundError，批处理在开始之前调用
         if not TESSERACT_CMD_PATH or not os.path.exists(TESSERACT_CMD_PATH):
             raise FileNotFoundError(f"Tesseract可执行文件未找到: {TESSERACT_CMD_PATH}")
         if not TESSDATA_PATH or not os.path.exists(TESSDATA_PATH):
             raise FileNotFoundError(f"Tesseract语言数据目录未找到: {TESSDATA_PATH}")
 
+    def run(self, image_np, lang_code="eng"):
+        # 1. 验证路径
+        self.check_available()
+
         # 2. 准备临时文件
         with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_input_file:
             input_path = temp_input_file.name
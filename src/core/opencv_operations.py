@@ -3,38 +3,141 @@ import cv2
 import os
 import numpy as np
 from PIL import Image
-from PyQt5.QtGui import QImage, QPixmap
 
 from .param_utils import deserialize_rect_list, deserialize_point_list
 from .image_identifier import ImageIdentifier
 from .parameters import ProcessingParameters
+from .overlay import contour_overlay, SMALL_NOISE_COLOR, LARGE_NOISE_COLOR
+from .tiled_processing import should_tile, run_tiled
+from .tiff_reader import TIFF_EXTENSIONS, get_tiff_file, load_tiff_page, load_reduced_tiff_page
+
+# 需要整幅图像统计量（直方图、全局最小值/最大标准差）的阈值方法，不能分块处理
+GLOBAL_THRESH_METHODS = ("otsu", "wolf")
+
+# Sauvola 公式中标准差的动态范围（8位灰度图取 128）
+SAUVOLA_DYNAMIC_RANGE = 128.0
+
+# PIL 中表示单通道（二值/灰度）图像的模式
+GRAYSCALE_PIL_MODES = ("1", "L")
+
+# JPEG 可以在解码时直接按 1/2、1/4、1/8 缩小（DCT 域缩放），不必先解码完整图像
+JPEG_EXTENSIONS = (".jpg", ".jpeg", ".jpe")
+_REDUCED_READ_FLAGS = {
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2, (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8, (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4, (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+MAX_REDUCTION_FACTOR = 8
+
+
+def is_grayscale_source(path):
+    # 只读取文件头判断图像是否为单通道，不解码像素数据
+    try:
+        with Image.open(path) as img:
+            return img.mode in GRAYSCALE_PIL_MODES
+    except Exception:
+        return False
+
+
+def reduction_factor(long_side, max_size):
+    # 长边仍不小于 max_size 的最大缩小倍数（1、2、4 或 8）
+    factor = 1
+    while factor < MAX_REDUCTION_FACTOR and long_side // (factor * 2) >= max_size:
+        factor *= 2
+    return factor
+
+
+def _load_pil_page(pil_image, color):
+    # 解码已打开的PIL图像（当前页）。每一步完成后立即释放上一份数据，
+    # 颜色通道原地转换，峰值内存约为两份整页数据。
+    try:
+        pil_image.load()
+        if not color and pil_image.mode in GRAYSCALE_PIL_MODES:
+            target_mode = "L"
+        else:
+            target_mode = "RGB"
+        if pil_image.mode != target_mode:
+            converted = pil_image.convert(target_mode)
+            pil_image.close()
+            pil_image = converted
+        image = np.array(pil_image)
+    finally:
+        pil_image.close()
+    if image.ndim == 3:
+        cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image)
+    return image
 
 
 class OpenCVOperations:
-    
+
+    def __init__(self, tile_size=None):
+        # tile_size 为 None 时整图处理；否则阶段2/3的局部操作对超过该尺寸的图像分块并行执行
+        self.tile_size = tile_size
 
     @staticmethod
-    def load_raw_image(identifier: ImageIdentifier):
-        
+    def load_raw_image(identifier: ImageIdentifier, color=False):
+        # 加载原始图像。单通道（灰度/二值）来源直接按灰度解码，只占 BGR 的三分之一内存，
+        # 后续阶段1的几何校正也保持单通道；color=True 时始终返回 BGR，用于需要彩色预览的场合。
+        # TIFF 优先直接按文件布局读取：无压缩的连续条带一次读入，分块/Deflate 逐块解码，避免经过PIL的多份拷贝。
+        # 同一文件的页索引在各页之间共享，按页号直接定位，不再每页从文件头逐页查找。
+        if identifier.path.lower().endswith(TIFF_EXTENSIONS):
+            page = max(identifier.page, 0)
+            image = load_tiff_page(identifier.path, page, color)
+            if image is not None:
+                return image
+            # 多页文件的其他格式交给PIL解码；单页文件仍由 cv2.imread 读取（16位等格式按OpenCV的规则转换）
+            tiff_file = get_tiff_file(identifier.path) if identifier.page > -1 else None
+            if tiff_file is not None:
+                try:
+                    with tiff_file.open_pil_page(page) as pil_image:
+                        return _load_pil_page(pil_image, color)
+                except Exception:
+                    return None
         if identifier.page > -1:
             try:
                 pil_image = Image.open(identifier.path)
                 pil_image.seek(identifier.page)
-                pil_image = pil_image.convert("RGB")
-                image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+                image = _load_pil_page(pil_image, color)
             except Exception:
                 return None
         else:
-            image = cv2.imread(identifier.path)
+            if not color and is_grayscale_source(identifier.path):
+                image = cv2.imread(identifier.path, cv2.IMREAD_GRAYSCALE)
+            else:
+                image = cv2.imread(identifier.path)
         return image
 
+    @staticmethod
+    def load_reduced_image(identifier: ImageIdentifier, max_size, color=False):
+        # 以降低的分辨率解码原始图像，用于只需要屏幕大小图像的场合（例如切换图片时先显示的代理图）。
+        # 返回 (图像, 相对原图的比例)，图像长边不小于 max_size；
+        # 该格式没有比完整解码更快的途径，或图像本身不大时返回 (None, None)，调用者直接完整解码。
+        path = identifier.path.lower()
+        try:
+            if path.endswith(TIFF_EXTENSIONS):
+                return load_reduced_tiff_page(identifier.path, max(identifier.page, 0), max_size, color)
+            if identifier.page > -1 or not path.endswith(JPEG_EXTENSIONS):
+                return None, None
+            with Image.open(identifier.path) as img:
+                long_side = max(img.size)
+                grayscale = not color and img.mode in GRAYSCALE_PIL_MODES
+            factor = reduction_factor(long_side, max_size)
+            if factor == 1:
+                return None, None
+            image = cv2.imread(identifier.path, _REDUCED_READ_FLAGS[(factor, grayscale)])
+            return (image, 1.0 / factor) if image is not None else (None, None)
+        except Exception as e:
+            print(f"无法以降低的分辨率解码 {identifier}: {e}")
+            return None, None
+
     def apply_stage1_geometry(self, image, params: ProcessingParameters, debug_info=None):
         
         if image is None:
             return None, None
 
-        # This will be the base for both preview and final output
-        geo_corrected_img = image.copy()
+        # This will be the base for both preview and final output.
+        # 透视校正、旋转和工作区提取都会生成新图像，这里无需先复制整幅原图。
+        geo_corrected_img = image
 
         # 1. 应用透视校正
         perspective_points_str = params.perspective_points
@@ -60,38 +163,17 @@ class OpenCVOperations:
         if work_areas_str:
             work_areas = deserialize_rect_list(work_areas_str)
             if work_areas:
-                # 1. 计算所有工作区的理论最小外包矩形
-                # 这是基于用户输入的“逻辑”边界
-                logical_min_x = min(r[0] for r in work_areas)
-                logical_min_y = min(r[1] for r in work_areas)
-                logical_max_x = max(r[0] + r[2] for r in work_areas)
-                logical_max_y = max(r[1] + r[3] for r in work_areas)
-
-                # 2. 创建一个基于完整尺寸的副本，用于生成蒙版和涂白
-                ocr_image = geo_corrected_img.copy()
-                mask = np.zeros(ocr_image.shape[:2], dtype=np.uint8)
-                for area in work_areas:
-                    x, y, w, h = area
-                    cv2.rectangle(mask, (x, y), (x + w, y + h), 255, -1)
-
-                # 3. 将蒙版外的区域涂白
-                ocr_image[mask == 0] = 255
+                # 1. 计算所有工作区的外包矩形，并裁剪到图像的实际尺寸内
+                bounds = work_area_bounds(work_areas, geo_corrected_img.shape)
+                actual_min_x, actual_min_y, actual_max_x, actual_max_y = bounds
 
-                # 4. 将理论边界裁剪到图像的实际尺寸内，得到实际的裁剪坐标
-                img_h, img_w, _ = ocr_image.shape
-                actual_min_x = max(0, logical_min_x)
-                actual_min_y = max(0, logical_min_y)
-                actual_max_x = min(img_w, logical_max_x)
-                actual_max_y = min(img_h, logical_max_y)
-
-                # 只有当裁剪区域有效时才进行裁剪
-                if actual_max_x > actual_min_x and actual_max_y > actual_min_y:
-                    ocr_image = ocr_image[actual_min_y:actual_max_y, actual_min_x:actual_max_x]
+                # 2. 先裁剪再涂白：只在外包矩形范围内按工作区列表做切片拷贝，不再生成整幅蒙版
+                ocr_image = extract_work_areas(geo_corrected_img, work_areas, bounds)
 
                 # crop_rect 必须存储用于坐标变换的实际偏移量和尺寸
                 crop_rect = (actual_min_x, actual_min_y, actual_max_x - actual_min_x, actual_max_y - actual_min_y)
 
-                # 5. 计算工作区在裁剪后图像中的相对坐标
+                # 3. 计算工作区在裁剪后图像中的相对坐标
                 relative_work_areas = []
                 crop_x_offset, crop_y_offset = crop_rect[0], crop_rect[1]
                 for area in work_areas:
@@ -99,7 +181,7 @@ class OpenCVOperations:
                     relative_y = area[1] - crop_y_offset
                     relative_work_areas.append((relative_x, relative_y, area[2], area[3]))
 
-                # 6. 计算其他框的相对坐标
+                # 4. 计算其他框的相对坐标
                 if params.standard_char_rect:
                     std_rect_list = deserialize_rect_list(params.standard_char_rect)
                     if std_rect_list:
@@ -122,11 +204,64 @@ class OpenCVOperations:
         if image is None:
             return None, None, None, None, None, None
 
-        processed_img = image.copy()
+        # 灰度、模糊和大部分阈值方法都是局部操作，大图可以分块并行处理
+        if params.thresh_method not in GLOBAL_THRESH_METHODS and should_tile(image.shape, self.tile_size):
+            processed_img = run_tiled(
+                image, lambda tile: self._binarize(tile, params),
+                self._binarize_margin(params), self.tile_size
+            )
+        else:
+            processed_img = self._binarize(image, params)
+
+        # --- 智能移除噪点 ---
+        small_noise_contours = []
+        large_noise_contours = []
+
+        inverted_img = cv2.bitwise_not(processed_img)
+
+        # 1. 查找小型噪点
+        if params.enable_smart_noise_removal:
+            small_noise_contours = self.find_small_noise_contours(
+                inverted_img, params.sample_char_height, params.noise_size_limit_percent
+            )
+
+        # 2. 查找大型噪点
+        if params.preview_large_noise or params.confirm_large_noise_removal:
+            large_noise_contours = self.find_large_noise_contours(
+                inverted_img, params.sample_char_height, params.large_noise_morph_ksize
+            )
 
+        # 3. 生成主输出图像 (用于下一阶段和最终保存)
+        remove_small = params.enable_smart_noise_removal and small_noise_contours
+        remove_large = params.confirm_large_noise_removal and large_noise_contours
+        main_result_image = processed_img.copy() if remove_small or remove_large else processed_img
+        if remove_small:
+            # 在主输出图像上真正移除噪点 (涂白)
+            cv2.drawContours(main_result_image, small_noise_contours, -1, 255, thickness=cv2.FILLED)
+        if remove_large:
+            # 在主输出图像上真正移除大型噪点 (涂白)
+            cv2.drawContours(main_result_image, large_noise_contours, -1, 255, thickness=cv2.FILLED)
+
+        # 4. 生成预览 (用于UI显示)：噪点轮廓作为矢量叠加层返回，由界面绘制在移除前的二值图上
+        overlays = []
+        if remove_small:
+            overlays.append(contour_overlay(small_noise_contours, SMALL_NOISE_COLOR, 1))
+        if params.preview_large_noise and large_noise_contours:
+            overlays.append(contour_overlay(large_noise_contours, LARGE_NOISE_COLOR, 1))
+
+        # 如果没有任何需要预览的，预览图就等于最终结果图
+        preview_image = processed_img if overlays else main_result_image
+
+        return preview_image, main_result_image, None, None, None, tuple(overlays) or None
+
+    @staticmethod
+    def _binarize(image, params: ProcessingParameters):
+        # 灰度转换 + 高斯模糊 + 阈值化，返回新的单通道图像，不修改输入
         # 强制转换为灰度图，因为二值化必须在单通道图像上进行
-        if len(processed_img.shape) == 3:
-            processed_img = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
+        if image.ndim == 3:
+            processed_img = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            processed_img = image
 
         ksize = params.blur_ksize | 1
         if ksize > 1:
@@ -150,68 +285,87 @@ class OpenCVOperations:
             _, processed_img = cv2.threshold(
                 processed_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
             )
+        elif thresh_method == "sauvola":
+            processed_img = sauvola_threshold(processed_img, params.thresh_blocksize | 1, params.thresh_k)
+        elif thresh_method == "wolf":
+            processed_img = wolf_threshold(processed_img, params.thresh_blocksize | 1, params.thresh_k)
 
-        # --- 智能移除噪点 ---
-        small_noise_contours = []
-        large_noise_contours = []
+        if processed_img is image:
+            processed_img = image.copy()
+        return processed_img
 
-        inverted_img = cv2.bitwise_not(processed_img)
+    @staticmethod
+    def _binarize_margin(params: ProcessingParameters):
+        # 分块重叠边距 = 模糊核半径 + 局部阈值窗口半径
+        margin = (params.blur_ksize | 1) // 2
+        if params.thresh_method in ("adaptive", "sauvola"):
+            margin += (params.thresh_blocksize | 1) // 2
+        return margin
 
-        # 1. 查找小型噪点
-        if params.enable_smart_noise_removal and params.sample_char_height > 0 and params.noise_size_limit_percent > 0:
-            max_side_length = params.sample_char_height * (params.noise_size_limit_percent / 100.0)
-            area_threshold = max_side_length * max_side_length
-            contours, _ = cv2.findContours(inverted_img.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            small_noise_contours = [cnt for cnt in contours if cv2.contourArea(cnt) < area_threshold]
+    @staticmethod
+    def _apply_morphology(image, params: ProcessingParameters):
+        # 形态学开/闭运算 + 膨胀
+        processed_img = image
+        if params.morph:
+            kernel_size = params.morph_ksize | 1
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
 
-        # 2. 查找大型噪点
-        if (params.preview_large_noise or params.confirm_large_noise_removal) and params.sample_char_height > 0:
-            large_area_thresh = (params.sample_char_height ** 2) * 1.5
-            full_contours, _ = cv2.findContours(inverted_img.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            ksize = params.large_noise_morph_ksize | 1
-            large_kernel = np.ones((ksize, ksize), np.uint8)
-            image_for_analysis = cv2.morphologyEx(inverted_img, cv2.MORPH_OPEN, large_kernel)
-            robust_contours, _ = cv2.findContours(image_for_analysis, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            robust_noise_seeds = [cnt for cnt in robust_contours if cv2.contourArea(cnt) > large_area_thresh]
-
-            final_large_noise_indices = set()
-            for seed_contour in robust_noise_seeds:
-                M = cv2.moments(seed_contour)
-                if M["m00"] == 0: continue
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                for i, full_contour in enumerate(full_contours):
-                    if cv2.pointPolygonTest(full_contour, (cx, cy), False) >= 0:
-                        final_large_noise_indices.add(i)
-                        break
-            large_noise_contours = [full_contours[i] for i in sorted(list(final_large_noise_indices))]
+            if params.morph_op == 0:  # 开操作 (Opening) - 用于移除微小噪点
+                processed_img = cv2.morphologyEx(processed_img, cv2.MORPH_OPEN, kernel)
+            else:  # 闭操作 (Closing) - 用于连接大块区域
+                processed_img = cv2.morphologyEx(processed_img, cv2.MORPH_CLOSE, kernel)
 
-        # 3. 生成主输出图像 (用于下一阶段和最终保存)
-        main_result_image = processed_img.copy()
-        if params.enable_smart_noise_removal and small_noise_contours:
-            # 在主输出图像上真正移除噪点 (涂白)
-            cv2.drawContours(main_result_image, small_noise_contours, -1, 255, thickness=cv2.FILLED)
-        if params.confirm_large_noise_removal and large_noise_contours:
-            # 在主输出图像上真正移除大型噪点 (涂白)
-            cv2.drawContours(main_result_image, large_noise_contours, -1, 255, thickness=cv2.FILLED)
+        if params.dilate:
+            kernel_size = params.dilate_ksize | 1
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
+            processed_img = cv2.dilate(processed_img, kernel, iterations=1)
 
-        # 4. 生成预览图像 (用于UI显示)
-        # 检查是否有任何需要预览的内容
-        is_small_noise_preview = params.enable_smart_noise_removal and small_noise_contours
-        is_large_noise_preview = params.preview_large_noise and large_noise_contours
+        return processed_img
 
-        if not is_small_noise_preview and not is_large_noise_preview:
-            # 如果没有任何需要预览的，预览图就等于最终结果图
-            preview_image = main_result_image
-        else:
-            # 如果需要预览，则在原始二值化图上绘制高亮框
-            preview_image = cv2.cvtColor(processed_img, cv2.COLOR_GRAY2BGR)
-            if is_small_noise_preview:
-                cv2.drawContours(preview_image, small_noise_contours, -1, (0, 255, 0), 1) # Green
-            if is_large_noise_preview:
-                cv2.drawContours(preview_image, large_noise_contours, -1, (0, 0, 255), 1) # Red
+    @staticmethod
+    def _morphology_margin(params: ProcessingParameters):
+        # 开/闭运算是腐蚀+膨胀两次邻域操作，因此半径计两次
+        margin = 0
+        if params.morph:
+            margin += 2 * ((params.morph_ksize | 1) // 2)
+        if params.dilate:
+            margin += (params.dilate_ksize | 1) // 2
+        return margin
 
-        return preview_image, main_result_image, None, None, None, None
+    @staticmethod
+    def find_small_noise_contours(inverted_img, sample_char_height, noise_size_limit_percent):
+        # 查找面积小于 (标准字高度 * 百分比)² 的轮廓。inverted_img 为黑底白字的反色图。
+        if sample_char_height <= 0 or noise_size_limit_percent <= 0:
+            return []
+        max_side_length = sample_char_height * (noise_size_limit_percent / 100.0)
+        area_threshold = max_side_length * max_side_length
+        contours, _ = cv2.findContours(inverted_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return [cnt for cnt in contours if cv2.contourArea(cnt) < area_threshold]
+
+    @staticmethod
+    def find_large_noise_contours(inverted_img, sample_char_height, morph_ksize):
+        # 先用开运算剥离细小连接，找到面积远大于标准字的“种子”，再映射回原始轮廓。
+        if sample_char_height <= 0:
+            return []
+        large_area_thresh = (sample_char_height ** 2) * 1.5
+        full_contours, _ = cv2.findContours(inverted_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        ksize = morph_ksize | 1
+        large_kernel = np.ones((ksize, ksize), np.uint8)
+        image_for_analysis = cv2.morphologyEx(inverted_img, cv2.MORPH_OPEN, large_kernel)
+        robust_contours, _ = cv2.findContours(image_for_analysis, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        robust_noise_seeds = [cnt for cnt in robust_contours if cv2.contourArea(cnt) > large_area_thresh]
+
+        final_large_noise_indices = set()
+        for seed_contour in robust_noise_seeds:
+            M = cv2.moments(seed_contour)
+            if M["m00"] == 0: continue
+            cx = int(M["m10"] / M["m00"])
+            cy = int(M["m01"] / M["m00"])
+            for i, full_contour in enumerate(full_contours):
+                if cv2.pointPolygonTest(full_contour, (cx, cy), False) >= 0:
+                    final_large_noise_indices.add(i)
+                    break
+        return [full_contours[i] for i in sorted(final_large_noise_indices)]
 
     def apply_stage3_noise_removal(self, image, params: ProcessingParameters):
 
@@ -225,24 +379,18 @@ class OpenCVOperations:
             processed_img = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
             _, processed_img = cv2.threshold(processed_img, 127, 255, cv2.THRESH_BINARY)
 
-        if params.morph:
-            kernel_size = params.morph_ksize | 1
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
-
-            if params.morph_op == 0:  # 开操作 (Opening) - 用于移除微小噪点
-                processed_img = cv2.morphologyEx(processed_img, cv2.MORPH_OPEN, kernel)
-            else:  # 闭操作 (Closing) - 用于连接大块区域
-                processed_img = cv2.morphologyEx(processed_img, cv2.MORPH_CLOSE, kernel)
-
-        if params.dilate:
-            kernel_size = params.dilate_ksize | 1
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
-            processed_img = cv2.dilate(processed_img, kernel, iterations=1)
+        if params.morph or params.dilate:
+            if should_tile(processed_img.shape, self.tile_size):
+                processed_img = run_tiled(
+                    processed_img, lambda tile: self._apply_morphology(tile, params),
+                    self._morphology_margin(params), self.tile_size
+                )
+            else:
+                processed_img = self._apply_morphology(processed_img, params)
 
         filters = self._build_contour_filters(params, image.shape)
 
         if filters:
-            output_image = cv2.cvtColor(processed_img, cv2.COLOR_GRAY2BGR)
             inverted_for_contours = cv2.bitwise_not(processed_img)
             contours, _ = cv2.findContours(
                 inverted_for_contours, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
@@ -254,13 +402,12 @@ class OpenCVOperations:
                 if any(f(cnt) for f in filters):
                     noise_contours.append(cnt)
 
-            # 在预览图上画出被移除的轮廓
-            cv2.drawContours(output_image, noise_contours, -1, (0, 255, 0), 2)
-            # 在OCR图上真正地移除这些轮廓（涂白）
-            ocr_image = processed_img.copy()
-            cv2.drawContours(ocr_image, noise_contours, -1, 255, thickness=cv2.FILLED)
-
-            return output_image, ocr_image, None, None, None, None
+            if noise_contours:
+                # 被移除的轮廓作为叠加层显示在移除前的图上；在OCR图上真正地移除这些轮廓（涂白）
+                ocr_image = processed_img.copy()
+                cv2.drawContours(ocr_image, noise_contours, -1, 255, thickness=cv2.FILLED)
+                overlays = (contour_overlay(noise_contours, SMALL_NOISE_COLOR, 2),)
+                return processed_img, ocr_image, None, None, None, overlays
 
         return processed_img, processed_img, None, None, None, None
 
@@ -324,22 +471,84 @@ class OpenCVOperations:
         return len(approx) < min_vertex_count
 
 
-def convert_cv_to_qpixmap(cv_img):
-    
-    if cv_img is None:
-        return None
-    height, width = cv_img.shape[:2]
-    if len(cv_img.shape) == 2:  # Grayscale
-        bytes_per_line = width
-        q_img = QImage(
-            cv_img.data, width, height, bytes_per_line, QImage.Format_Grayscale8
-        )
-    else:  # BGR
-        bytes_per_line = 3 * width
-        q_img = QImage(
-            cv_img.data, width, height, bytes_per_line, QImage.Format_BGR888
-        )
-    return QPixmap.fromImage(q_img)
+def work_area_bounds(work_areas, image_shape):
+    # 计算所有工作区的理论最小外包矩形（基于用户输入的“逻辑”边界），
+    # 再裁剪到图像的实际尺寸内，返回 (min_x, min_y, max_x, max_y)。
+    img_h, img_w = image_shape[:2]
+    min_x = max(0, min(r[0] for r in work_areas))
+    min_y = max(0, min(r[1] for r in work_areas))
+    max_x = min(img_w, max(r[0] + r[2] for r in work_areas))
+    max_y = min(img_h, max(r[1] + r[3] for r in work_areas))
+    return min_x, min_y, max_x, max_y
+
+def extract_work_areas(image, work_areas, bounds):
+    # 从图像中提取工作区：结果只包含 bounds 范围内的像素，工作区之外涂白。
+    # bounds 为 (min_x, min_y, max_x, max_y)，已裁剪到图像尺寸内。
+    # 工作区边界与 cv2.rectangle 填充保持一致（右下角包含在内）。
+    min_x, min_y, max_x, max_y = bounds
+    if max_x <= min_x or max_y <= min_y:
+        # 没有任何工作区落在图像内，整幅图都在蒙版外
+        return np.full_like(image, 255)
+
+    crop_shape = (max_y - min_y, max_x - min_x) + image.shape[2:]
+    result = np.full(crop_shape, 255, dtype=image.dtype)
+    for x, y, w, h in work_areas:
+        x0, y0 = max(x, min_x), max(y, min_y)
+        x1, y1 = min(x + w + 1, max_x), min(y + h + 1, max_y)
+        if x1 > x0 and y1 > y0:
+            result[y0 - min_y:y1 - min_y, x0 - min_x:x1 - min_x] = image[y0:y1, x0:x1]
+    return result
+
+def local_mean_std(gray, window):
+    # 利用积分图 (和 与 平方和) 计算每个像素 window x window 邻域的均值和标准差。
+    # 每个像素的代价是 O(1)，与窗口大小无关；图像边缘的窗口裁剪到图像范围内。
+    h, w = gray.shape[:2]
+    r = window // 2
+    integral_sum, integral_sqsum = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    # 积分图四周按边缘值扩展 r 个像素后，裁剪窗口的四个角点都能用切片取到，无需花式索引
+    rows = np.arange(h)
+    cols = np.arange(w)
+    count = ((np.minimum(rows + r + 1, h) - np.maximum(rows - r, 0))[:, None]
+             * (np.minimum(cols + r + 1, w) - np.maximum(cols - r, 0))[None, :])
+
+    def box_sum(integral):
+        padded = np.pad(integral, r, mode='edge')
+        row_band = padded[2 * r + 1:2 * r + 1 + h] - padded[:h]
+        return row_band[:, 2 * r + 1:2 * r + 1 + w] - row_band[:, :w]
+
+    # 和/平方和的差分必须用 float64 保证精度，除以像素数之后用 float32 即可
+    mean = (box_sum(integral_sum) / count).astype(np.float32)
+    variance = (box_sum(integral_sqsum) / count).astype(np.float32)
+    variance -= mean * mean
+    std = np.sqrt(np.maximum(variance, 0.0, out=variance), out=variance)
+    return mean, std
+
+
+def _binary_from_threshold(gray, thresh):
+    # 与 cv2.THRESH_BINARY 一致：大于阈值为 255，否则为 0
+    return np.greater(gray, thresh).view(np.uint8) * np.uint8(255)
+
+
+def sauvola_threshold(gray, window, k):
+    # Sauvola 局部阈值: T = m * (1 + k * (s / R - 1))
+    mean, std = local_mean_std(gray, window)
+    thresh = mean * (1.0 + k * (std / SAUVOLA_DYNAMIC_RANGE - 1.0))
+    return _binary_from_threshold(gray, thresh)
+
+
+def wolf_threshold(gray, window, k):
+    # Wolf-Jolion 局部阈值: T = (1 - k) * m + k * M + k * (s / R) * (m - M)
+    # 其中 M 为整幅图像的最小灰度，R 为所有窗口标准差的最大值。
+    mean, std = local_mean_std(gray, window)
+    min_gray = float(gray.min())
+    max_std = float(std.max())
+    if max_std > 0:
+        thresh = (1.0 - k) * mean + k * min_gray + k * (std / max_std) * (mean - min_gray)
+    else:
+        thresh = mean
+    return _binary_from_threshold(gray, thresh)
+
 
 def rotate_image(image, angle_degrees):
     
@@ -0,0 +1,31 @@
+# src/core/overlay.py
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# 预览叠加层的颜色 (R, G, B)
+SMALL_NOISE_COLOR = (0, 255, 0)   # 绿色：小型噪点 / 第三阶段移除的轮廓
+LARGE_NOISE_COLOR = (255, 0, 0)   # 红色：大型噪点
+
+
+@dataclass(frozen=True, eq=False)
+class OverlayLayer:
+    # 叠加在预览图上的一组轮廓线（图像坐标），由界面按当前缩放比例以矢量方式绘制。
+    # 代替原先转换为BGR图再用 cv2.drawContours 画上去的预览图：不再需要额外的3通道整图。
+    polylines: tuple          # 每条为 (N, 2) int32 数组，闭合
+    bounds: np.ndarray        # (len(polylines), 4) 的外接矩形 x, y, w, h，用于只绘制可见部分
+    color: tuple = SMALL_NOISE_COLOR
+    width: int = 1            # 线宽（图像像素）
+
+    def __len__(self):
+        return len(self.polylines)
+
+
+def contour_overlay(contours, color, width=1):
+    # 由 cv2.findContours 的结果生成叠加层；没有轮廓时返回 None
+    if not contours:
+        return None
+    polylines = tuple(np.ascontiguousarray(cnt.reshape(-1, 2), dtype=np.int32) for cnt in contours)
+    bounds = np.array([cv2.boundingRect(cnt) for cnt in contours], dtype=np.int32).reshape(-1, 4)
+    return OverlayLayer(polylines, bounds, color, width)
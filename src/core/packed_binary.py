@@ -0,0 +1,57 @@
+# src/core/packed_binary.py
+import numpy as np
+
+
+class PackedBinaryImage:
+    # 二值图像 (0/255 的 uint8) 的按位压缩表示，每像素只占 1 bit，内存和传输量是原图的 1/8。
+    # 只在需要完整字节的边界（OpenCV运算、显示、OCR、编码写盘）才通过 unpack() 还原。
+    # 对象只包含一个小的 uint8 数组和尺寸，可直接 pickle，适合在批处理进程之间传递。
+    __slots__ = ("bits", "shape")
+
+    def __init__(self, bits, shape):
+        self.bits = bits
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_array(cls, image):
+        # 按行压缩，非零像素记为 1
+        return cls(np.packbits(image != 0, axis=1), image.shape)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def unpack(self):
+        bits = np.unpackbits(self.bits, axis=1, count=self.shape[1])
+        return np.multiply(bits, 255, out=bits)
+
+    def __getstate__(self):
+        return self.bits, self.shape
+
+    def __setstate__(self, state):
+        self.bits, self.shape = state
+
+
+def is_binary_image(image):
+    # 单通道且只含 0/255 两种值
+    if not isinstance(image, np.ndarray) or image.ndim != 2 or image.dtype != np.uint8:
+        return False
+    return not np.any((image != 0) & (image != 255))
+
+
+def pack_if_binary(image):
+    # 二值图返回压缩表示，其他图像原样返回
+    if is_binary_image(image):
+        return PackedBinaryImage.from_array(image)
+    return image
+
+
+def as_array(image):
+    # 边界转换：无论传入的是压缩表示还是普通数组，都返回 numpy 数组
+    if isinstance(image, PackedBinaryImage):
+        return image.unpack()
+    return image
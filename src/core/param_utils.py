@@ -1,4 +1,5 @@
 # src/core/param_utils.py
+import math
 
 def serialize_rect_list(rect_list):
     if not rect_list:
@@ -37,3 +38,12 @@ def deserialize_point_list(point_str):
         except (ValueError, IndexError):
             continue
     return point_list
+
+def normalize_angle(angle):
+    # 旋转角度是累加的（例如多次两点校正后可能为 270°），换算到 (-180, 180]
+    angle = math.fmod(angle, 360.0)
+    if angle > 180.0:
+        angle -= 360.0
+    elif angle <= -180.0:
+        angle += 360.0
+    return angle
@@ -0,0 +1,89 @@
+# src/core/param_writer.py
+import copy
+import threading
+import time
+
+# 参数保存的合并窗口（秒）。窗口内的多次修改只会写一次。
+DEFAULT_SAVE_DELAY = 0.5
+
+
+class ParamSaveQueue:
+    # 参数的延迟合并保存 (debounce)。
+    # - 同一张图片在窗口内的多次保存请求只保留最新的参数快照，最后一次请求之后 delay 秒才真正写入；
+    # - 写入在后台线程执行，界面交互不再等待文件或数据库写入；
+    # - 切换图片、切换工程和退出程序时调用 flush() 立即写入所有待保存的参数。
+    # 提交时保存参数的深拷贝，GUI线程之后对参数对象的修改不会与后台写入产生竞争。
+
+    def __init__(self, delay=DEFAULT_SAVE_DELAY):
+        self.delay = delay
+        self._pending = {}        # key -> (params快照, write_func)
+        self._deadline = None     # 最近一次提交后的写入时间点
+        self._writing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="ParamSaveQueue", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, params, write_func):
+        # 提交一次保存。write_func(params) 负责真正的写入。
+        snapshot = copy.deepcopy(params)
+        with self._cond:
+            self._pending[key] = (snapshot, write_func)
+            self._deadline = time.monotonic() + self.delay
+            self._cond.notify_all()
+
+    def flush(self):
+        # 立即写入所有待保存的参数，并等待后台线程中正在进行的写入完成
+        with self._cond:
+            items = self._take_pending()
+        self._write_items(items)
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._deadline is not None:
+                        remaining = self._deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+                items = self._take_pending()
+            self._write_items(items)
+
+    def _take_pending(self):
+        # 调用时须持有 self._cond。等待正在进行的写入完成后取出所有待保存的参数，并标记为正在写入：
+        # flush() 和后台线程的写入因此严格串行，较早的快照不会在较新的快照之后写入。
+        while self._writing:
+            self._cond.wait()
+        items = list(self._pending.items())
+        self._pending.clear()
+        self._deadline = None
+        self._writing = True
+        return items
+
+    def _write_items(self, items):
+        try:
+            self._write_all(items)
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    @staticmethod
+    def _write_all(items):
+        for key, (params, write_func) in items:
+            try:
+                write_func(params)
+            except Exception as e:
+                print(f"无法保存参数 {key}: {e}")
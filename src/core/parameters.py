@@ -33,6 +33,7 @@ class ProcessingParameters:
     thresh_value: int = 127
     thresh_blocksize: int = 11
     thresh_c: int = 2
+    thresh_k: float = 0.2                 # Sensitivity k for Sauvola / Wolf thresholding
 
     # --- Stage 3: Noise Removal ---
     morph: bool = False
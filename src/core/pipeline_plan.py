@@ -0,0 +1,276 @@
+# src/core/pipeline_plan.py
+import functools
+
+import cv2
+
+from .opencv_operations import (
+    OpenCVOperations, apply_perspective_transform, rotate_image,
+    work_area_bounds, extract_work_areas, sauvola_threshold, wolf_threshold
+)
+from .param_utils import deserialize_rect_list, deserialize_point_list
+from .parameters import ProcessingParameters
+from .tiled_processing import should_tile, run_tiled
+from .packed_binary import pack_if_binary
+
+# 影响 process_fully 输出的参数。导航、视图状态、派生坐标以及仅用于预览的开关都不参与编译，
+# 这样它们的变化不会导致重新编译执行计划。
+_PLAN_FIELDS = (
+    # Stage 1
+    'perspective_points', 'rotation_angle', 'work_areas',
+    # Stage 2
+    'blur_ksize', 'thresh_method', 'thresh_value', 'thresh_blocksize', 'thresh_c', 'thresh_k',
+    'enable_smart_noise_removal', 'noise_size_limit_percent', 'sample_char_height',
+    'confirm_large_noise_removal', 'large_noise_morph_ksize',
+    # Stage 3
+    'morph', 'morph_op', 'morph_ksize', 'dilate', 'dilate_ksize',
+    'noise_removal', 'large_noise_area_thresh',
+    'filter_by_aspect_ratio', 'min_aspect_ratio', 'max_aspect_ratio',
+    'filter_by_convexity', 'min_convexity_ratio',
+    'filter_by_vertices', 'vertex_count',
+)
+
+_PLAN_CACHE_SIZE = 64
+
+
+class ProcessingPlan:
+    # 由 ProcessingParameters 编译得到的完整流水线 (阶段1-3) 执行计划。
+    # 编译时剔除所有空操作步骤，运行时只执行剩下的步骤，并且只在计划自己分配的缓冲区上原地修改，
+    # 调用者传入的图像永远不会被改写。
+    # 每个步骤的签名为 step(image, owned, debug_info) -> (image, owned)，
+    # owned 表示 image 是否为计划内部新分配、可以原地修改的缓冲区。
+
+    def __init__(self, params: ProcessingParameters, tile_size=None):
+        self.steps = []
+        self.tile_size = tile_size
+        self._compile_stage1(params)
+        self._compile_stage2(params)
+        self._compile_stage3(params)
+        if tile_size:
+            self.steps = self._fuse_local_steps(self.steps)
+
+    @property
+    def step_names(self):
+        return [step.__name__ for step in self.steps]
+
+    def run(self, image, debug_info=None, pack=False):
+        # pack=True 时二值结果以 PackedBinaryImage 返回，便于缓存和跨进程传递
+        if image is None:
+            return None
+        owned = False
+        for step in self.steps:
+            image, owned = step(image, owned, debug_info)
+        if pack:
+            return pack_if_binary(image)
+        # 保证返回值与输入不共享内存，与原先逐阶段处理的语义一致
+        return image if owned else image.copy()
+
+    def _fuse_local_steps(self, steps):
+        # 将连续的局部步骤（逐像素或固定邻域）合并为一个分块并行步骤，
+        # 重叠边距取这些步骤邻域半径之和，保证结果无接缝。
+        fused = []
+        local_run = []
+        for step in steps + [None]:
+            if step is not None and hasattr(step, 'margin'):
+                local_run.append(step)
+                continue
+            if len(local_run) > 1:
+                fused.append(self._tiled(local_run))
+            else:
+                fused.extend(local_run)
+            local_run = []
+            if step is not None:
+                fused.append(step)
+        return fused
+
+    def _tiled(self, local_steps):
+        tile_size = self.tile_size
+        margin = sum(step.margin for step in local_steps)
+
+        def run_chain(image, owned, debug_info):
+            for step in local_steps:
+                image, owned = step(image, owned, debug_info)
+            return image, owned
+
+        def tiled(image, owned, debug_info):
+            if not should_tile(image.shape, tile_size):
+                return run_chain(image, owned, debug_info)
+            return run_tiled(image, lambda tile: run_chain(tile, False, debug_info)[0], margin, tile_size), True
+        tiled.__name__ = "tiled(" + ", ".join(step.__name__ for step in local_steps) + ")"
+        return tiled
+
+    # --- Stage 1: 几何校正 ---
+    def _compile_stage1(self, params):
+        perspective_points = deserialize_point_list(params.perspective_points)
+        if len(perspective_points) == 4:
+            def perspective(image, owned, debug_info):
+                return apply_perspective_transform(image, perspective_points, debug_info), True
+            self.steps.append(perspective)
+
+        rotation_angle = params.rotation_angle
+        if rotation_angle != 0.0:
+            def rotation(image, owned, debug_info):
+                return rotate_image(image, rotation_angle), True
+            self.steps.append(rotation)
+
+        work_areas = deserialize_rect_list(params.work_areas)
+        if work_areas:
+            def work_area(image, owned, debug_info):
+                bounds = work_area_bounds(work_areas, image.shape)
+                return extract_work_areas(image, work_areas, bounds), True
+            self.steps.append(work_area)
+
+    # --- Stage 2: 二值化 ---
+    def _compile_stage2(self, params):
+        @_local(0)
+        def to_gray(image, owned, debug_info):
+            if image.ndim == 3:
+                return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), True
+            return image, owned
+        self.steps.append(to_gray)
+
+        ksize = params.blur_ksize | 1
+        if ksize > 1:
+            @_local(ksize // 2)
+            def blur(image, owned, debug_info):
+                return cv2.GaussianBlur(image, (ksize, ksize), 0, dst=_dst(image, owned)), True
+            self.steps.append(blur)
+
+        thresh_method = params.thresh_method
+        if thresh_method == "global":
+            thresh_value = params.thresh_value
+
+            @_local(0)
+            def global_threshold(image, owned, debug_info):
+                _, image = cv2.threshold(image, thresh_value, 255, cv2.THRESH_BINARY, dst=_dst(image, owned))
+                return image, True
+            self.steps.append(global_threshold)
+        elif thresh_method == "adaptive":
+            block_size = params.thresh_blocksize | 1
+            c_val = params.thresh_c
+
+            @_local(block_size // 2)
+            def adaptive_threshold(image, owned, debug_info):
+                image = cv2.adaptiveThreshold(
+                    image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                    block_size, c_val, dst=_dst(image, owned)
+                )
+                return image, True
+            self.steps.append(adaptive_threshold)
+        elif thresh_method == "otsu":
+            def otsu_threshold(image, owned, debug_info):
+                _, image = cv2.threshold(
+                    image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=_dst(image, owned)
+                )
+                return image, True
+            self.steps.append(otsu_threshold)
+        elif thresh_method == "sauvola":
+            window = params.thresh_blocksize | 1
+            thresh_k = params.thresh_k
+
+            @_local(window // 2)
+            def sauvola(image, owned, debug_info):
+                return sauvola_threshold(image, window, thresh_k), True
+            self.steps.append(sauvola)
+        elif thresh_method == "wolf":
+            window = params.thresh_blocksize | 1
+            thresh_k = params.thresh_k
+
+            def wolf(image, owned, debug_info):
+                return wolf_threshold(image, window, thresh_k), True
+            self.steps.append(wolf)
+
+        remove_small = (params.enable_smart_noise_removal and params.sample_char_height > 0
+                        and params.noise_size_limit_percent > 0)
+        remove_large = params.confirm_large_noise_removal and params.sample_char_height > 0
+        if remove_small or remove_large:
+            sample_char_height = params.sample_char_height
+            noise_size_limit_percent = params.noise_size_limit_percent
+            large_noise_morph_ksize = params.large_noise_morph_ksize
+
+            def smart_noise_removal(image, owned, debug_info):
+                # 两类噪点都在涂白之前的同一幅二值图上查找，与 apply_stage2_binarization 保持一致
+                inverted_img = cv2.bitwise_not(image)
+                noise_contours = []
+                if remove_small:
+                    noise_contours += OpenCVOperations.find_small_noise_contours(
+                        inverted_img, sample_char_height, noise_size_limit_percent
+                    )
+                if remove_large:
+                    noise_contours += OpenCVOperations.find_large_noise_contours(
+                        inverted_img, sample_char_height, large_noise_morph_ksize
+                    )
+                if not noise_contours:
+                    return image, owned
+                if not owned:
+                    image = image.copy()
+                cv2.drawContours(image, noise_contours, -1, 255, thickness=cv2.FILLED)
+                return image, True
+            self.steps.append(smart_noise_removal)
+
+    # --- Stage 3: 降噪 ---
+    def _compile_stage3(self, params):
+        # 阶段2的输出已经是单通道图，阶段3中 灰度->BGR->灰度->阈值 的转换在这里全部省略。
+        if params.morph:
+            morph_ksize = params.morph_ksize | 1
+            morph_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (morph_ksize, morph_ksize))
+            op = cv2.MORPH_OPEN if params.morph_op == 0 else cv2.MORPH_CLOSE
+
+            # 开/闭运算是腐蚀+膨胀两次邻域操作。
+            # 核通过默认参数在编译时绑定：同时启用膨胀时，闭包不会取到之后创建的膨胀核。
+            @_local(2 * (morph_ksize // 2))
+            def morphology(image, owned, debug_info, op=op, kernel=morph_kernel):
+                return cv2.morphologyEx(image, op, kernel, dst=_dst(image, owned)), True
+            self.steps.append(morphology)
+
+        if params.dilate:
+            dilate_ksize = params.dilate_ksize | 1
+            dilate_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (dilate_ksize, dilate_ksize))
+
+            @_local(dilate_ksize // 2)
+            def dilate(image, owned, debug_info, kernel=dilate_kernel):
+                return cv2.dilate(image, kernel, dst=_dst(image, owned), iterations=1), True
+            self.steps.append(dilate)
+
+        filters = OpenCVOperations._build_contour_filters(params, None)
+        if filters:
+            def contour_filter(image, owned, debug_info):
+                contours, _ = cv2.findContours(
+                    cv2.bitwise_not(image), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+                )
+                noise_contours = [cnt for cnt in contours if any(f(cnt) for f in filters)]
+                if not noise_contours:
+                    return image, owned
+                if not owned:
+                    image = image.copy()
+                cv2.drawContours(image, noise_contours, -1, 255, thickness=cv2.FILLED)
+                return image, True
+            self.steps.append(contour_filter)
+
+
+def _local(margin):
+    # 标记一个步骤为局部操作：输出像素只依赖输入中半径 margin 以内的像素
+    def decorator(step):
+        step.margin = margin
+        return step
+    return decorator
+
+
+def _dst(image, owned):
+    # 输入是计划自己的缓冲区时原地写回，否则让 OpenCV 分配新的输出
+    return image if owned else None
+
+
+def plan_key(params: ProcessingParameters):
+    return tuple(getattr(params, name) for name in _PLAN_FIELDS)
+
+
+@functools.lru_cache(maxsize=_PLAN_CACHE_SIZE)
+def _compile_plan_for_key(key, tile_size):
+    params = ProcessingParameters(**dict(zip(_PLAN_FIELDS, key)))
+    return ProcessingPlan(params, tile_size=tile_size)
+
+
+def compile_plan(params: ProcessingParameters, tile_size=None) -> ProcessingPlan:
+    # 编译（或从缓存中取出）与这组参数对应的执行计划。参数相同的图像共享同一个计划。
+    # tile_size 不为 None 时，阶段2/3中连续的局部操作会对大图分块并行执行。
+    return _compile_plan_for_key(plan_key(params), tile_size)
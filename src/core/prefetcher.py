@@ -0,0 +1,212 @@
+# src/core/prefetcher.py
+import dataclasses
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .packed_binary import PackedBinaryImage, pack_if_binary, as_array
+from .parameters import ProcessingParameters
+
+# 预取的邻近图片数（前后各 K 张）
+DEFAULT_PREFETCH_RADIUS = 2
+# 预取缓存的内存上限（字节）
+DEFAULT_PREFETCH_BUDGET = 512 * 1024 * 1024
+
+
+def params_signature(params: ProcessingParameters):
+    # 参数中影响处理结果的部分；视图状态（缩放、滚动）不影响结果，不参与比较
+    return tuple(
+        getattr(params, f.name) for f in dataclasses.fields(params) if f.name != "view_states"
+    )
+
+
+def _image_nbytes(image):
+    if isinstance(image, (np.ndarray, PackedBinaryImage)):
+        return image.nbytes
+    return 0
+
+
+@dataclasses.dataclass
+class PrefetchEntry:
+    # 一张图片的预取结果：解码后的原图，以及按当时参数处理当前阶段得到的结果
+    original_image: object
+    signature: tuple = None
+    stage_index: int = -1
+    result: tuple = None      # image_pipeline.process 的返回值，主结果为二值图时按位压缩保存
+
+    @property
+    def nbytes(self):
+        total = _image_nbytes(self.original_image)
+        if self.result is not None:
+            preview, main = self.result[0], self.result[1]
+            total += _image_nbytes(preview)
+            if main is not preview:
+                total += _image_nbytes(main)
+        return total
+
+    def result_for(self, params: ProcessingParameters):
+        # 参数和阶段都与预取时一致时返回处理结果，否则返回 None
+        if self.result is None or self.stage_index != params.current_stage:
+            return None
+        if self.signature != params_signature(params):
+            return None
+        preview, main = self.result[0], self.result[1]
+        main = preview if main is preview else as_array(main)
+        return (preview, main) + tuple(self.result[2:])
+
+
+class NeighbourPrefetcher:
+    # 图片导航的后台预取。
+    # 当前图片显示之后，在后台线程中依次为前后 K 张图片解码原图并预先执行其当前阶段的流水线，
+    # 结果放入一个按内存上限淘汰的 LRU 缓存。切换到相邻图片时可以直接显示，不必等待解码和处理。
+    # 新的预取请求会取代尚未完成的旧请求；缓存中的结果在使用时会与最新参数比较，参数变化后只复用原图。
+
+    def __init__(self, project_manager, image_pipeline, radius=DEFAULT_PREFETCH_RADIUS,
+                 max_bytes=DEFAULT_PREFETCH_BUDGET):
+        self.project_manager = project_manager
+        self.image_pipeline = image_pipeline
+        self.radius = radius
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()   # identifier -> PrefetchEntry
+        self._cache_bytes = 0
+        self._targets = []
+        self._epoch = 0               # 切换工程（清空缓存）时递增，之前开始的预取结果作废
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="NeighbourPrefetcher", daemon=True)
+        self._thread.start()
+
+    def neighbours(self, file_list, index):
+        # 按距离由近到远排列的邻近图片：index+1, index-1, index+2, index-2 ...
+        result = []
+        for distance in range(1, self.radius + 1):
+            for i in (index + distance, index - distance):
+                if 0 <= i < len(file_list):
+                    result.append(file_list[i])
+        return result
+
+    def prefetch(self, identifiers):
+        # 替换预取目标；旧的未完成请求被放弃
+        with self._cond:
+            self._targets = list(identifiers)
+            self._cond.notify_all()
+
+    def get(self, identifier):
+        # 取出缓存的预取结果（同时标记为最近使用），没有则返回 None
+        with self._cond:
+            entry = self._cache.get(identifier)
+            if entry is not None:
+                self._cache.move_to_end(identifier)
+            return entry
+
+    def remember(self, identifier, original_image, params: ProcessingParameters = None, result=None):
+        # 把已经在GUI线程中得到的结果放入缓存（例如离开当前图片时），返回该图片时无需重新解码
+        if original_image is None:
+            return
+        entry = PrefetchEntry(original_image)
+        if params is not None and result is not None:
+            entry.signature = params_signature(params)
+            entry.stage_index = params.current_stage
+            entry.result = self._compact_result(result)
+        self._put(identifier, entry)
+
+    def invalidate(self, identifier=None):
+        # 丢弃缓存（identifier 为 None 时全部丢弃），例如切换工程或文件被修改时。
+        # 正在进行的预取可能读到了旧文件，其结果同样作废。
+        with self._cond:
+            self._epoch += 1
+            if identifier is None:
+                self._cache.clear()
+                self._cache_bytes = 0
+                self._targets = []
+            else:
+                entry = self._cache.pop(identifier, None)
+                if entry is not None:
+                    self._cache_bytes -= entry.nbytes
+
+    @property
+    def nbytes(self):
+        with self._cond:
+            return self._cache_bytes
+
+    def release(self, nbytes):
+        # 按最近使用顺序淘汰，直到释放至少 nbytes 字节（供 MemoryBudget 调用），返回实际释放的字节数
+        freed = 0
+        with self._cond:
+            while self._cache and freed < nbytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.nbytes
+                freed += evicted.nbytes
+        return freed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _put(self, identifier, entry):
+        with self._cond:
+            old = self._cache.pop(identifier, None)
+            if old is not None:
+                self._cache_bytes -= old.nbytes
+            self._cache[identifier] = entry
+            self._cache_bytes += entry.nbytes
+            # 按最近使用顺序淘汰，刚放入的条目总是保留
+            while self._cache_bytes > self.max_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.nbytes
+
+    @staticmethod
+    def _compact_result(result):
+        preview, main = result[0], result[1]
+        if main is not preview:
+            main = pack_if_binary(main)
+        return (preview, main) + tuple(result[2:])
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._targets and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                identifier = self._targets.pop(0)
+                epoch = self._epoch
+                cached = self._cache.get(identifier)
+
+            try:
+                entry = self._build_entry(identifier, cached)
+            except Exception as e:
+                print(f"预取失败 {identifier}: {e}")
+                entry = None
+
+            if entry is not None:
+                with self._cond:
+                    # 预取期间工程被切换或缓存被作废时，结果作废
+                    if epoch != self._epoch:
+                        continue
+                self._put(identifier, entry)
+
+    def _build_entry(self, identifier, cached):
+        params = ProcessingParameters.from_dict(self.project_manager.load_params_for_image(identifier))
+        if cached is not None and cached.result_for(params) is not None:
+            return None  # 已有可用结果
+
+        original = cached.original_image if cached is not None else None
+        if original is None:
+            original = self.image_pipeline.opencv_ops.load_raw_image(identifier)
+            if original is None:
+                return None
+
+        stage_index = params.current_stage
+        if stage_index == 0:
+            input_image = original
+        else:
+            input_image = self.project_manager.load_stage_result(identifier, stage_index - 1)
+            if input_image is None:
+                input_image = original
+
+        result = self.image_pipeline.process(input_image, stage_index, params)
+        return PrefetchEntry(original, params_signature(params), stage_index, self._compact_result(result))
@@ -0,0 +1,348 @@
+# src/core/project_index.py
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from .ini_manager import IniManager
+from .parameters import ProcessingParameters
+
+# 工程级索引数据库，位于工程文件夹根目录，取代每张图片 .files 目录下的 params.ini
+PROJECT_INDEX_FILE = "project_index.db"
+_SCHEMA_VERSION = "1"
+
+# to_dicts() 中 nav 分组里的视图状态键，例如 zoom_2 / h_scroll_2 / v_scroll_2
+_VIEW_STATE_KEY = re.compile(r"^(zoom|h_scroll|v_scroll)_(\d+)$")
+# 多页文件的参数文件带有 "p<页码>_" 前缀
+_PAGE_PARAM_FILE = re.compile(r"^p(\d+)_params\.ini$")
+# 参数键 -> INI 中所属的 section，导出时沿用 to_dicts() 的分组
+_SECTION_OF_KEY = {k: name for name, params in ProcessingParameters().to_dicts().items() for k in params}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS image_params (
+    name TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (name, page)
+);
+CREATE TABLE IF NOT EXISTS view_states (
+    name TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    stage INTEGER NOT NULL,
+    zoom REAL NOT NULL,
+    h_scroll INTEGER NOT NULL,
+    v_scroll INTEGER NOT NULL,
+    PRIMARY KEY (name, page, stage)
+);
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    page_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS content_hashes (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stage_results (
+    name TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    stage INTEGER NOT NULL,
+    backend TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (name, page, stage)
+);
+"""
+
+
+def index_key(identifier):
+    # 索引中的图片键: (文件名, 页码)。只用文件名而不是绝对路径，工程文件夹整体移动后索引仍然有效。
+    return os.path.basename(identifier.path), identifier.page
+
+
+class ProjectIndex:
+    # 工程级 SQLite 索引 (WAL 模式)。
+    # 保存每张图片的处理参数、各阶段的视图状态、多页文件的页数、导入去重用的内容摘要以及阶段结果的元数据。
+    # 打开批处理时可以用一次查询读出全部图片的参数，不再为每张图片单独解析一个 INI 文件。
+    # 连接在GUI线程、批处理线程和阶段结果写回线程之间共享，所有访问都在锁内进行。
+
+    def __init__(self, project_path):
+        self.project_path = project_path
+        self.db_path = os.path.join(project_path, PROJECT_INDEX_FILE)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 已能保证数据库一致，只是断电时可能丢失最后几次提交
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (_SCHEMA_VERSION,)
+            )
+
+        # 首次打开旧工程时，透明地导入已有的 params.ini
+        if self._get_meta("ini_imported") is None:
+            imported = self.import_ini_layout()
+            self._set_meta("ini_imported", str(imported))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- 参数 ---
+
+    def has_params(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM image_params WHERE name = ? AND page = ?", key
+            ).fetchone()
+        return row is not None
+
+    def load_params(self, key):
+        # 返回与 IniManager.load_params 相同格式的扁平字典（值均为字符串），没有记录时返回空字典
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT params FROM image_params WHERE name = ? AND page = ?", key
+            ).fetchone()
+            if row is None:
+                return {}
+            view_rows = self._conn.execute(
+                "SELECT stage, zoom, h_scroll, v_scroll FROM view_states WHERE name = ? AND page = ?", key
+            ).fetchall()
+        params = json.loads(row[0])
+        for stage, zoom, h_scroll, v_scroll in view_rows:
+            params[f"zoom_{stage}"] = str(zoom)
+            params[f"h_scroll_{stage}"] = str(h_scroll)
+            params[f"v_scroll_{stage}"] = str(v_scroll)
+        return params
+
+    def load_all_params(self):
+        # 批处理用：一次查询读出所有图片的参数，返回 {(文件名, 页码): 扁平字典}。不包含视图状态。
+        with self._lock:
+            rows = self._conn.execute("SELECT name, page, params FROM image_params").fetchall()
+        return {(name, page): json.loads(params) for name, page, params in rows}
+
+    def save_params(self, key, sections):
+        # sections 与 ProcessingParameters.to_dicts() 的结构相同；视图状态单独存入 view_states 表
+        params, view_states = _split_view_states(sections)
+        data = json.dumps(params, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_params (name, page, params, updated) VALUES (?, ?, ?, ?)",
+                (*key, data, time.time())
+            )
+            self._conn.execute("DELETE FROM view_states WHERE name = ? AND page = ?", key)
+            self._conn.executemany(
+                "INSERT INTO view_states (name, page, stage, zoom, h_scroll, v_scroll) VALUES (?, ?, ?, ?, ?, ?)",
+                [(*key, stage, *state) for stage, state in sorted(view_states.items())]
+            )
+
+    # --- 文件页数 ---
+
+    def get_page_counts(self):
+        # 返回 {文件名: (大小, 修改时间, 页数)}
+        with self._lock:
+            rows = self._conn.execute("SELECT name, size, mtime, page_count FROM files").fetchall()
+        return {name: (size, mtime, page_count) for name, size, mtime, page_count in rows}
+
+    def set_page_counts(self, entries):
+        # entries: [(文件名, 大小, 修改时间, 页数), ...]
+        if not entries:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (name, size, mtime, page_count) VALUES (?, ?, ?, ?)", entries
+            )
+
+    # --- 文件内容摘要（导入去重用） ---
+
+    def get_content_hashes(self):
+        # 返回 {文件名: (大小, 修改时间, 摘要)}
+        with self._lock:
+            rows = self._conn.execute("SELECT name, size, mtime, hash FROM content_hashes").fetchall()
+        return {name: (size, mtime, digest) for name, size, mtime, digest in rows}
+
+    def set_content_hashes(self, hashes):
+        # hashes: {文件名: (大小, 修改时间, 摘要)}
+        if not hashes:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO content_hashes (name, size, mtime, hash) VALUES (?, ?, ?, ?)",
+                [(name, *entry) for name, entry in hashes.items()]
+            )
+
+    # --- 阶段结果元数据 ---
+
+    def record_stage_result(self, key, stage_index, backend_name, shape, dtype):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage_results (name, page, stage, backend, shape, dtype, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, stage_index, backend_name, ",".join(map(str, shape)), str(dtype), time.time())
+            )
+
+    def get_stage_result(self, key, stage_index):
+        # 返回 {"backend", "shape", "dtype", "updated"}，没有记录时返回 None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT backend, shape, dtype, updated FROM stage_results WHERE name = ? AND page = ? AND stage = ?",
+                (*key, stage_index)
+            ).fetchone()
+        if row is None:
+            return None
+        backend, shape, dtype, updated = row
+        return {
+            "backend": backend,
+            "shape": tuple(int(x) for x in shape.split(",") if x),
+            "dtype": dtype,
+            "updated": updated,
+        }
+
+    # --- INI 导入 / 导出 ---
+
+    def import_ini_layout(self, overwrite=False):
+        # 导入工程中已有的 <图片名>.files/[p<页码>_]params.ini。返回导入的条目数。
+        # 默认不覆盖索引中已有的记录。
+        ini_manager = IniManager()
+        imported = 0
+        for key, ini_path in _iter_param_files(self.project_path):
+            if not overwrite and self.has_params(key):
+                continue
+            params = ini_manager.load_params(ini_path)
+            if not params:
+                continue
+            self.save_params(key, _sections_from_flat(params))
+            imported += 1
+        return imported
+
+    def import_ini_file(self, key, ini_path):
+        # 单个条目的延迟导入：索引建立之后才复制进工程的 INI 文件
+        params = IniManager().load_params(ini_path)
+        if params:
+            self.save_params(key, _sections_from_flat(params))
+        return params
+
+    def export_ini_layout(self):
+        # 把索引中的全部参数写回旧的 per-image INI 布局，便于旧版本或外部工具读取。返回导出的条目数。
+        ini_manager = IniManager()
+        with self._lock:
+            keys = self._conn.execute("SELECT name, page FROM image_params").fetchall()
+        exported = 0
+        for name, page in keys:
+            params = self.load_params((name, page))
+            ini_path = param_ini_path(self.project_path, name, page)
+            os.makedirs(os.path.dirname(ini_path), exist_ok=True)
+            ini_manager.save_params(ini_path, _sections_from_flat(params))
+            exported += 1
+        return exported
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def param_ini_path(project_path, name, page):
+    # 旧布局中参数文件的位置，与 ImageDataStore 的 .files 目录规则一致
+    base_name, _ = os.path.splitext(name)
+    subfolder_path = os.path.join(project_path, f"{base_name}.files")
+    if page > -1:
+        return os.path.join(subfolder_path, f"p{page + 1}_params.ini")
+    return os.path.join(subfolder_path, "params.ini")
+
+
+def _iter_param_files(project_path):
+    # 遍历旧布局中的参数文件，返回 ((文件名, 页码), ini路径)。
+    # .files 目录名不含扩展名，因此需要在工程根目录中找到同名的图片文件。
+    images_by_stem = {}
+    for entry in sorted(os.scandir(project_path), key=lambda e: e.name):
+        if entry.is_file():
+            images_by_stem.setdefault(os.path.splitext(entry.name)[0], entry.name)
+
+    for entry in os.scandir(project_path):
+        if not (entry.is_dir() and entry.name.endswith(".files")):
+            continue
+        name = images_by_stem.get(entry.name[:-len(".files")])
+        if name is None:
+            continue
+        for file_entry in os.scandir(entry.path):
+            if file_entry.name == "params.ini":
+                yield (name, -1), file_entry.path
+            else:
+                match = _PAGE_PARAM_FILE.match(file_entry.name)
+                if match:
+                    yield (name, int(match.group(1)) - 1), file_entry.path
+
+
+def _sections_from_flat(params):
+    # 把扁平字典按 to_dicts() 的分组还原为 INI 的各个 section（读取时各 section 会被合并，分组只为保持文件可读）
+    sections = {name: {} for name in _SECTION_OF_KEY.values()}
+    for k, v in params.items():
+        if _VIEW_STATE_KEY.match(k):
+            sections["nav"][k] = v
+        else:
+            sections[_SECTION_OF_KEY.get(k, "image")][k] = v
+    return sections
+
+
+def _split_view_states(sections):
+    # 合并各 section 为扁平字典并取出视图状态，其余值统一转为字符串（与 INI 中保存的形式一致）
+    view_states = {}
+    params = {}
+    for section in sections.values():
+        for k, v in section.items():
+            match = _VIEW_STATE_KEY.match(k)
+            if match:
+                state = view_states.setdefault(int(match.group(2)), [1.0, 0, 0])
+                state[("zoom", "h_scroll", "v_scroll").index(match.group(1))] = v
+            elif k != "view_states":
+                # asdict() 会把 view_states 字段本身也带进来，它已经单独保存，不再重复存一份
+                params[k] = str(v)
+    return params, {stage: (float(z), int(h), int(v)) for stage, (z, h, v) in view_states.items()}
+
+
+def main(argv=None):
+    # 命令行工具: python -m core.project_index <工程路径> <import|export>
+    parser = argparse.ArgumentParser(description="在工程索引数据库与旧的 params.ini 布局之间导入导出参数")
+    parser.add_argument("project", help="工程文件夹路径")
+    parser.add_argument("action", choices=["import", "export"], help="import: INI -> 索引（覆盖）; export: 索引 -> INI")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.project):
+        print(f"错误: 工程路径不存在: {args.project}")
+        return 1
+    index = ProjectIndex(args.project)
+    try:
+        if args.action == "import":
+            count = index.import_ini_layout(overwrite=True)
+            print(f"已从 INI 导入 {count} 条参数记录。")
+        else:
+            count = index.export_ini_layout()
+            print(f"已导出 {count} 条参数记录到 INI。")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,138 +1,96 @@
 # project_manager.py
 
-import os
-import shutil
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
 
-import cv2
-from PIL import Image
-from PyQt5.QtCore import QObject, pyqtSignal
-
-from .image_data_store import ImageDataStore
-from .ini_manager import IniManager
 from .image_identifier import ImageIdentifier
+from .project_store import ProjectStore
 
 
 class ProjectManager(QObject):
-    
+    # ProjectStore 的Qt适配层：把 ProjectStore 的回调转换为Qt信号，并监视工程文件夹的变化。
+    # 工程数据的读写都在 ProjectStore 中实现，命令行和后台任务可以直接使用 ProjectStore。
+
     # Signals
     signal_projectmanager_project_activated = pyqtSignal(str, str)  # path, name
     signal_projectmanager_file_list_updated = pyqtSignal(list)
     signal_projectmanager_scan_finished = pyqtSignal(bool)  # True if files were found
+    # 增量扫描的结果：新增的条目, 删除的条目 (ImageIdentifier 列表)。file_list 已更新为最新状态。
+    signal_projectmanager_file_list_changed = pyqtSignal(list, list)
+    signal_projectmanager_import_progress = pyqtSignal(int, int, str)  # done, total, filename
+    # 内容可能已经变化的条目（文件被修改或删除）(ImageIdentifier 列表)
+    signal_projectmanager_files_modified = pyqtSignal(list)
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.project_path = None
-        self.file_list = []
-        self.ini_manager = IniManager()
+        self.store = ProjectStore()
+        self.store.on_project_activated = self.signal_projectmanager_project_activated.emit
+        self.store.on_file_list_updated = self.signal_projectmanager_file_list_updated.emit
+        self.store.on_scan_finished = self.signal_projectmanager_scan_finished.emit
+        self.store.on_file_list_changed = self.signal_projectmanager_file_list_changed.emit
+        self.store.on_import_progress = self.signal_projectmanager_import_progress.emit
+        self.store.on_files_modified = self.signal_projectmanager_files_modified.emit
+        # 监视工程文件夹（Linux 上基于 inotify），文件增删后自动增量刷新列表
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        self._rescan_timer = QTimer(self)
+        self._rescan_timer.setSingleShot(True)
+        self._rescan_timer.setInterval(300)
+        self._rescan_timer.timeout.connect(self.refresh_project_files)
+
+    @property
+    def project_path(self):
+        return self.store.project_path
+
+    @property
+    def file_list(self):
+        return self.store.file_list
 
     def activate_project(self, folder_path):
-        
-        if not folder_path or not os.path.isdir(folder_path):
-            # Silently fail. The caller (UI) is responsible for user feedback.
-            return
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        if self.store.activate_project(folder_path):
+            self.watcher.addPath(folder_path)
 
-        self.project_path = folder_path
-        self.signal_projectmanager_project_activated.emit(folder_path, os.path.basename(folder_path))
-        self.scan_project_files()
+    def _on_directory_changed(self, path):
+        # 文件系统的变化通常成批到达（例如复制多个文件），稍作等待后合并为一次增量扫描
+        self._rescan_timer.start()
 
     def import_images(self, source_files):
-        
-        if not self.project_path:
-            return False  # No active project
-
-        copied_something = False
-        for file_path in source_files:
-            try:
-                shutil.copy(file_path, self.project_path)
-                copied_something = True
-            except Exception as e:
-                # Log the error, but don't show a message box.
-                print(f"无法复制文件 {file_path}: {e}")
+        # 可以在工作线程中调用；导入完成后应在GUI线程调用 add_imported_files 更新文件列表
+        return self.store.import_images(source_files)
 
-        if copied_something:
-            self.scan_project_files()
-
-        return copied_something
+    def add_imported_files(self, names):
+        self.store.add_imported_files(names)
 
     def scan_project_files(self):
-        
-        if not self.project_path:
-            return
-
-        self.file_list = []
-        supported_formats = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
-
-        try:
-            filenames = sorted(os.listdir(self.project_path))
-        except FileNotFoundError:
-            print(f"错误: 工程路径不存在: {self.project_path}")
-            return
-
-        for f in filenames:
-            filepath = os.path.join(self.project_path, f)
-            # --- 关键修改：只将文件（而非文件夹）加入列表 ---
-            if os.path.isfile(filepath) and f.lower().endswith(supported_formats):
-                if f.lower().endswith((".tif", ".tiff")):
-                    try:
-                        with Image.open(filepath) as img:
-                            page_count = img.n_frames
-                            for i in range(page_count):
-                                self.file_list.append(ImageIdentifier(path=filepath, page=i))
-                    except Exception as e:
-                        print(f"无法读取多页TIFF文件 {f}: {e}")
-                        continue
-                else:
-                    self.file_list.append(ImageIdentifier(path=filepath, page=-1))
-
-        self.signal_projectmanager_file_list_updated.emit(self.file_list)
-        self.signal_projectmanager_scan_finished.emit(bool(self.file_list))
+        self.store.scan_project_files()
+
+    def refresh_project_files(self):
+        self.store.refresh_project_files()
 
     def load_params_for_image(self, identifier: ImageIdentifier):
-        
-        store = ImageDataStore(self.project_path, identifier, self.ini_manager)
-        return store.load_params()
+        return self.store.load_params_for_image(identifier)
+
+    def load_params_for_images(self, identifiers):
+        return self.store.load_params_for_images(identifiers)
 
     def save_parameters(self, identifier: ImageIdentifier, params):
-        
-        store = ImageDataStore(self.project_path, identifier, self.ini_manager)
-        store.save_params(params)
+        self.store.save_parameters(identifier, params)
+
+    def flush_parameters(self):
+        self.store.flush_parameters()
 
     def load_stage_result(self, identifier: ImageIdentifier, stage_index):
-        
-        store = ImageDataStore(self.project_path, identifier, self.ini_manager)
-        return store.load_stage_result(stage_index)
+        return self.store.load_stage_result(identifier, stage_index)
+
+    def save_stage_result(self, identifier: ImageIdentifier, stage_index, main_image_data):
+        self.store.save_stage_result(identifier, stage_index, main_image_data)
+
+    def flush_stage_results(self):
+        self.store.flush_stage_results()
 
-    def save_stage_result(self, identifier: ImageIdentifier, stage_index, main_image_data, preview_image_data=None):
-        
-        store = ImageDataStore(self.project_path, identifier, self.ini_manager)
-        store.save_stage_result(stage_index, main_image_data, preview_image_data)
+    def shutdown(self):
+        self.store.shutdown()
 
     def export_results_to_folder(self, output_folder, identifier: ImageIdentifier, processed_image, ocr_text, translated_text):
-        
-        if processed_image is None:
-            print(f"Warning: No processed image to save for {identifier}")
-            return False
-
-        # 1. 构造唯一的文件名
-        base_filename = os.path.basename(identifier.path)
-        name, ext = os.path.splitext(base_filename)
-
-        # 处理多页TIFF的文件名，确保唯一性
-        if identifier.page > -1:
-            name = f"p{identifier.page + 1}_{name}"
-
-        output_image_path = os.path.join(output_folder, f"{name}_processed{ext}")
-        output_text_path = os.path.join(output_folder, f"{name}_ocr.txt")
-        output_translated_path = os.path.join(output_folder, f"{name}_translated.txt")
-
-        # 2. 保存所有文件
-        try:
-            cv2.imwrite(output_image_path, processed_image)
-            with open(output_text_path, "w", encoding="utf-8") as f:
-                f.write(ocr_text)
-            with open(output_translated_path, "w", encoding="utf-8") as f:
-                f.write(translated_text)
-            return True
-        except Exception as e:
-            print(f"Error saving files for {identifier} to {output_folder}: {e}")
-            return False
+        return self.store.export_results_to_folder(output_folder, identifier, processed_image, ocr_text, translated_text)
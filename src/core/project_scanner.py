@@ -0,0 +1,124 @@
+# src/core/project_scanner.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .image_identifier import ImageIdentifier
+
+SUPPORTED_FORMATS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+MULTI_PAGE_FORMATS = (".tif", ".tiff")
+
+# 读取TIFF页数的最大线程数。打开文件主要是I/O（网络共享上尤其如此），线程数可以多于CPU核数。
+MAX_SCAN_WORKERS = 8
+
+
+def read_page_count(path):
+    # 打开TIFF读取页数，失败时返回 None
+    try:
+        with Image.open(path) as img:
+            return img.n_frames
+    except Exception as e:
+        print(f"无法读取多页TIFF文件 {os.path.basename(path)}: {e}")
+        return None
+
+
+def scan_directory(project_path, known_entries=None, max_workers=MAX_SCAN_WORKERS):
+    # 用 scandir 扫描工程根目录，返回 (entries, new_page_counts)。
+    # - entries: {文件名: (大小, 修改时间, 页数)}，单页格式的页数为 None，读取失败的TIFF不包含在内；
+    # - new_page_counts: 本次重新读取的TIFF页数 [(文件名, 大小, 修改时间, 页数)]，用于更新工程索引。
+    # known_entries 是上次的结果（或工程索引中的缓存），(大小, 修改时间) 不变的TIFF直接复用页数。
+    # 缓存未命中的TIFF由线程池并行打开。
+    stats = []
+    with os.scandir(project_path) as it:
+        for entry in it:
+            if entry.name.lower().endswith(SUPPORTED_FORMATS) and entry.is_file():
+                stats.append((entry.name, entry.stat()))
+    return _collect_entries(project_path, stats, known_entries or {}, max_workers)
+
+
+def scan_files(project_path, names, known_entries=None, max_workers=MAX_SCAN_WORKERS):
+    # 只扫描指定的文件（例如刚导入的文件），返回值与 scan_directory 相同
+    stats = []
+    for name in names:
+        if not name.lower().endswith(SUPPORTED_FORMATS):
+            continue
+        try:
+            stats.append((name, os.stat(os.path.join(project_path, name))))
+        except OSError:
+            continue
+    return _collect_entries(project_path, stats, known_entries or {}, max_workers)
+
+
+def _collect_entries(project_path, stats, known_entries, max_workers):
+    entries = {}
+    to_count = []
+    for name, stat in stats:
+        if not name.lower().endswith(MULTI_PAGE_FORMATS):
+            entries[name] = (stat.st_size, stat.st_mtime, None)
+            continue
+        cached = known_entries.get(name)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime) and cached[2] is not None:
+            entries[name] = cached
+        else:
+            to_count.append((name, stat.st_size, stat.st_mtime))
+
+    new_page_counts = []
+    if to_count:
+        paths = [os.path.join(project_path, name) for name, _, _ in to_count]
+        workers = min(max_workers, len(to_count))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                page_counts = list(executor.map(read_page_count, paths))
+        else:
+            page_counts = [read_page_count(path) for path in paths]
+        for (name, size, mtime), page_count in zip(to_count, page_counts):
+            if page_count is None:
+                continue
+            entries[name] = (size, mtime, page_count)
+            new_page_counts.append((name, size, mtime, page_count))
+
+    return entries, new_page_counts
+
+
+def build_file_list(project_path, entries):
+    # 按文件名排序展开为 ImageIdentifier 列表，多页TIFF的每一页是一个条目
+    file_list = []
+    for name in sorted(entries):
+        filepath = os.path.join(project_path, name)
+        page_count = entries[name][2]
+        if page_count is None:
+            file_list.append(ImageIdentifier(path=filepath, page=-1))
+        else:
+            for i in range(page_count):
+                file_list.append(ImageIdentifier(path=filepath, page=i))
+    return file_list
+
+
+def diff_entries(project_path, old_entries, new_entries):
+    # 比较两次扫描结果，返回 (新增的条目, 删除的条目)，均为 ImageIdentifier 列表。
+    # 文件被修改但页数不变时，其条目不变，不算作变化。
+    added, removed = [], []
+    for name in old_entries.keys() | new_entries.keys():
+        old = old_entries.get(name)
+        new = new_entries.get(name)
+        if old is not None and new is not None and old[2] == new[2]:
+            continue
+        if old is not None:
+            removed.extend(build_file_list(project_path, {name: old}))
+        if new is not None:
+            added.extend(build_file_list(project_path, {name: new}))
+    # 页数变化的文件会同时出现在两边，只保留真正增加或减少的页
+    common = set(added) & set(removed)
+    return [i for i in added if i not in common], [i for i in removed if i not in common]
+
+
+def modified_entries(project_path, old_entries, new_entries):
+    # 两次扫描之间大小或修改时间发生变化的文件（例如被外部程序重新保存，或被同名导入覆盖），
+    # 返回其上次扫描时的全部条目。diff_entries 不把这类文件算作变化，但基于旧内容的缓存需要丢弃。
+    modified = []
+    for name in old_entries.keys() & new_entries.keys():
+        old = old_entries[name]
+        if old[:2] != new_entries[name][:2]:
+            modified.extend(build_file_list(project_path, {name: old}))
+    return modified
@@ -0,0 +1,25 @@
+# src/core/project_settings.py
+import os
+
+from .ini_manager import IniManager
+
+# 工程级设置文件，位于工程文件夹根目录
+PROJECT_SETTINGS_FILE = "project.ini"
+_PROJECT_SECTION = "project"
+
+
+def _settings_path(project_path):
+    return os.path.join(project_path, PROJECT_SETTINGS_FILE)
+
+
+def load_project_settings(project_path):
+    # 读取工程设置，文件不存在时返回空字典（值均为字符串）
+    if not project_path:
+        return {}
+    return IniManager().load_params(_settings_path(project_path))
+
+
+def save_project_settings(project_path, settings: dict):
+    if not project_path:
+        return
+    IniManager().save_params(_settings_path(project_path), {_PROJECT_SECTION: settings})
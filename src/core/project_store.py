@@ -0,0 +1,250 @@
+# src/core/project_store.py
+import os
+
+import cv2
+
+from .image_data_store import ImageDataStore
+from .ini_manager import IniManager
+from .image_identifier import ImageIdentifier
+from .stage_writer import StageResultWriter
+from .param_writer import ParamSaveQueue
+from .stage_storage import get_stage_backend, load_project_stage_backend, DEFAULT_STAGE_BACKEND
+from .project_index import ProjectIndex, index_key
+from .project_scanner import scan_directory, scan_files, build_file_list, diff_entries, modified_entries
+from .image_importer import ImportResult, import_files
+from .tiff_reader import close_tiff_files
+
+
+class ProjectStore:
+    # 工程数据的访问层：文件扫描、参数和阶段结果的读写、导入和导出。
+    # 不依赖Qt，可以在命令行批处理或服务中直接使用；GUI 通过 ProjectManager 把下面的回调转换为Qt信号。
+    # 回调在调用方所在的线程中执行（import_images 的进度回调在导入线程中执行）。
+
+    def __init__(self):
+        self.project_path = None
+        self.file_list = []
+        self.ini_manager = IniManager()
+        # 阶段结果在后台线程异步写盘，连续调整参数时只保留最新的结果
+        self.stage_writer = StageResultWriter()
+        # 参数保存在短时间窗口内合并，后台写入
+        self.param_writer = ParamSaveQueue()
+        # 阶段结果的存储后端，由工程设置 (project.ini) 决定
+        self.stage_backend = get_stage_backend(DEFAULT_STAGE_BACKEND)
+        # 工程级 SQLite 索引：参数、视图状态、页数和阶段结果元数据
+        self.index = None
+        # 上次扫描的结果 {文件名: (大小, 修改时间, 页数)}，增量扫描时用于比较
+        self._scan_entries_cache = {}
+
+        # 事件回调，未设置时忽略
+        self.on_project_activated = None   # (path, name)
+        self.on_file_list_updated = None   # (file_list)
+        self.on_scan_finished = None       # (has_files)
+        # 增量扫描的结果：新增的条目, 删除的条目 (ImageIdentifier 列表)。file_list 已更新为最新状态。
+        self.on_file_list_changed = None   # (added, removed)
+        self.on_import_progress = None     # (done, total, filename)
+        # 内容可能已经变化的条目（文件被修改或删除），基于旧内容的缓存应当丢弃
+        self.on_files_modified = None      # (identifiers)
+
+    @staticmethod
+    def _notify(callback, *args):
+        if callback is not None:
+            callback(*args)
+
+    def activate_project(self, folder_path):
+        # 打开工程并完整扫描；路径无效时返回 False
+        if not folder_path or not os.path.isdir(folder_path):
+            # Silently fail. The caller (UI) is responsible for user feedback.
+            return False
+
+        # 切换工程前，确保上一个工程的参数和阶段结果都已写盘
+        self.flush_parameters()
+        self.flush_stage_results()
+        if self.index is not None:
+            self.index.close()
+        close_tiff_files()
+        self._scan_entries_cache = {}
+        self.project_path = folder_path
+        self.stage_backend = load_project_stage_backend(folder_path)
+        try:
+            self.index = ProjectIndex(folder_path)
+        except Exception as e:
+            # 索引不可用（例如只读目录）时退回到 per-image INI
+            print(f"无法打开工程索引，使用 INI 文件保存参数: {e}")
+            self.index = None
+        self._notify(self.on_project_activated, folder_path, os.path.basename(folder_path))
+        self.scan_project_files()
+        return True
+
+    def import_images(self, source_files):
+        # 并行导入图片，跳过内容已存在于工程中的文件。返回 ImportResult。
+        # 可以在工作线程中调用；导入完成后应调用 add_imported_files 更新文件列表。
+        if not self.project_path:
+            return ImportResult(failed=list(source_files))  # No active project
+
+        known_hashes = self.index.get_content_hashes() if self.index is not None else {}
+        result = import_files(
+            self.project_path, source_files, known_hashes, dict(self._scan_entries_cache),
+            progress=lambda *args: self._notify(self.on_import_progress, *args)
+        )
+        if self.index is not None:
+            self.index.set_content_hashes(result.hashes)
+        return result
+
+    def add_imported_files(self, names):
+        # 只扫描新导入的文件并更新文件列表，不重新扫描整个工程
+        if not self.project_path or not names:
+            return
+        known_entries = self.index.get_page_counts() if self.index is not None else {}
+        entries, new_page_counts = scan_files(self.project_path, names, known_entries)
+        if self.index is not None:
+            self.index.set_page_counts(new_page_counts)
+
+        merged = dict(self._scan_entries_cache)
+        merged.update(entries)
+        added, removed = diff_entries(self.project_path, self._scan_entries_cache, merged)
+        self._notify_modified(self._scan_entries_cache, merged, removed)
+        self._scan_entries_cache = merged
+        if not added and not removed:
+            return
+        self.file_list = build_file_list(self.project_path, merged)
+        self._notify(self.on_file_list_changed, added, removed)
+
+    def scan_project_files(self):
+        # 完整扫描：重建文件列表并通知整体刷新（打开工程时调用）
+        if not self.project_path:
+            return
+
+        entries = self._scan_entries()
+        if entries is None:
+            return
+        self._scan_entries_cache = entries
+        self.file_list = build_file_list(self.project_path, entries)
+
+        self._notify(self.on_file_list_updated, self.file_list)
+        self._notify(self.on_scan_finished, bool(self.file_list))
+
+    def refresh_project_files(self):
+        # 增量扫描：只重新读取大小或修改时间变化的文件，并只通知发生变化的条目
+        if not self.project_path:
+            return
+
+        entries = self._scan_entries()
+        if entries is None:
+            return
+        added, removed = diff_entries(self.project_path, self._scan_entries_cache, entries)
+        self._notify_modified(self._scan_entries_cache, entries, removed)
+        self._scan_entries_cache = entries
+        if not added and not removed:
+            return
+        self.file_list = build_file_list(self.project_path, entries)
+        self._notify(self.on_file_list_changed, added, removed)
+
+    def _notify_modified(self, old_entries, new_entries, removed):
+        stale = modified_entries(self.project_path, old_entries, new_entries)
+        stale += [identifier for identifier in removed if identifier not in stale]
+        if stale:
+            self._notify(self.on_files_modified, stale)
+
+    def _scan_entries(self):
+        # 多页TIFF的页数缓存在内存和工程索引中，(大小, 修改时间) 不变时无需重新打开文件
+        known_entries = self.index.get_page_counts() if self.index is not None else {}
+        known_entries.update(self._scan_entries_cache)
+        try:
+            entries, new_page_counts = scan_directory(self.project_path, known_entries)
+        except FileNotFoundError:
+            print(f"错误: 工程路径不存在: {self.project_path}")
+            return None
+        if self.index is not None:
+            self.index.set_page_counts(new_page_counts)
+        return entries
+
+    def load_params_for_image(self, identifier: ImageIdentifier):
+        # 先写入尚在合并窗口中的参数，保证读到的是最新值
+        self.flush_parameters()
+        store = self._get_store(identifier)
+        return store.load_params()
+
+    def load_params_for_images(self, identifiers):
+        # 批量读取参数：有索引时一次查询读出全部，返回 {identifier: 扁平字典}
+        self.flush_parameters()
+        if self.index is None:
+            return {identifier: self.load_params_for_image(identifier) for identifier in identifiers}
+        all_params = self.index.load_all_params()
+        result = {}
+        for identifier in identifiers:
+            params = all_params.get(index_key(identifier))
+            # 索引中没有的条目逐个读取（可能需要从旧的 INI 导入）
+            result[identifier] = params if params is not None else self.load_params_for_image(identifier)
+        return result
+
+    def save_parameters(self, identifier: ImageIdentifier, params):
+        # 提交到合并保存队列，窗口内的多次保存只写最后一次
+        store = self._get_store(identifier)
+        self.param_writer.submit(str(identifier), params, store.save_params)
+
+    def flush_parameters(self):
+        # 立即写入所有待保存的参数（切换图片、切换工程、退出程序时调用）
+        self.param_writer.flush()
+
+    def load_stage_result(self, identifier: ImageIdentifier, stage_index):
+        # 优先返回尚未写盘的最新结果，避免读到旧文件，也省去一次PNG解码
+        pending = self.stage_writer.get_pending((str(identifier), stage_index))
+        if pending is not None:
+            return pending
+        store = self._get_store(identifier)
+        return store.load_stage_result(stage_index)
+
+    def save_stage_result(self, identifier: ImageIdentifier, stage_index, main_image_data):
+        # 提交到异步写回队列
+        store = self._get_store(identifier)
+        self.stage_writer.submit(
+            (str(identifier), stage_index), main_image_data,
+            lambda image: store.save_stage_result(stage_index, image),
+            target_path=store.stage_result_path(stage_index)
+        )
+
+    def flush_stage_results(self):
+        # 阻塞直到所有排队的阶段结果都已写盘（切换工程、退出程序时调用）
+        self.stage_writer.flush()
+
+    def shutdown(self):
+        # 程序退出时调用：先写入参数并等待阶段结果写盘（写入时会更新索引），再关闭索引
+        self.flush_parameters()
+        self.flush_stage_results()
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        close_tiff_files()
+
+    def _get_store(self, identifier: ImageIdentifier):
+        return ImageDataStore(self.project_path, identifier, self.ini_manager, self.stage_backend, self.index)
+
+    def export_results_to_folder(self, output_folder, identifier: ImageIdentifier, processed_image, ocr_text, translated_text):
+
+        if processed_image is None:
+            print(f"Warning: No processed image to save for {identifier}")
+            return False
+
+        # 1. 构造唯一的文件名
+        base_filename = os.path.basename(identifier.path)
+        name, ext = os.path.splitext(base_filename)
+
+        # 处理多页TIFF的文件名，确保唯一性
+        if identifier.page > -1:
+            name = f"p{identifier.page + 1}_{name}"
+
+        output_image_path = os.path.join(output_folder, f"{name}_processed{ext}")
+        output_text_path = os.path.join(output_folder, f"{name}_ocr.txt")
+        output_translated_path = os.path.join(output_folder, f"{name}_translated.txt")
+
+        # 2. 保存所有文件
+        try:
+            cv2.imwrite(output_image_path, processed_image)
+            with open(output_text_path, "w", encoding="utf-8") as f:
+                f.write(ocr_text)
+            with open(output_translated_path, "w", encoding="utf-8") as f:
+                f.write(translated_text)
+            return True
+        except Exception as e:
+            print(f"Error saving files for {identifier} to {output_folder}: {e}")
+            return False
@@ -0,0 +1,187 @@
+# src/core/stage_storage.py
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .project_settings import load_project_settings, save_project_settings
+
+STAGE_NAMES = [
+    "stage1_redress",
+    "stage2_binary",
+    "stage3_noisefree",
+    "stage4_final"
+]
+
+# 工程设置中选择阶段结果存储后端的键名
+STAGE_STORAGE_SETTING = "stage_storage"
+
+
+class StageStorageBackend:
+    # 阶段结果的存储后端。base_path 为不含扩展名的路径，由 ImageDataStore 决定。
+    name = ""
+    extension = ""
+
+    def path_for(self, base_path):
+        return f"{base_path}{self.extension}"
+
+    def save(self, base_path, image):
+        raise NotImplementedError
+
+    def load(self, base_path):
+        raise NotImplementedError
+
+
+class PngStageBackend(StageStorageBackend):
+    # 归档模式：默认压缩的PNG，体积小但编解码慢。
+    name = "png"
+    extension = ".png"
+
+    def save(self, base_path, image):
+        cv2.imwrite(self.path_for(base_path), image)
+
+    def load(self, base_path):
+        return cv2.imread(self.path_for(base_path), cv2.IMREAD_UNCHANGED)
+
+
+class NpyStageBackend(StageStorageBackend):
+    # 快速模式：原始 .npy 缓冲区，保存和读取时都无需编解码。
+    # 读取时整体读入内存而不做内存映射：同一文件随后会被新结果替换，
+    # Windows 上无法替换仍被映射的文件。
+    name = "npy"
+    extension = ".npy"
+
+    def save(self, base_path, image):
+        # 先写临时文件再替换，避免读取方映射到写了一半的文件
+        path = self.path_for(base_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(image))
+        os.replace(tmp_path, path)
+
+    def load(self, base_path):
+        return np.load(self.path_for(base_path))
+
+
+class TiffStageBackend(StageStorageBackend):
+    # 归档模式：二值图使用 CCITT G4 压缩（通常比PNG小得多），其他图像使用无损 deflate 压缩。
+    name = "tiff"
+    extension = ".tif"
+
+    def save(self, base_path, image):
+        path = self.path_for(base_path)
+        if image.ndim == 2 and _is_bilevel(image):
+            Image.fromarray(image).convert("1").save(path, compression="group4")
+        elif image.ndim == 2:
+            Image.fromarray(image).save(path, compression="tiff_adobe_deflate")
+        else:
+            Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(path, compression="tiff_adobe_deflate")
+
+    def load(self, base_path):
+        with Image.open(self.path_for(base_path)) as pil_image:
+            if pil_image.mode in ("1", "L"):
+                return np.array(pil_image.convert("L"))
+            return cv2.cvtColor(np.array(pil_image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+
+def _is_bilevel(image):
+    return not np.any((image != 0) & (image != 255))
+
+
+STAGE_STORAGE_BACKENDS = {
+    backend.name: backend for backend in (PngStageBackend(), NpyStageBackend(), TiffStageBackend())
+}
+
+DEFAULT_STAGE_BACKEND = "png"
+
+
+def remove_other_formats(base_path, keep):
+    # 删除同一阶段结果在 keep 之外的其他格式的文件（切换后端后残留的旧结果），返回删除的文件数
+    removed = 0
+    for backend in STAGE_STORAGE_BACKENDS.values():
+        path = backend.path_for(base_path)
+        if backend is keep or not os.path.exists(path):
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            print(f"无法删除旧的阶段结果 {path}: {e}")
+    return removed
+
+
+def get_stage_backend(name):
+    # 未知的名称回退到默认后端
+    return STAGE_STORAGE_BACKENDS.get(name, STAGE_STORAGE_BACKENDS[DEFAULT_STAGE_BACKEND])
+
+
+def load_project_stage_backend(project_path):
+    settings = load_project_settings(project_path)
+    return get_stage_backend(settings.get(STAGE_STORAGE_SETTING, DEFAULT_STAGE_BACKEND))
+
+
+def _iter_stage_files(project_path):
+    # 遍历工程中所有阶段结果文件，返回 (不含扩展名的路径, 所属后端)
+    extensions = {backend.extension: backend for backend in STAGE_STORAGE_BACKENDS.values()}
+    for entry in os.scandir(project_path):
+        if not (entry.is_dir() and entry.name.endswith(".files")):
+            continue
+        for file_entry in os.scandir(entry.path):
+            stem, ext = os.path.splitext(file_entry.name)
+            backend = extensions.get(ext.lower())
+            if backend is None:
+                continue
+            # 多页文件的阶段结果带有 "p<页码>_" 前缀
+            stage_name = stem.split("_", 1)[1] if stem.startswith("p") and "_" in stem else stem
+            if stage_name in STAGE_NAMES or stem in STAGE_NAMES:
+                yield os.path.join(entry.path, stem), backend
+
+
+def migrate_project_stage_storage(project_path, target_name):
+    # 把工程中已有的阶段结果全部转换为目标后端，并更新工程设置。返回转换的文件数。
+    if target_name not in STAGE_STORAGE_BACKENDS:
+        raise ValueError(f"未知的存储后端: {target_name}")
+    target = STAGE_STORAGE_BACKENDS[target_name]
+
+    converted = 0
+    for base_path, backend in list(_iter_stage_files(project_path)):
+        if backend is target:
+            continue
+        if os.path.exists(target.path_for(base_path)):
+            # 目标格式的文件已存在：它是该阶段最近写入的结果，旧格式的文件只是残留，直接删除
+            remove_other_formats(base_path, target)
+            continue
+        image = backend.load(base_path)
+        if image is None:
+            print(f"无法读取阶段结果 {backend.path_for(base_path)}，跳过。")
+            continue
+        target.save(base_path, image)
+        os.remove(backend.path_for(base_path))
+        converted += 1
+
+    settings = load_project_settings(project_path)
+    settings[STAGE_STORAGE_SETTING] = target_name
+    save_project_settings(project_path, settings)
+    return converted
+
+
+def main(argv=None):
+    # 命令行迁移工具: python -m core.stage_storage <工程路径> <png|npy|tiff>
+    parser = argparse.ArgumentParser(description="转换工程中阶段结果的存储格式")
+    parser.add_argument("project", help="工程文件夹路径")
+    parser.add_argument("backend", choices=sorted(STAGE_STORAGE_BACKENDS), help="目标存储后端")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.project):
+        print(f"错误: 工程路径不存在: {args.project}")
+        return 1
+    converted = migrate_project_stage_storage(args.project, args.backend)
+    print(f"已将 {converted} 个阶段结果转换为 {args.backend} 格式。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
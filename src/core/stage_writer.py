@@ -0,0 +1,102 @@
+# src/core/stage_writer.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .packed_binary import PackedBinaryImage, as_array
+
+# 记录内容摘要的条目上限（按最近写入淘汰）；被淘汰的条目下次提交时会重新写入一次
+MAX_TRACKED_STAGE_HASHES = 1024
+
+
+def content_hash(image):
+    # 图像内容摘要（包含尺寸和类型），用于判断阶段结果是否真的发生了变化。
+    # 压缩的二值图直接对按位数据取摘要，数据量只有 1/8。按位数据的每行补齐到8的倍数，
+    # 宽度不同的图（例如15和16像素）可能得到相同的按位数据，因此还要加入逻辑尺寸。
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(image, PackedBinaryImage):
+        digest.update(f"packed{image.shape}".encode())
+        image = image.bits
+    data = np.ascontiguousarray(image)
+    digest.update(f"{data.shape}{data.dtype}".encode())
+    digest.update(data.data)
+    return digest.digest()
+
+
+class StageResultWriter:
+    # 阶段结果的异步写回队列 (write-behind)。
+    # - 同一个 key (通常是 (identifier, stage)) 的多次写入会合并，只保留最新的一份；
+    # - PNG 编码在后台线程执行，不阻塞GUI线程；
+    # - 内容摘要与上次写入的相同、且目标文件仍然存在时跳过写入。
+    # 尚未落盘的结果可以通过 get_pending 直接从内存中取回，因此读写始终一致。
+    # 队列中可以存放 PackedBinaryImage，只在编码写盘和取回时才解包。
+
+    def __init__(self):
+        self._pending = {}        # key -> (image, write_func, target_path)
+        self._in_flight = None    # (key, image)，正在写入的条目
+        self._last_hashes = OrderedDict()    # key -> 最近一次成功写入的内容摘要
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="StageResultWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, image, write_func, target_path=None):
+        # 提交一次写入。write_func(image) 负责真正的编码和落盘。
+        # target_path 为写入的目标文件；文件被外部删除时，即使内容未变也会重新写入。
+        with self._cond:
+            self._pending[key] = (image, write_func, target_path)
+            self._cond.notify_all()
+
+    def get_pending(self, key):
+        # 返回尚未写入磁盘的最新结果；没有则返回 None
+        with self._cond:
+            entry = self._pending.get(key)
+            if entry is not None:
+                return as_array(entry[0])
+            if self._in_flight is not None and self._in_flight[0] == key:
+                return as_array(self._in_flight[1])
+        return None
+
+    def flush(self):
+        # 阻塞直到所有已提交的写入完成
+        with self._cond:
+            while self._pending or self._in_flight is not None:
+                self._cond.wait()
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                key = next(iter(self._pending))
+                image, write_func, target_path = self._pending.pop(key)
+                self._in_flight = (key, image)
+
+            try:
+                digest = content_hash(image)
+                unchanged = (self._last_hashes.get(key) == digest
+                             and (target_path is None or os.path.exists(target_path)))
+                if not unchanged:
+                    write_func(as_array(image))
+                self._last_hashes[key] = digest
+                self._last_hashes.move_to_end(key)
+                while len(self._last_hashes) > MAX_TRACKED_STAGE_HASHES:
+                    self._last_hashes.popitem(last=False)
+            except Exception as e:
+                print(f"无法写入阶段结果 {key}: {e}")
+            finally:
+                with self._cond:
+                    self._in_flight = None
+                    self._cond.notify_all()
@@ -7,4 +7,5 @@ class TaskName(enum.Enum):
     OCR = "ocr"
     TRANSLATE = "translate"
     LOAD_MODEL = "load_model"
-    BATCH_SAVE = "batch_save"
\ No newline at end of file
+    BATCH_SAVE = "batch_save"
+    IMPORT_IMAGES = "import_images"
\ No newline at end of file
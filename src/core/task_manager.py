@@ -10,12 +10,12 @@ from app_config import (
 from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtWidgets import QMessageBox
 
-from .parameters import ProcessingParameters
 from .task_definitions import TaskName
 from .worker import Worker
 from .ocr_service import OcrService
 from .translation_service import TranslationService
 from .image_identifier import ImageIdentifier
+from .batch_runner import BatchRunner
 
 
 class TaskManager(QObject):
@@ -26,6 +26,7 @@ class TaskManager(QObject):
     signal_taskmanager_model_loaded = pyqtSignal(tuple)
     signal_taskmanager_batch_progress = pyqtSignal(int, int, str)  # current, total, filename
     signal_taskmanager_batch_finished = pyqtSignal(str)  # message
+    signal_taskmanager_import_finished = pyqtSignal(object)  # ImportResult
 
     # 通用信号，用于管理UI状态（例如，禁用/启用按钮）
     signal_taskmanager_task_started = pyqtSignal(TaskName)
@@ -38,6 +39,7 @@ class TaskManager(QObject):
         self.image_pipeline = image_pipeline
         self.ocr_service = OcrService()
         self.translation_service = TranslationService()
+        self.batch_runner = BatchRunner(project_manager.store, image_pipeline, self.ocr_service, self.translation_service)
         self.worker = None
 
     def _is_task_running(self):
@@ -110,30 +112,22 @@ class TaskManager(QObject):
         self.worker.finished.connect(lambda: self.signal_taskmanager_task_finished.emit(TaskName.BATCH_SAVE))
         self.worker.start()
 
-    def _run_batch_save(self, file_list, output_folder):
-        total_files = len(file_list)
-        for i, identifier in enumerate(file_list):
-
-            self.signal_taskmanager_batch_progress.emit(i + 1, total_files, identifier.display_name)
-
-            params_dict = self.project_manager.load_params_for_image(identifier)
-            params_obj = ProcessingParameters.from_dict(params_dict)
-            original_image = self.image_pipeline.opencv_ops.load_raw_image(identifier)
-            if original_image is None:
-                continue
-
-            final_ocr_image = self.image_pipeline.process_fully(original_image, params_obj)
-            if final_ocr_image is None:
-                continue
-
-            ocr_lang = params_obj.ocr_lang
-            ocr_text = self.ocr_service.run(final_ocr_image, ocr_lang)
+    def start_import(self, source_files):
+        # 在后台线程导入图片；进度通过 ProjectManager.signal_projectmanager_import_progress 发出
+        if self._is_task_running():
+            return
+        self.signal_taskmanager_task_started.emit(TaskName.IMPORT_IMAGES)
+        self.worker = Worker(self.project_manager.import_images, source_files)
+        self.worker.result.connect(self._on_import_result)
+        self.worker.error.connect(self.signal_taskmanager_task_error.emit)
+        self.worker.finished.connect(lambda: self.signal_taskmanager_task_finished.emit(TaskName.IMPORT_IMAGES))
+        self.worker.start()
 
-            translated_text = ""
-            if ocr_text.strip() and self.translation_service.is_model_loaded():
-                translated_text = self.translation_service.run(ocr_text)
+    def _on_import_result(self, result):
+        # 在GUI线程中把新文件加入文件列表
+        self.project_manager.add_imported_files(result.imported)
+        self.signal_taskmanager_import_finished.emit(result)
 
-            self.project_manager.export_results_to_folder(
-                output_folder, identifier, final_ocr_image, ocr_text, translated_text
-            )
-        self.signal_taskmanager_batch_finished.emit(f"批量处理完成！共处理 {total_files} 个文件。")
\ No newline at end of file
+    def _run_batch_save(self, file_list, output_folder):
+        self.batch_runner.run(file_list, output_folder, progress=self.signal_taskmanager_batch_progress.emit)
+        self.signal_taskmanager_batch_finished.emit(f"批量处理完成！共处理 {len(file_list)} 个文件。")
@@ -0,0 +1,69 @@
+# src/core/thumbnail_cache.py
+import hashlib
+import os
+
+import cv2
+from PIL import Image
+
+from .opencv_operations import OpenCVOperations
+from .tiff_reader import TIFF_EXTENSIONS
+
+# 缩略图保存在工程文件夹下的隐藏目录中，可以随时删除，会按需重新生成
+THUMBNAIL_DIR = ".thumbnails"
+DEFAULT_THUMBNAIL_SIZE = 64
+
+
+def load_reduced_image(identifier, max_size):
+    # 以降低的分辨率解码图片（RGB 的 PIL 图像），长边不超过 max_size。
+    # TIFF 优先使用文件中的缩小版本子图（见 OpenCVOperations.load_reduced_image）；
+    # JPEG 通过 draft() 在 DCT 域直接按 1/2、1/4、1/8 缩小解码；其他格式解码后用 reduce() 快速缩小，再做一次平滑缩放。
+    if identifier.path.lower().endswith(TIFF_EXTENSIONS):
+        reduced, _ = OpenCVOperations.load_reduced_image(identifier, max_size, color=True)
+        if reduced is not None:
+            thumb = Image.fromarray(cv2.cvtColor(reduced, cv2.COLOR_BGR2RGB))
+            thumb.thumbnail((max_size, max_size), reducing_gap=2.0)
+            return thumb
+    with Image.open(identifier.path) as img:
+        if identifier.page > -1:
+            img.seek(identifier.page)
+        img.draft("RGB", (max_size, max_size))
+        thumb = img.convert("RGB") if img.mode not in ("RGB", "L") else img.copy()
+    thumb.thumbnail((max_size, max_size), reducing_gap=2.0)
+    return thumb
+
+
+class ThumbnailCache:
+    # 缩略图的磁盘缓存，键为 (文件名, 页码, 大小, 修改时间)：原图被修改后旧的缩略图自然失效。
+    # 只依赖 PIL，不涉及Qt，可以在任意线程中调用。
+
+    def __init__(self, project_path, size=DEFAULT_THUMBNAIL_SIZE):
+        self.project_path = project_path
+        self.size = size
+        self.cache_dir = os.path.join(project_path, THUMBNAIL_DIR)
+
+    def cache_path(self, identifier):
+        try:
+            stat = os.stat(identifier.path)
+        except OSError:
+            return None
+        key = f"{os.path.basename(identifier.path)}|{identifier.page}|{self.size}|{stat.st_size}|{stat.st_mtime_ns}"
+        return os.path.join(self.cache_dir, hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + ".jpg")
+
+    def get(self, identifier):
+        # 返回缩略图的文件路径；缓存中没有时生成并写入。失败时返回 None。
+        path = self.cache_path(identifier)
+        if path is None:
+            return None
+        if os.path.exists(path):
+            return path
+        try:
+            thumb = load_reduced_image(identifier, self.size)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 先写临时文件再替换，并发生成同一张缩略图时也不会读到半个文件
+            tmp_path = f"{path}.{os.getpid()}.{id(thumb)}.tmp"
+            thumb.save(tmp_path, "JPEG", quality=85)
+            os.replace(tmp_path, path)
+            return path
+        except Exception as e:
+            print(f"无法生成缩略图 {identifier}: {e}")
+            return None
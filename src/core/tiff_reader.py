@@ -0,0 +1,466 @@
+# src/core/tiff_reader.py
+import contextlib
+import io
+import math
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+from PIL import Image
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+
+# 支持直接读取的压缩方式：1 无压缩，8 / 32946 Deflate
+COMPRESSION_NONE = 1
+_DEFLATE_COMPRESSIONS = (8, 32946)
+
+# TIFF 字段类型 -> numpy 数据类型（只需要整数类型）
+_FIELD_DTYPES = {1: "u1", 3: "u2", 4: "u4", 7: "u1", 13: "u4", 16: "u8", 18: "u8"}
+_FIELD_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4, 16: 8, 17: 8, 18: 8}
+
+_TAG_NEW_SUBFILE_TYPE = 254
+_TAG_IMAGE_WIDTH = 256
+_TAG_IMAGE_LENGTH = 257
+_TAG_BITS_PER_SAMPLE = 258
+_TAG_COMPRESSION = 259
+_TAG_PHOTOMETRIC = 262
+_TAG_STRIP_OFFSETS = 273
+_TAG_ORIENTATION = 274
+_TAG_SAMPLES_PER_PIXEL = 277
+_TAG_ROWS_PER_STRIP = 278
+_TAG_STRIP_BYTE_COUNTS = 279
+_TAG_PLANAR_CONFIG = 284
+_TAG_PREDICTOR = 317
+_TAG_TILE_WIDTH = 322
+_TAG_TILE_LENGTH = 323
+_TAG_TILE_OFFSETS = 324
+_TAG_TILE_BYTE_COUNTS = 325
+_TAG_SUB_IFDS = 330
+
+
+@dataclass
+class TiffPage:
+    # 一页TIFF的数据布局（只解析IFD，不读取像素）。条带 (strip) 按宽度等于整页的分块处理。
+    path: str
+    width: int
+    height: int
+    bits_per_sample: int
+    samples_per_pixel: int
+    compression: int
+    photometric: int
+    planar: int
+    predictor: int
+    chunk_width: int              # 分块宽度（条带布局时为整页宽度）
+    chunk_length: int             # 分块高度（条带布局时为 RowsPerStrip）
+    offsets: np.ndarray
+    byte_counts: np.ndarray
+    tiled: bool = False
+    reduced: bool = False         # NewSubfileType 标记为某一页的缩小版本
+    sub_ifds: tuple = ()          # SubIFDs 中各子图的IFD偏移量（金字塔TIFF的缩小版本通常放在这里）
+    orientation: int = 1          # Orientation (274)，1 表示按存储方向显示，不需要旋转或翻转
+
+    @property
+    def supported(self):
+        # 8位灰度 (BlackIsZero) 或 RGB、像素交错存储、无压缩或无预测器的 Deflate 压缩
+        return (self.bits_per_sample == 8 and self.photometric in (1, 2)
+                and self.samples_per_pixel == (3 if self.photometric == 2 else 1)
+                and (self.planar == 1 or self.samples_per_pixel == 1)
+                and (self.compression == COMPRESSION_NONE
+                     or (self.compression in _DEFLATE_COMPRESSIONS and self.predictor == 1)))
+
+    @property
+    def contiguous(self):
+        # 无压缩且各条带在文件中首尾相连时，整页像素就是文件中的一段连续字节，可以一次读入
+        if not self.supported or self.compression != COMPRESSION_NONE or self.tiled:
+            return False
+        if np.any(self.offsets[1:] != self.offsets[:-1] + self.byte_counts[:-1]):
+            return False
+        return int(self.byte_counts.sum()) >= self.width * self.height * self.samples_per_pixel
+
+
+class TiffFile:
+    # 一个TIFF文件的页索引：各页IFD的偏移量和解析后的 TiffPage 在第一次访问时生成并缓存，
+    # 之后按页号直接定位，不必每次从文件头逐页查找。索引由所有线程共享。
+    # 不长期持有文件句柄：每次读取时打开、读完即关闭，多个线程可以同时解码同一文件的不同页，
+    # 文件也不会因为被本程序打开而无法删除或替换（Windows）。
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self._lock = threading.Lock()
+        self._ifd_offsets = []
+        self._pages = {}
+        self._reduced = {}
+        with open(path, "rb") as f:
+            header = f.read(16)
+        self.header = header
+        if header[:2] == b"II":
+            self.byteorder = "<"
+        elif header[:2] == b"MM":
+            self.byteorder = ">"
+        else:
+            raise ValueError("不是TIFF文件")
+        version = struct.unpack(self.byteorder + "H", header[2:4])[0]
+        if version == 42:
+            self.big = False
+            self._next_ifd = struct.unpack(self.byteorder + "I", header[4:8])[0]
+        elif version == 43:
+            self.big = True
+            self._next_ifd = struct.unpack(self.byteorder + "Q", header[8:16])[0]
+        else:
+            raise ValueError(f"不支持的TIFF版本 {version}")
+
+    def open_file(self):
+        return open(self.path, "rb")
+
+    def ifd_offset(self, page):
+        # 第 page 页的IFD偏移量，超出页数时返回 None
+        with self._lock, self.open_file() as f:
+            while len(self._ifd_offsets) <= page and self._next_ifd:
+                if self._next_ifd in self._ifd_offsets:
+                    # IFD 链成环，视为结束
+                    self._next_ifd = 0
+                    break
+                self._ifd_offsets.append(self._next_ifd)
+                self._next_ifd = _next_ifd_offset(f, self.byteorder, self.big, self._next_ifd)
+            return self._ifd_offsets[page] if page < len(self._ifd_offsets) else None
+
+    def page_count(self):
+        with self._lock, self.open_file() as f:
+            while self._next_ifd and self._next_ifd not in self._ifd_offsets:
+                self._ifd_offsets.append(self._next_ifd)
+                self._next_ifd = _next_ifd_offset(f, self.byteorder, self.big, self._next_ifd)
+            return len(self._ifd_offsets)
+
+    def page(self, page):
+        # 第 page 页的 TiffPage；不存在或格式异常时返回 None
+        with self._lock:
+            if page in self._pages:
+                return self._pages[page]
+        offset = self.ifd_offset(page)
+        if offset is None:
+            return None
+        with self.open_file() as f:
+            tags = _read_ifd(f, self.byteorder, self.big, offset)
+        info = _page_from_tags(self.path, tags)
+        with self._lock:
+            self._pages[page] = info
+        return info
+
+    def reduced_pages(self, page):
+        # 该页在 SubIFDs 中存放的缩小版本 (reduced-resolution subfile)，没有时返回空列表
+        info = self.page(page)
+        if info is None or not info.sub_ifds:
+            return []
+        with self._lock:
+            cached = self._reduced.get(page)
+        if cached is not None:
+            return cached
+        reduced = []
+        with self.open_file() as f:
+            for offset in info.sub_ifds:
+                sub = _page_from_tags(self.path, _read_ifd(f, self.byteorder, self.big, offset))
+                if sub is not None and sub.reduced:
+                    reduced.append(sub)
+        with self._lock:
+            self._reduced[page] = reduced
+        return reduced
+
+    @contextlib.contextmanager
+    def open_pil_page(self, page):
+        # 用PIL打开指定的一页（上下文管理器，退出时关闭文件），用于本模块不能直接读取的格式（二值、LZW、JPEG 等）。
+        # 通过改写文件头中的首个IFD偏移量让PIL直接从该页开始解析，不必从第一页逐页查找。
+        offset = self.ifd_offset(page)
+        if offset is None:
+            raise EOFError(f"TIFF文件没有第 {page} 页")
+        if self.big:
+            header = self.header[:8] + struct.pack(self.byteorder + "Q", offset)
+        else:
+            header = self.header[:4] + struct.pack(self.byteorder + "I", offset)
+        with self.open_file() as f, Image.open(_HeaderOverrideReader(f, header)) as image:
+            yield image
+
+
+class _HeaderOverrideReader(io.RawIOBase):
+    # 把文件开头的若干字节替换为给定内容的只读文件对象，其余内容直接读自底层文件
+    def __init__(self, f, header):
+        super().__init__()
+        self._file = f
+        self._header = header
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        # 提供底层文件描述符，PIL的libtiff解码器（LZW、JPEG 等）据此直接从文件读取并定位到该页的IFD，
+        # 否则它会把整个文件读入内存
+        return self._file.fileno()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = self._file.seek(offset, io.SEEK_END)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        n = 0
+        if self._pos < len(self._header):
+            n = min(len(view), len(self._header) - self._pos)
+            view[:n] = self._header[self._pos:self._pos + n]
+        if n < len(view):
+            self._file.seek(self._pos + n)
+            n += self._file.readinto(view[n:])
+        self._pos += n
+        return n
+
+
+# 最近使用的TIFF文件索引（按路径），文件修改后自动重建
+MAX_CACHED_TIFF_FILES = 16
+_tiff_files = OrderedDict()
+_tiff_files_lock = threading.Lock()
+
+
+def get_tiff_file(path):
+    # 返回路径对应的 TiffFile（同一文件的各页共享），不是TIFF或无法读取时返回 None
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        print(f"无法读取TIFF文件 {path}: {e}")
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _tiff_files_lock:
+        tiff_file = _tiff_files.get(path)
+        if tiff_file is not None and tiff_file.signature == signature:
+            _tiff_files.move_to_end(path)
+            return tiff_file
+    try:
+        tiff_file = TiffFile(path)
+    except (OSError, struct.error, ValueError) as e:
+        print(f"无法解析TIFF文件 {path}: {e}")
+        return None
+    with _tiff_files_lock:
+        _tiff_files[path] = tiff_file
+        _tiff_files.move_to_end(path)
+        while len(_tiff_files) > MAX_CACHED_TIFF_FILES:
+            _tiff_files.popitem(last=False)
+    return tiff_file
+
+
+def close_tiff_files():
+    # 丢弃所有缓存的页索引（切换工程、退出程序时调用）
+    with _tiff_files_lock:
+        _tiff_files.clear()
+
+
+def read_tiff_page(path, page=0):
+    # 返回指定页的 TiffPage；不是TIFF、页码超出范围或格式异常时返回 None
+    tiff_file = get_tiff_file(path)
+    if tiff_file is None:
+        return None
+    try:
+        return tiff_file.page(page)
+    except (OSError, struct.error, ValueError) as e:
+        print(f"无法解析TIFF文件 {path}: {e}")
+        return None
+
+
+def _page_from_tags(path, tags):
+    def first(tag, default):
+        values = tags.get(tag)
+        return int(values[0]) if values is not None and len(values) else default
+
+    width = first(_TAG_IMAGE_WIDTH, 0)
+    height = first(_TAG_IMAGE_LENGTH, 0)
+    if width <= 0 or height <= 0:
+        return None
+    tiled = _TAG_TILE_OFFSETS in tags
+    if tiled:
+        chunk_width, chunk_length = first(_TAG_TILE_WIDTH, 0), first(_TAG_TILE_LENGTH, 0)
+        offsets, byte_counts = tags.get(_TAG_TILE_OFFSETS), tags.get(_TAG_TILE_BYTE_COUNTS)
+    else:
+        chunk_width, chunk_length = width, min(first(_TAG_ROWS_PER_STRIP, height), height)
+        offsets, byte_counts = tags.get(_TAG_STRIP_OFFSETS), tags.get(_TAG_STRIP_BYTE_COUNTS)
+    if offsets is None or byte_counts is None or chunk_width <= 0 or chunk_length <= 0:
+        return None
+
+    return TiffPage(
+        path=path, width=width, height=height,
+        bits_per_sample=first(_TAG_BITS_PER_SAMPLE, 1),
+        samples_per_pixel=first(_TAG_SAMPLES_PER_PIXEL, 1),
+        compression=first(_TAG_COMPRESSION, COMPRESSION_NONE),
+        photometric=first(_TAG_PHOTOMETRIC, 1),
+        planar=first(_TAG_PLANAR_CONFIG, 1),
+        predictor=first(_TAG_PREDICTOR, 1),
+        chunk_width=chunk_width, chunk_length=chunk_length,
+        offsets=offsets.astype(np.int64), byte_counts=byte_counts.astype(np.int64),
+        tiled=tiled,
+        reduced=bool(first(_TAG_NEW_SUBFILE_TYPE, 0) & 1),
+        sub_ifds=tuple(int(v) for v in tags.get(_TAG_SUB_IFDS, ())),
+        orientation=first(_TAG_ORIENTATION, 1),
+    )
+
+
+def _next_ifd_offset(f, byteorder, big, ifd_offset):
+    f.seek(ifd_offset)
+    if big:
+        count = struct.unpack(byteorder + "Q", f.read(8))[0]
+        f.seek(ifd_offset + 8 + count * 20)
+        return struct.unpack(byteorder + "Q", f.read(8))[0]
+    count = struct.unpack(byteorder + "H", f.read(2))[0]
+    f.seek(ifd_offset + 2 + count * 12)
+    return struct.unpack(byteorder + "I", f.read(4))[0]
+
+
+def _read_ifd(f, byteorder, big, ifd_offset):
+    # 读取IFD中的整数字段，返回 {tag: numpy 数组}
+    f.seek(ifd_offset)
+    if big:
+        count = struct.unpack(byteorder + "Q", f.read(8))[0]
+        entry_format, entry_size, inline_size = byteorder + "HHQ8s", 20, 8
+    else:
+        count = struct.unpack(byteorder + "H", f.read(2))[0]
+        entry_format, entry_size, inline_size = byteorder + "HHI4s", 12, 4
+    entries = f.read(count * entry_size)
+
+    tags = {}
+    for i in range(count):
+        tag, field_type, value_count, value = struct.unpack_from(entry_format, entries, i * entry_size)
+        dtype = _FIELD_DTYPES.get(field_type)
+        if dtype is None:
+            continue
+        size = _FIELD_SIZES[field_type] * value_count
+        if size <= inline_size:
+            data = value[:size]
+        else:
+            offset = struct.unpack(byteorder + ("Q" if big else "I"), value)[0]
+            f.seek(offset)
+            data = f.read(size)
+        tags[tag] = np.frombuffer(data, dtype=byteorder + dtype, count=value_count)
+    return tags
+
+
+def read_contiguous_page(info: TiffPage):
+    # 把首尾相连的条带用 readinto 一次读入预先分配的数组，只有这一份拷贝。
+    # 不做内存映射：源文件在显示期间被截断或改写时，访问映射会使整个程序因 SIGBUS 退出，
+    # Windows 上映射还会锁住文件，导致同名导入无法替换它。
+    shape = (info.height, info.width) if info.samples_per_pixel == 1 else (info.height, info.width, 3)
+    output = np.empty(shape, dtype=np.uint8)
+    view = memoryview(output).cast("B")
+    filled = 0
+    with open(info.path, "rb") as f:
+        f.seek(int(info.offsets[0]))
+        while filled < len(view):
+            count = f.readinto(view[filled:])
+            if not count:
+                raise OSError(f"TIFF文件不完整 {info.path}")
+            filled += count
+    if output.ndim == 3:
+        cv2.cvtColor(output, cv2.COLOR_RGB2BGR, dst=output)
+    return output
+
+
+def read_tiff_chunks(info: TiffPage):
+    # 逐个读取并解码分块（或条带），直接写入整页大小的输出数组，峰值内存为整页加一个分块
+    spp = info.samples_per_pixel
+    shape = (info.height, info.width) if spp == 1 else (info.height, info.width, 3)
+    output = np.empty(shape, dtype=np.uint8)
+    cw, cl = info.chunk_width, info.chunk_length
+    chunks_across = math.ceil(info.width / cw)
+    chunks_down = math.ceil(info.height / cl)
+
+    with open(info.path, "rb") as f:
+        for cy in range(chunks_down):
+            for cx in range(chunks_across):
+                index = cy * chunks_across + cx
+                f.seek(int(info.offsets[index]))
+                data = f.read(int(info.byte_counts[index]))
+                if info.compression in _DEFLATE_COMPRESSIONS:
+                    data = zlib.decompress(data)
+                # 条带布局中最后一个条带可能不满
+                rows = min(cl, len(data) // (cw * spp))
+                chunk = np.frombuffer(data, dtype=np.uint8, count=rows * cw * spp).reshape(rows, cw, spp)
+                top, left = cy * cl, cx * cw
+                # 图像边缘的分块超出页面的部分是填充
+                rows = min(rows, info.height - top)
+                cols = min(cw, info.width - left)
+                if rows <= 0:
+                    continue
+                block = chunk[:rows, :cols]
+                output[top:top + rows, left:left + cols] = block[:, :, 0] if spp == 1 else block
+
+    if spp == 3:
+        cv2.cvtColor(output, cv2.COLOR_RGB2BGR, dst=output)
+    return output
+
+
+# Orientation -> 转正所需的变换（与 PIL 的 ImageOps.exif_transpose 相同）
+_ORIENTATION_TRANSFORMS = {
+    2: lambda image: cv2.flip(image, 1),
+    3: lambda image: cv2.rotate(image, cv2.ROTATE_180),
+    4: lambda image: cv2.flip(image, 0),
+    5: lambda image: cv2.transpose(image),
+    6: lambda image: cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda image: cv2.flip(cv2.transpose(image), -1),
+    8: lambda image: cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE),
+}
+
+
+def apply_orientation(image, orientation):
+    # 按TIFF的 Orientation 标签把按存储方向读出的像素转正；1 或未知的值原样返回
+    transform = _ORIENTATION_TRANSFORMS.get(orientation)
+    return image if transform is None else transform(image)
+
+
+def load_tiff_page(path, page=0, color=False):
+    # 不经过PIL直接读取TIFF页：
+    # - 无压缩且条带连续时一次读入预先分配的数组；
+    # - 分块 (tiled) 或 Deflate 压缩的页逐块解码到一个输出数组中，只有一份完整拷贝。
+    # 其他格式（二值、LZW/JPEG 压缩等）返回 None，由调用者退回常规解码。
+    # 与 cv2.imread 一样按 Orientation 转正。
+    info = read_tiff_page(path, page)
+    if info is None or not info.supported:
+        return None
+    image = read_contiguous_page(info) if info.contiguous else read_tiff_chunks(info)
+    image = apply_orientation(image, info.orientation)
+    if color and image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+
+def load_reduced_tiff_page(path, page, max_size, color=False):
+    # 以降低的分辨率读取TIFF页，返回 (图像, 相对原图的比例)：该页带有缩小版本的子图 (SubIFDs) 时，
+    # 选长边不小于 max_size 的最小一个。没有子图时返回 (None, None)——
+    # 连续存储的无压缩页完整读取本身就不需要解码，其他格式也没有比完整解码更快的途径。
+    info = read_tiff_page(path, page)
+    if info is None:
+        return None, None
+    tiff_file = get_tiff_file(path)
+    candidates = [sub for sub in tiff_file.reduced_pages(page)
+                  if sub.supported and max(sub.width, sub.height) >= max_size] if tiff_file is not None else []
+    if not candidates:
+        return None, None
+    sub = min(candidates, key=lambda p: p.width)
+    if sub.width >= info.width:
+        return None, None
+    image = read_contiguous_page(sub) if sub.contiguous else read_tiff_chunks(sub)
+    image = apply_orientation(image, sub.orientation)
+    if color and image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image, sub.width / info.width
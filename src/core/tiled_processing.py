@@ -0,0 +1,49 @@
+# src/core/tiled_processing.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 默认分块边长（像素）。单个分块（含重叠边距）的中间结果只有几 MB，峰值内存由分块大小决定而非页面大小。
+DEFAULT_TILE_SIZE = 1024
+
+
+def should_tile(image_shape, tile_size):
+    # 只有当图像在任一方向上超过分块尺寸时，分块处理才有意义
+    if not tile_size:
+        return False
+    h, w = image_shape[:2]
+    return h > tile_size or w > tile_size
+
+
+def tile_grid(height, width, tile_size):
+    # 将图像划分为不重叠的分块，返回 (y0, y1, x0, x1) 列表
+    tiles = []
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            tiles.append((y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)))
+    return tiles
+
+
+def run_tiled(image, func, margin, tile_size=DEFAULT_TILE_SIZE, max_workers=None):
+    # 分块并行地对图像执行一个“局部”操作链 func，结果拼接成与原图同尺寸的单通道 uint8 图像。
+    # func 接收一个分块（原图的视图，四周带 margin 像素的重叠边距）并返回同尺寸的单通道结果。
+    # margin 必须不小于操作链中所有邻域半径之和，这样每个分块中心区域的结果与整图处理完全一致，没有接缝。
+    # 图像边缘的分块不外扩，边界外推方式与整图处理相同。
+    # OpenCV 在计算时会释放 GIL，因此线程池即可让各分块真正并行。
+    h, w = image.shape[:2]
+    output = np.empty((h, w), dtype=np.uint8)
+
+    def process_tile(tile):
+        y0, y1, x0, x1 = tile
+        my0, my1 = max(0, y0 - margin), min(h, y1 + margin)
+        mx0, mx1 = max(0, x0 - margin), min(w, x1 + margin)
+        result = func(image[my0:my1, mx0:mx1])
+        output[y0:y1, x0:x1] = result[y0 - my0:y1 - my0, x0 - mx0:x1 - mx0]
+
+    tiles = tile_grid(h, w, tile_size)
+    workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(workers, len(tiles))) as executor:
+        # list() 用于在此处重新抛出分块中的异常
+        list(executor.map(process_tile, tiles))
+    return output
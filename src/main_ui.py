@@ -2,8 +2,7 @@
 
 import os
 
-from PyQt5.QtCore import Qt, QSignalBlocker, QRect
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QSignalBlocker, QRect, QTimer
 from PyQt5.QtWidgets import QFileDialog
 from PyQt5.QtWidgets import (
     QMainWindow,
@@ -13,17 +12,18 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QMessageBox,
     QProgressDialog,
+    QLabel,
 )
 
-from app_config import APP_ROOT, isCUDAAvailable
+from app_config import APP_ROOT, isCUDAAvailable, getMemoryBudgetMB, getMemorySpillDir
 from core.app_context import AppContext
 from core.image_pipeline import ImagePipeline
-from core.opencv_operations import convert_cv_to_qpixmap
-from core.param_utils import deserialize_rect_list, serialize_rect_list
+from core.memory_budget import MemoryBudget, MB, PRIORITY_THUMBNAILS, PRIORITY_DISPLAY
+from core.param_utils import deserialize_rect_list, serialize_rect_list, normalize_angle
 from core.parameters import ProcessingParameters, ViewState
 from core.project_manager import ProjectManager
 from core.task_manager import TaskManager, TaskName
-from view.ImageComparisonWindow import ImageComparisonWindow
+from view.ImageComparisonWindow import ImageComparisonWindow, STAGE_TITLES
 from view.control_panel import ControlPanel
 from view.help_window import HelpWindow
 from view.image_interaction_handler import ImageInteractionHandler
@@ -40,7 +40,10 @@ class MainUI(QMainWindow):
         self.project_manager = ProjectManager()
         self.image_pipeline = ImagePipeline()
         self.task_manager = TaskManager(self.project_manager, self.image_pipeline)
-        self.app_context = AppContext(self.project_manager, self.image_pipeline, is_debug=is_debug)
+        # 图像相关内存的统一预算，上限可按部署环境配置（见 app_config）
+        self.memory_budget = MemoryBudget(getMemoryBudgetMB() * MB, spill_dir=getMemorySpillDir())
+        self.app_context = AppContext(self.project_manager, self.image_pipeline, is_debug=is_debug,
+                                      memory_budget=self.memory_budget)
 
         # --- UI Handlers ---
         # Defer initialization until UI is created
@@ -52,6 +55,7 @@ class MainUI(QMainWindow):
         # --- 连接信号 ---
         # AppContext -> MainUI
         self.app_context.signal_appcontext_image_loaded.connect(self._on_image_loaded)
+        self.app_context.signal_appcontext_proxy_ready.connect(self._on_proxy_ready)
         self.app_context.signal_appcontext_image_updated.connect(self.display_images)
         self.app_context.signal_appcontext_stage_changed.connect(self._on_stage_changed)
         self.app_context.signal_appcontext_params_applied_to_ui.connect(self._apply_params_to_ui)
@@ -59,6 +63,7 @@ class MainUI(QMainWindow):
         self.project_manager.signal_projectmanager_project_activated.connect(self._on_project_activated)
         self.project_manager.signal_projectmanager_file_list_updated.connect(self._on_file_list_updated)
         self.project_manager.signal_projectmanager_scan_finished.connect(self._on_scan_finished)
+        self.project_manager.signal_projectmanager_file_list_changed.connect(self._on_file_list_changed)
 
         # TaskManager -> MainUI
         self.task_manager.signal_taskmanager_task_started.connect(self._on_task_started)
@@ -68,11 +73,14 @@ class MainUI(QMainWindow):
         self.task_manager.signal_taskmanager_translation_finished.connect(self._on_translation_result)
         self.task_manager.signal_taskmanager_batch_progress.connect(self._on_batch_progress)
         self.task_manager.signal_taskmanager_batch_finished.connect(self._on_batch_finished)
+        self.task_manager.signal_taskmanager_import_finished.connect(self._on_import_finished)
+        self.project_manager.signal_projectmanager_import_progress.connect(self._on_import_progress)
 
         # --- 状态标志 ---
         self._apply_view_state_on_display = False
 
         self.batch_progress_dialog = None
+        self.import_progress_dialog = None
 
         # --- 初始化帮助窗口 ---
         self.help_window = HelpWindow(self)
@@ -91,13 +99,61 @@ class MainUI(QMainWindow):
             QMessageBox.warning(self, "警告", "请先加载并处理图片。")
             return
 
-        # 转换图像为 QPixmap
-        main_result_pixmap = convert_cv_to_qpixmap(self.app_context.main_result_image)
-        preview_pixmap = convert_cv_to_qpixmap(self.app_context.preview_image)
-
-        # 创建并显示对比窗口
-        self.comparison_window = ImageComparisonWindow(main_result_pixmap, preview_pixmap, self)
+        # 可对比的图像：当前结果、当前预览、原图以及各阶段缓存的结果。
+        # 阶段结果只在被选中时才读取；这里捕获当前图片的引用，窗口打开后切换图片不影响对比内容。
+        identifier = self.app_context.current_image_identifier
+        main_result = self.app_context.main_result_image
+        preview = self.app_context.preview_image
+        original = self.app_context.original_image
+        sources = [
+            ("当前结果 (OCR图像)", lambda: main_result),
+            ("当前预览", lambda: preview),
+            ("原图", lambda: original),
+        ]
+        for stage_index, title in enumerate(STAGE_TITLES):
+            sources.append((f"{title} 结果", lambda i=stage_index: self.project_manager.load_stage_result(identifier, i)))
+
+        # 创建并显示对比窗口，初始的缩放和滚动与主视图一致
+        self.comparison_window = ImageComparisonWindow(sources, (0, 1), self)
         self.comparison_window.show()
+        self.comparison_window.view_state.update(
+            None, self.image_viewer.image_label.scale_factor,
+            self.image_viewer.scroll_area.horizontalScrollBar().value(),
+            self.image_viewer.scroll_area.verticalScrollBar().value()
+        )
+
+    def _display_pyramids(self):
+        # 当前存活的显示金字塔：主视图，以及打开中的对比窗口缓存的各幅图像
+        pyramids = [self.image_viewer.image_label.pyramid]
+        window = getattr(self, "comparison_window", None)
+        if window is not None and window.isVisible():
+            pyramids.extend(window.loaded_pyramids())
+        return pyramids
+
+    def _display_memory_usage(self):
+        return sum(pyramid.nbytes for pyramid in self._display_pyramids())
+
+    def _release_display_memory(self, nbytes):
+        # 只释放当前看不到的部分：先丢弃对比窗口中未显示的来源，再丢弃各视图在当前缩放比例下用不到的缩小层。
+        # 正在显示的层不释放，否则下一次绘制会立即在GUI线程中重新生成。
+        freed = 0
+        shown = [(self.image_viewer.image_label.pyramid, self.image_viewer.image_label.scale_factor)]
+        window = getattr(self, "comparison_window", None)
+        if window is not None and window.isVisible():
+            freed += window.release_hidden(nbytes)
+            shown.extend(window.shown_pyramids())
+        for pyramid, scale in shown:
+            if freed >= nbytes:
+                break
+            freed += pyramid.release_levels(keep={pyramid.level_index(scale)})
+        return freed
+
+    def _enforce_memory_budget(self):
+        total = self.memory_budget.enforce()
+        if self.memory_budget.limit_bytes:
+            self.memory_label.setText(f"内存: {total / MB:.0f} / {self.memory_budget.limit_bytes / MB:.0f} MB")
+        else:
+            self.memory_label.setText(f"内存: {total / MB:.0f} MB")
 
     def init_ui(self):
         main_widget = QWidget()
@@ -112,6 +168,20 @@ class MainUI(QMainWindow):
         self.control_panel = ControlPanel()
         main_layout.addWidget(self.control_panel, 2)
 
+        # --- 内存占用 ---
+        # 显示缓冲和缩略图登记到内存预算；定时检查预算并在状态栏显示当前占用
+        file_list_model = self.control_panel.file_list_model
+        self.memory_budget.register("thumbnails", lambda: file_list_model.thumbnail_nbytes,
+                                    file_list_model.release_thumbnails, PRIORITY_THUMBNAILS)
+        self.memory_budget.register("display", self._display_memory_usage, self._release_display_memory,
+                                    PRIORITY_DISPLAY)
+        self.memory_label = QLabel()
+        self.statusBar().addPermanentWidget(self.memory_label)
+        self.memory_timer = QTimer(self)
+        self.memory_timer.setInterval(1000)
+        self.memory_timer.timeout.connect(self._enforce_memory_budget)
+        self.memory_timer.start()
+
         # --- 初始化交互处理器 ---
         self.interaction_handler = ImageInteractionHandler(
             self.image_viewer.image_label,
@@ -138,6 +208,7 @@ class MainUI(QMainWindow):
         self.control_panel.signal_controlpanel_prev_stage_requested.connect(self.go_to_prev_stage)
         self.control_panel.signal_controlpanel_next_stage_requested.connect(self.go_to_next_stage)
         self.control_panel.signal_controlpanel_angle_reset_requested.connect(self.reset_angle)
+        self.control_panel.signal_controlpanel_angle_preview_requested.connect(self._preview_rotation)
         self.control_panel.signal_controlpanel_perspective_reset_requested.connect(self.reset_perspective)
         self.control_panel.signal_controlpanel_work_area_deleted.connect(self.delete_work_area)
         self.control_panel.signal_controlpanel_area_selection_changed.connect(self._update_overlays_slot)
@@ -178,8 +249,14 @@ class MainUI(QMainWindow):
                 page4.save_batch_btn.setText("批量保存所有图片"),
                 self.batch_progress_dialog.close() if self.batch_progress_dialog else None
             ),
+            TaskName.IMPORT_IMAGES: self._close_import_progress_dialog,
         }
 
+    def _close_import_progress_dialog(self):
+        if self.import_progress_dialog:
+            self.import_progress_dialog.close()
+            self.import_progress_dialog = None
+
     def _load_stylesheet(self):
         # Loads an external stylesheet.
         style_path = os.path.join(APP_ROOT, 'assets', 'style.qss')
@@ -192,6 +269,15 @@ class MainUI(QMainWindow):
 
     # --- Project Management Slots & Methods ---
 
+    def closeEvent(self, event):
+        # 退出前停止预取，等待后台队列中的阶段结果写盘完成，并关闭工程索引
+        self.app_context.close()
+        self.control_panel.file_list_model.loader.close()
+        self.project_manager.shutdown()
+        self.memory_timer.stop()
+        self.memory_budget.close()
+        super().closeEvent(event)
+
     def open_project_from_path(self, path):
         # 从给定的路径打开工程，用于命令行启动。
         if path and os.path.isdir(path):
@@ -223,8 +309,28 @@ class MainUI(QMainWindow):
         files, _ = QFileDialog.getOpenFileNames(self, "选择要导入的图片", "",
                                                 "图片文件 (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)")
         if files:
-            if not self.project_manager.import_images(files):
-                QMessageBox.warning(self, "导入失败", f"无法复制一个或多个文件，请查看控制台日志。")
+            self.task_manager.start_import(files)
+
+    def _show_import_progress_dialog(self, total):
+        self.import_progress_dialog = QProgressDialog("正在准备导入...", None, 0, total, self)
+        self.import_progress_dialog.setWindowTitle("导入进度")
+        self.import_progress_dialog.setWindowModality(Qt.WindowModal)
+        self.import_progress_dialog.show()
+
+    def _on_import_progress(self, current, total, filename):
+        if self.import_progress_dialog is None:
+            self._show_import_progress_dialog(total)
+        self.import_progress_dialog.setLabelText(f"正在导入: {filename} ({current}/{total})")
+        self.import_progress_dialog.setValue(current)
+
+    def _on_import_finished(self, result):
+        if result.failed:
+            QMessageBox.warning(self, "导入失败", f"无法复制 {len(result.failed)} 个文件，请查看控制台日志。")
+        elif result.duplicates:
+            QMessageBox.information(
+                self, "导入完成",
+                f"已导入 {len(result.imported)} 个文件，跳过 {len(result.duplicates)} 个工程中已存在的重复文件。"
+            )
 
     # --- End Project Management ---
 
@@ -285,6 +391,10 @@ class MainUI(QMainWindow):
 
             self.app_context.update_parameters(params_to_update)
 
+    def _preview_rotation(self, angle):
+        # 显示的图像已按当前参数旋转，只需预览与之的差值；参数在调整结束后才更新
+        self.image_viewer.image_label.set_preview_rotation(normalize_angle(angle - self.app_context.params.rotation_angle))
+
     def reset_angle(self):
         # 重置旋转角度
         # 只重置角度，不影响透视
@@ -306,12 +416,20 @@ class MainUI(QMainWindow):
     def _on_project_activated(self, path, name):
         # 当一个工程被激活时更新UI。
         self.setWindowTitle(f"图片处理与OCR工具 - [{name}]")
+        self.control_panel.set_project_path(path)
         self.set_project_ui_enabled(True)
 
     def _on_file_list_updated(self, file_list):
         # 当工程文件列表更新时，刷新UI列表。
         self.control_panel.update_file_list(file_list)
 
+    def _on_file_list_changed(self, added, removed):
+        # 工程文件夹中有文件增删时，只更新变化的条目；当前图片的行号可能随之改变
+        self.app_context.sync_current_image_index()
+        self.control_panel.apply_file_list_changes(
+            self.project_manager.file_list, added, removed, self.app_context.current_image_identifier
+        )
+
     def _on_scan_finished(self, has_files):
         if not has_files:
             QMessageBox.information(self, "提示", "工程文件夹中没有找到支持的图片文件。")
@@ -387,22 +505,34 @@ class MainUI(QMainWindow):
             self.display_images()
             self.control_panel.set_comparison_button_enabled(False)
 
+    def _on_proxy_ready(self):
+        # 完整图像仍在后台解码，先按原图尺寸显示缩小的代理图，并恢复该阶段保存的视图状态
+        self.image_viewer.set_image(self.app_context.proxy_image, self.app_context.proxy_scale)
+        self.image_viewer.image_label.set_overlays(None)
+        self._update_label_overlays(self.image_viewer.image_label)
+        self._apply_view_state()
+
     def display_images(self):
         # Main entry point to refresh the image display.
         # It decides whether to fit a new image or preserve the view for an updated one.
-        preview_pixmap = convert_cv_to_qpixmap(self.app_context.preview_image)
+        preview_image = self.app_context.preview_image
 
-        if preview_pixmap is None or preview_pixmap.isNull():
-            self.image_viewer.set_pixmap(QPixmap())
+        if preview_image is None:
+            self.image_viewer.set_image(None)
+            self.image_viewer.image_label.set_overlays(None)
             return
 
-        self.image_viewer.set_pixmap(preview_pixmap)
+        self.image_viewer.set_image(preview_image)
+        self.image_viewer.image_label.set_overlays(self.app_context.preview_overlays)
         self._update_label_overlays(self.image_viewer.image_label)
 
         if self._apply_view_state_on_display:
             self._apply_view_state()
             self._apply_view_state_on_display = False
 
+        # 新的图像已显示，立即检查内存预算，不必等到下一次定时检查
+        self._enforce_memory_budget()
+
     def _save_current_view_state(self):
         if not self.app_context.current_image_identifier:
             return
@@ -448,7 +578,7 @@ class MainUI(QMainWindow):
 
     def _update_overlays_slot(self):
         
-        if self.image_viewer and self.image_viewer.image_label.pixmap():
+        if self.image_viewer and self.image_viewer.image_label.has_image():
             self._update_label_overlays(self.image_viewer.image_label)
 
     def _handle_task_error(self, error_info):
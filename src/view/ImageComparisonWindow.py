@@ -3,23 +3,35 @@ from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
+    QBoxLayout,
     QLabel,
     QComboBox,
-    QStackedLayout
 )
 
+from .image_pyramid import ImagePyramid
 from .image_viewer import ImageViewer
+from .view_state_model import ViewStateModel
+
+# 对比窗口中各阶段结果的名称，与 core.stage_storage.STAGE_NAMES 一一对应
+STAGE_TITLES = ["阶段1 几何校正", "阶段2 二值化", "阶段3 降噪", "阶段4 输出"]
 
 
 class ImageComparisonWindow(QMainWindow):
-    def __init__(self, original_pixmap, processed_pixmap, parent=None):
+    # 并排对比任意两幅图像（原图、各阶段结果、当前预览等）。
+    # - 只有两个 ImageViewer，切换水平/垂直布局时只改变排列方向，不重建视图；
+    # - 图像在第一次被选中时才通过加载函数读取（例如从阶段缓存中），建好的金字塔按来源缓存，
+    #   两侧选择同一来源时共享同一个金字塔；
+    # - 两个视图的缩放和滚动通过一个共享的 ViewStateModel 同步。
+
+    def __init__(self, sources, default_indices=(0, 1), parent=None):
+        # sources: [(名称, 加载函数)]，加载函数返回 OpenCV 图像，没有结果时返回 None
         super().__init__(parent)
         self.setWindowTitle("图像对比窗口")
         self.setGeometry(150, 150, 1200, 600)
 
-        # 存储图像
-        self.original_pixmap = original_pixmap
-        self.processed_pixmap = processed_pixmap
+        self.sources = list(sources)
+        self._pyramids = {}  # 来源序号 -> ImagePyramid
+        self.view_state = ViewStateModel(self)
 
         # 创建中央部件
         central_widget = QWidget()
@@ -40,63 +52,77 @@ class ImageComparisonWindow(QMainWindow):
         control_layout.addStretch(1)
         main_layout.addLayout(control_layout)
 
-        # 创建图像显示区域
-        self.image_stacked_layout = QStackedLayout()
-
-        # 水平布局容器
-        horizontal_container = QWidget()
-        image_preview_layout_h = QHBoxLayout(horizontal_container)
-        self.viewer_h1 = ImageViewer("OCR图像")
-        self.viewer_h2 = ImageViewer("预览图像")
-        image_preview_layout_h.addWidget(self.viewer_h1, 1)
-        image_preview_layout_h.addWidget(self.viewer_h2, 1)
-
-        # 垂直布局容器
-        vertical_container = QWidget()
-        image_preview_layout_v = QVBoxLayout(vertical_container)
-        self.viewer_v1 = ImageViewer("OCR图像")
-        self.viewer_v2 = ImageViewer("预览图像")
-        image_preview_layout_v.addWidget(self.viewer_v1, 1)
-        image_preview_layout_v.addWidget(self.viewer_v2, 1)
-
-        self.image_stacked_layout.addWidget(horizontal_container)
-        self.image_stacked_layout.addWidget(vertical_container)
-        main_layout.addLayout(self.image_stacked_layout, 1)
+        # 创建图像显示区域：每侧一个来源选择框和一个视图
+        self.image_layout = QBoxLayout(QBoxLayout.LeftToRight)
+        self.viewers = []
+        self.source_combos = []
+        for side, default_index in enumerate(default_indices):
+            panel = QWidget()
+            panel_layout = QVBoxLayout(panel)
+            panel_layout.setContentsMargins(0, 0, 0, 0)
+
+            combo = QComboBox()
+            for name, _ in self.sources:
+                combo.addItem(name)
+            viewer = ImageViewer()
+            viewer.bind_view_state(self.view_state)
+            panel_layout.addWidget(combo)
+            panel_layout.addWidget(viewer, 1)
+            self.image_layout.addWidget(panel, 1)
+
+            self.viewers.append(viewer)
+            self.source_combos.append(combo)
+            combo.setCurrentIndex(default_index)
+            combo.currentIndexChanged.connect(lambda index, s=side: self.show_source(s, index))
+        main_layout.addLayout(self.image_layout, 1)
 
         # 显示图像
         self.display_images()
 
-        # 同步两个视图的滚动和缩放
-        self._sync_viewers(self.viewer_h1, self.viewer_h2)
-        self._sync_viewers(self.viewer_v1, self.viewer_v2)
-
     def update_image_layout(self, index):
-        self.image_stacked_layout.setCurrentIndex(index)
-
-    def _sync_viewers(self, viewer1, viewer2):
-        
-
-        # 1. 同步缩放滑块
-        viewer1.zoom_slider.valueChanged.connect(viewer2.zoom_slider.setValue)
-        viewer2.zoom_slider.valueChanged.connect(viewer1.zoom_slider.setValue)
-
-        # 2. 同步水平滚动条
-        scroll_bar1_h = viewer1.scroll_area.horizontalScrollBar()
-        scroll_bar2_h = viewer2.scroll_area.horizontalScrollBar()
-        scroll_bar1_h.valueChanged.connect(scroll_bar2_h.setValue)
-        scroll_bar2_h.valueChanged.connect(scroll_bar1_h.setValue)
-
-        # 3. 同步垂直滚动条
-        scroll_bar1_v = viewer1.scroll_area.verticalScrollBar()
-        scroll_bar2_v = viewer2.scroll_area.verticalScrollBar()
-        scroll_bar1_v.valueChanged.connect(scroll_bar2_v.setValue)
-        scroll_bar2_v.valueChanged.connect(scroll_bar1_v.setValue)
+        self.image_layout.setDirection(QBoxLayout.LeftToRight if index == 0 else QBoxLayout.TopToBottom)
 
     def display_images(self):
-        # 显示原始图像
-        self.viewer_h1.set_pixmap(self.original_pixmap)
-        self.viewer_v1.set_pixmap(self.original_pixmap)
-
-        # 显示处理后图像
-        self.viewer_h2.set_pixmap(self.processed_pixmap)
-        self.viewer_v2.set_pixmap(self.processed_pixmap)
+        for side, combo in enumerate(self.source_combos):
+            self.show_source(side, combo.currentIndex())
+
+    def show_source(self, side, index):
+        self.viewers[side].set_pyramid(self._get_pyramid(index))
+
+    def loaded_pyramids(self):
+        return [pyramid for pyramid in self._pyramids.values() if pyramid is not None]
+
+    def shown_pyramids(self):
+        # 两侧视图正在显示的金字塔及其缩放比例 [(金字塔, 比例)]
+        return [(viewer.image_label.pyramid, viewer.image_label.scale_factor) for viewer in self.viewers]
+
+    def release_hidden(self, nbytes):
+        # 丢弃两侧都没有显示的来源的金字塔（再次选择时重新加载），直到释放至少 nbytes 字节
+        shown = {self.source_combos[side].currentIndex() for side in range(len(self.viewers))}
+        freed = 0
+        for index in list(self._pyramids):
+            if freed >= nbytes:
+                break
+            pyramid = self._pyramids[index]
+            if index in shown or pyramid is None:
+                continue
+            freed += pyramid.nbytes
+            del self._pyramids[index]
+        return freed
+
+    def _get_pyramid(self, index):
+        if not (0 <= index < len(self.sources)):
+            return None
+        if index not in self._pyramids:
+            name, loader = self.sources[index]
+            pyramid = None
+            try:
+                image = loader()
+                if image is not None:
+                    pyramid = ImagePyramid()
+                    pyramid.set_image(image)
+            except Exception as e:
+                print(f"无法加载对比图像 {name}: {e}")
+                pyramid = None
+            self._pyramids[index] = pyramid
+        return self._pyramids[index]
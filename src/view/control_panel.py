@@ -1,11 +1,12 @@
 
-from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtCore import QSize, QSignalBlocker, pyqtSignal
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget,
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListView,
     QStackedWidget, QScrollArea, QGridLayout
 )
 
 from core.image_identifier import ImageIdentifier
+from .file_list_model import FileListModel
 from .pages.binarization_page import BinarizationPage
 from .pages.geometric_correction_page import GeometricCorrectionPage
 from .pages.noise_removal_page import NoiseRemovalPage
@@ -29,6 +30,7 @@ class ControlPanel(QWidget):
     # Page-specific signals forwarded from the pages
     # Stage 1
     signal_controlpanel_angle_reset_requested = pyqtSignal()
+    signal_controlpanel_angle_preview_requested = pyqtSignal(float)
     signal_controlpanel_perspective_reset_requested = pyqtSignal()
     signal_controlpanel_work_area_deleted = pyqtSignal(int)
     signal_controlpanel_area_selection_changed = pyqtSignal()
@@ -69,9 +71,14 @@ class ControlPanel(QWidget):
         layout.addLayout(top_button_layout)
 
         # --- File list ---
-        self.file_list_widget = QListWidget()
-        self.file_list_widget.setMaximumHeight(133)
-        layout.addWidget(self.file_list_widget)
+        # 基于模型的列表只为可见行取数据，超大工程也能流畅滚动；缩略图在后台生成
+        self.file_list_model = FileListModel(self)
+        self.file_list_view = QListView()
+        self.file_list_view.setModel(self.file_list_model)
+        self.file_list_view.setUniformItemSizes(True)
+        self.file_list_view.setIconSize(QSize(self.file_list_model.thumbnail_size, self.file_list_model.thumbnail_size))
+        self.file_list_view.setMaximumHeight(133)
+        layout.addWidget(self.file_list_view)
 
         # --- Parameter pages ---
         self.processing_stack = QStackedWidget()
@@ -109,7 +116,9 @@ class ControlPanel(QWidget):
         self.open_project_btn.clicked.connect(self.signal_controlpanel_open_project_requested)
         self.import_images_btn.clicked.connect(self.signal_controlpanel_import_images_requested)
         self.show_comparison_btn.clicked.connect(self.signal_controlpanel_show_comparison_requested)
-        self.file_list_widget.currentRowChanged.connect(self.signal_controlpanel_file_selection_changed)
+        self.file_list_view.selectionModel().currentRowChanged.connect(
+            lambda current, _previous: self.signal_controlpanel_file_selection_changed.emit(current.row())
+        )
 
         # Navigation
         self.help_btn.clicked.connect(self.signal_controlpanel_help_requested)
@@ -118,6 +127,9 @@ class ControlPanel(QWidget):
 
         # Forward signals from pages
         self.stage1_page.signal_geometriccorrectionpage_angle_reset_requested.connect(self.signal_controlpanel_angle_reset_requested)
+        self.stage1_page.signal_geometriccorrectionpage_angle_preview_requested.connect(self.signal_controlpanel_angle_preview_requested)
+        self.stage1_page.signal_geometriccorrectionpage_angle_changed.connect(
+            lambda angle: self.signal_controlpanel_parameters_changed.emit({'rotation_angle': angle}))
         self.stage1_page.signal_geometriccorrectionpage_perspective_reset_requested.connect(self.signal_controlpanel_perspective_reset_requested)
         self.stage1_page.signal_geometriccorrectionpage_work_area_deleted.connect(self.signal_controlpanel_work_area_deleted)
         self.stage1_page.signal_geometriccorrectionpage_area_selection_changed.connect(self.signal_controlpanel_area_selection_changed)
@@ -145,12 +157,31 @@ class ControlPanel(QWidget):
         self.prev_btn.setEnabled(is_project_active and current_stage > 0)
         self.next_btn.setEnabled(is_project_active and current_stage < total_stages - 1)
 
+    def set_project_path(self, project_path):
+        # 缩略图缓存位于工程文件夹中
+        self.file_list_model.set_project(project_path)
+
     def update_file_list(self, file_list: list[ImageIdentifier]):
-        self.file_list_widget.clear()
+        self.file_list_model.set_file_list(file_list)
         if file_list:
-            for identifier in file_list:
-                self.file_list_widget.addItem(identifier.display_name)
-            self.file_list_widget.setCurrentRow(0)
+            self._set_current_row(0)
+
+    def apply_file_list_changes(self, file_list, added, removed, current_identifier):
+        # 增量更新文件列表：只删除/插入变化的条目，当前选中的图片保持不变，不会触发重新加载。
+        # 只有当前图片被删除时，才会选中第一项（并发出选择变化信号）。
+        selection_model = self.file_list_view.selectionModel()
+        with QSignalBlocker(selection_model):
+            self.file_list_model.apply_changes(file_list, added, removed)
+            current_row = self.file_list_model.row_of(current_identifier)
+            if current_row >= 0:
+                self._set_current_row(current_row)
+        if current_row < 0 and file_list:
+            self._set_current_row(0)
+
+    def _set_current_row(self, row):
+        index = self.file_list_model.index(row)
+        self.file_list_view.setCurrentIndex(index)
+        self.file_list_view.scrollTo(index)
 
     def set_current_stage(self, index):
         self.processing_stack.setCurrentIndex(index)
@@ -0,0 +1,61 @@
+# src/view/display_image.py
+import numpy as np
+from PyQt5.QtGui import QImage
+
+# 通道数 -> QImage 格式（OpenCV 的彩色图为 BGR 顺序）
+_QIMAGE_FORMATS = {
+    1: QImage.Format_Grayscale8,
+    3: QImage.Format_BGR888,
+}
+
+
+class DisplayBuffer:
+    # 显示用的像素缓冲：一块自有的连续 uint8 数组，以及直接引用这块内存的 QImage。
+    # - 数组由本对象持有，QImage 存在期间其内存不会被释放；
+    # - 尺寸不变时新图片直接复制进已有的数组，QImage 不必重建，刷新时不再分配内存；
+    # - 复制只有一次，非连续的数组（例如第一阶段裁剪出的视图）也在这次复制中变为连续。
+    # 绘制时直接使用 QImage (QPainter.drawImage)，不再转换为 QPixmap。
+
+    def __init__(self):
+        self.array = None
+        self.image = QImage()
+
+    @property
+    def width(self):
+        return self.image.width()
+
+    @property
+    def height(self):
+        return self.image.height()
+
+    def is_null(self):
+        return self.array is None
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes if self.array is not None else 0
+
+    def ensure(self, shape):
+        # 保证缓冲的形状为 shape（(高, 宽) 或 (高, 宽, 通道)），需要重新分配时返回 True
+        if self.array is not None and self.array.shape == shape:
+            return False
+        channels = shape[2] if len(shape) == 3 else 1
+        image_format = _QIMAGE_FORMATS.get(channels)
+        if image_format is None:
+            raise ValueError(f"不支持显示 {channels} 通道的图像")
+        self.array = np.empty(shape, dtype=np.uint8)
+        height, width = shape[:2]
+        self.image = QImage(self.array.data, width, height, self.array.strides[0], image_format)
+        return True
+
+    def assign(self, cv_img):
+        # 把图像复制进缓冲，返回是否重新分配了缓冲
+        if cv_img.ndim == 3 and cv_img.shape[2] == 1:
+            cv_img = cv_img[:, :, 0]
+        reallocated = self.ensure(cv_img.shape)
+        np.copyto(self.array, cv_img)
+        return reallocated
+
+    def clear(self):
+        self.array = None
+        self.image = QImage()
@@ -0,0 +1,171 @@
+# src/view/file_list_model.py
+import threading
+from collections import OrderedDict, deque
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+from core.thumbnail_cache import ThumbnailCache, DEFAULT_THUMBNAIL_SIZE
+
+# 内存中保留的缩略图数量，超出后按最近使用淘汰（磁盘缓存不受影响）
+MAX_THUMBNAILS_IN_MEMORY = 512
+# 待生成队列的上限。快速滚动时只保留最近请求的（即当前可见的）行，过期的请求直接丢弃。
+MAX_PENDING_THUMBNAILS = 128
+
+
+class ThumbnailLoader(QObject):
+    # 在后台线程中按需生成/读取缩略图，完成后通过信号把 QImage 交给GUI线程。
+    # 后请求的先处理 (LIFO)，因此滚动停下后可见行的缩略图最先出现。
+
+    signal_thumbnailloader_thumbnail_ready = pyqtSignal(object, QImage)  # identifier, image
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cache = None
+        self._pending = deque()
+        self._pending_set = set()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="ThumbnailLoader", daemon=True)
+        self._thread.start()
+
+    def set_project(self, project_path, size=DEFAULT_THUMBNAIL_SIZE):
+        with self._cond:
+            self._cache = ThumbnailCache(project_path, size) if project_path else None
+            self._pending.clear()
+            self._pending_set.clear()
+
+    def request(self, identifier):
+        with self._cond:
+            if self._cache is None or identifier in self._pending_set:
+                return
+            self._pending.append(identifier)
+            self._pending_set.add(identifier)
+            while len(self._pending) > MAX_PENDING_THUMBNAILS:
+                self._pending_set.discard(self._pending.popleft())
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                identifier = self._pending.pop()
+                self._pending_set.discard(identifier)
+                cache = self._cache
+
+            path = cache.get(identifier) if cache is not None else None
+            image = QImage(path) if path else QImage()
+            self.signal_thumbnailloader_thumbnail_ready.emit(identifier, image)
+
+
+class FileListModel(QAbstractListModel):
+    # 工程文件列表的模型。视图只为可见的行请求数据，因此5万页的工程也只需持有一个标识列表；
+    # 缩略图在首次显示时才在后台生成，并缓存在磁盘上。
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._file_list = []
+        self._rows = {}                    # identifier -> row，避免在大列表中线性查找
+        self._thumbnails = OrderedDict()   # identifier -> QPixmap
+        self._failed = set()               # 无法生成缩略图的条目，不再重复请求
+        self.thumbnail_size = DEFAULT_THUMBNAIL_SIZE
+        self._placeholder = QPixmap(self.thumbnail_size, self.thumbnail_size)
+        self._placeholder.fill(Qt.lightGray)
+
+        self.loader = ThumbnailLoader(self)
+        self.loader.signal_thumbnailloader_thumbnail_ready.connect(self._on_thumbnail_ready)
+
+    def set_project(self, project_path):
+        self.loader.set_project(project_path, self.thumbnail_size)
+        self._thumbnails.clear()
+        self._failed.clear()
+
+    @property
+    def thumbnail_nbytes(self):
+        # 内存中缩略图的大致字节数（按 32 位像素估算）
+        return len(self._thumbnails) * self.thumbnail_size * self.thumbnail_size * 4
+
+    def release_thumbnails(self, nbytes):
+        # 按最近使用顺序淘汰内存中的缩略图（磁盘缓存保留，再次显示时重新读取），返回释放的字节数
+        per_item = self.thumbnail_size * self.thumbnail_size * 4
+        freed = 0
+        while self._thumbnails and freed < nbytes:
+            self._thumbnails.popitem(last=False)
+            freed += per_item
+        return freed
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._file_list)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._file_list)):
+            return None
+        identifier = self._file_list[index.row()]
+        if role == Qt.DisplayRole:
+            return identifier.display_name
+        if role == Qt.DecorationRole:
+            pixmap = self._thumbnails.get(identifier)
+            if pixmap is not None:
+                self._thumbnails.move_to_end(identifier)
+                return pixmap
+            if identifier not in self._failed:
+                self.loader.request(identifier)
+            return self._placeholder
+        if role == Qt.UserRole:
+            return identifier
+        return None
+
+    def identifier_at(self, row):
+        return self._file_list[row] if 0 <= row < len(self._file_list) else None
+
+    def row_of(self, identifier):
+        return self._rows.get(identifier, -1)
+
+    def set_file_list(self, file_list):
+        self.beginResetModel()
+        self._file_list = list(file_list)
+        self._rebuild_rows()
+        self.endResetModel()
+
+    def _rebuild_rows(self):
+        self._rows = {identifier: row for row, identifier in enumerate(self._file_list)}
+
+    def apply_changes(self, file_list, added, removed):
+        # 增量更新：逐段删除/插入变化的行，未变化的行（及其选中状态）保持不变
+        removed_set = set(removed)
+        added_set = set(added)
+        for row in reversed(range(len(self._file_list))):
+            if self._file_list[row] in removed_set:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                identifier = self._file_list.pop(row)
+                self._thumbnails.pop(identifier, None)
+                self.endRemoveRows()
+        # file_list 已排序，按最终位置从前往后插入即可
+        for row, identifier in enumerate(file_list):
+            if identifier in added_set:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._file_list.insert(row, identifier)
+                self.endInsertRows()
+        self._rebuild_rows()
+
+    def _on_thumbnail_ready(self, identifier, image):
+        row = self.row_of(identifier)
+        if row < 0:
+            return
+        if image.isNull():
+            self._failed.add(identifier)
+            return
+        self._thumbnails[identifier] = QPixmap.fromImage(image)
+        while len(self._thumbnails) > MAX_THUMBNAILS_IN_MEMORY:
+            self._thumbnails.popitem(last=False)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
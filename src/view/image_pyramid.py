@@ -0,0 +1,125 @@
+# src/view/image_pyramid.py
+import math
+
+import cv2
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QPainter
+
+from .display_image import DisplayBuffer
+
+# 每层的瓦片边长（像素）。只绘制与可见区域相交的瓦片，单次缩放的临时缓冲不超过一块瓦片。
+PYRAMID_TILE_SIZE = 512
+# 最小一层的长边不小于该值，再小的缩放比例直接由这一层缩小绘制
+MIN_LEVEL_SIZE = 256
+
+
+class ImagePyramid:
+    # 一张图片的多分辨率金字塔 (mip-map)：第0层是原图，之后每层长宽减半。
+    # 各层在第一次需要时才由上一层缩小生成，总内存不超过原图的 4/3，与缩放比例无关。
+    # 每层都是一个 DisplayBuffer：图片刷新而尺寸不变时，各层原地重新生成，不重新分配内存。
+    # 第0层也可以是原图的缩小版本（source_scale < 1，例如完整解码之前先显示的代理图），
+    # 此时 width/height 仍是原图的尺寸，绘制时按比例放大，与完整图像的坐标一致。
+
+    def __init__(self):
+        self.levels = []
+        self._valid = set()      # 与当前图片一致的层号，其余层需要重新生成
+        self.source_scale = 1.0  # 第0层相对原图的比例
+
+    @property
+    def width(self):
+        return int(round(self.levels[0].width / self.source_scale)) if self._valid else 0
+
+    @property
+    def height(self):
+        return int(round(self.levels[0].height / self.source_scale)) if self._valid else 0
+
+    def is_null(self):
+        return 0 not in self._valid
+
+    def set_image(self, cv_img, source_scale=1.0):
+        self.source_scale = source_scale
+        if not self.levels:
+            self.levels.append(DisplayBuffer())
+        if self.levels[0].assign(cv_img):
+            # 尺寸变化，旧的各层缓冲不再可用
+            del self.levels[1:]
+        self._valid = {0}
+
+    def clear(self):
+        self.levels = []
+        self._valid = set()
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+    def release_levels(self, keep=()):
+        # 丢弃第0层和 keep 中各层之外的缩小层（需要时会重新生成），返回释放的字节数。
+        # keep 通常是当前缩放比例正在使用的层，丢弃它只会在下一次绘制时立即重新生成。
+        freed = 0
+        for i in range(1, len(self.levels)):
+            if i not in keep and self.levels[i].nbytes:
+                freed += self.levels[i].nbytes
+                self.levels[i].clear()
+                self._valid.discard(i)
+        while len(self.levels) > 1 and self.levels[-1].is_null():
+            self.levels.pop()
+        return freed
+
+    def level_index(self, scale):
+        # 按 scale 绘制时使用的层号：分辨率不低于显示所需的最小一层，
+        # 这样绘制时最多缩小一半，插值质量稳定，也不会处理多余的像素。
+        if self.is_null():
+            return 0
+        level = 0
+        if scale > 0:
+            level = max(0, int(math.floor(-math.log2(scale / self.source_scale))))
+        while level > 0 and max(self.levels[0].width, self.levels[0].height) >> level < MIN_LEVEL_SIZE:
+            level -= 1
+        return level
+
+    def level_for_scale(self, scale):
+        # 返回 (层, 该层相对原图的比例)
+        buffer = self._get_level(self.level_index(scale))
+        return buffer, buffer.width / self.width
+
+    def _get_level(self, level):
+        if level in self._valid:
+            return self.levels[level]
+        while len(self.levels) <= level:
+            self.levels.append(DisplayBuffer())
+        # 从最近的一个有效的更大层开始逐层缩小
+        start = max(i for i in self._valid if i < level)
+        for i in range(start + 1, level + 1):
+            previous = self.levels[i - 1].array
+            height, width = previous.shape[:2]
+            shape = (max(1, (height + 1) // 2), max(1, (width + 1) // 2)) + previous.shape[2:]
+            self.levels[i].ensure(shape)
+            # INTER_AREA 按面积平均缩小，写入已有的缓冲
+            cv2.resize(previous, (shape[1], shape[0]), dst=self.levels[i].array, interpolation=cv2.INTER_AREA)
+            self._valid.add(i)
+        return self.levels[level]
+
+    def paint(self, painter: QPainter, scale, exposed):
+        # 在控件坐标系中按 scale 绘制图片中落在 exposed 区域内的部分
+        if self.is_null():
+            return
+        buffer, level_scale = self.level_for_scale(scale)
+        ratio = scale / level_scale  # 控件像素 / 层像素
+        visible = QRectF(exposed).intersected(QRectF(0, 0, buffer.width * ratio, buffer.height * ratio))
+        if visible.isEmpty():
+            return
+
+        # 可见区域换算到层坐标，再按瓦片逐块绘制
+        left, top = visible.left() / ratio, visible.top() / ratio
+        right, bottom = visible.right() / ratio, visible.bottom() / ratio
+        tile = PYRAMID_TILE_SIZE
+        for ty in range(int(top) // tile, int(math.ceil(bottom)) // tile + 1):
+            for tx in range(int(left) // tile, int(math.ceil(right)) // tile + 1):
+                source = QRectF(tx * tile, ty * tile, tile, tile).intersected(
+                    QRectF(left, top, right - left, bottom - top))
+                if source.isEmpty():
+                    continue
+                target = QRectF(source.left() * ratio, source.top() * ratio,
+                                source.width() * ratio, source.height() * ratio)
+                painter.drawImage(target, buffer.image, source)
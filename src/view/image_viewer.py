@@ -11,6 +11,8 @@ class ImageViewer(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._view_state_model = None
+        self._applying_view_state = False
         self._init_ui()
         self._connect_signals()
 
@@ -52,6 +54,8 @@ class ImageViewer(QWidget):
         self.v_pan_slider.valueChanged.connect(self.scroll_area.verticalScrollBar().setValue)
         self.scroll_area.horizontalScrollBar().valueChanged.connect(self.h_pan_slider.setValue)
         self.scroll_area.verticalScrollBar().valueChanged.connect(self.v_pan_slider.setValue)
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(self.image_label.notify_view_changing)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.image_label.notify_view_changing)
         self.scroll_area.horizontalScrollBar().rangeChanged.connect(
             lambda min_val, max_val: self.h_pan_slider.setRange(min_val, max_val)
         )
@@ -64,16 +68,51 @@ class ImageViewer(QWidget):
         self.image_label.scale_factor = scale_factor
         self.image_label.update_scaled_pixmap()
 
-    def set_pixmap(self, pixmap):
-        self.image_label.set_pixmap(pixmap)
+    def set_image(self, cv_img, source_scale=1.0):
+        self.image_label.set_image(cv_img, source_scale)
+
+    def set_pyramid(self, pyramid):
+        # 显示一个已建好的金字塔（可与其他视图共享），保持当前缩放比例
+        self.image_label.set_pyramid(pyramid)
+
+    def bind_view_state(self, model):
+        # 与其他视图通过 ViewStateModel 同步缩放和滚动
+        self._view_state_model = model
+        self.zoom_slider.valueChanged.connect(self._push_view_state)
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(self._push_view_state)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self._push_view_state)
+        model.signal_viewstatemodel_changed.connect(self._on_view_state_changed)
+
+    def _push_view_state(self, *_):
+        if self._applying_view_state or self._view_state_model is None:
+            return
+        self._view_state_model.update(
+            self, self.image_label.scale_factor,
+            self.scroll_area.horizontalScrollBar().value(), self.scroll_area.verticalScrollBar().value()
+        )
+
+    def _on_view_state_changed(self, source):
+        if source is self:
+            return
+        model = self._view_state_model
+        self._applying_view_state = True
+        try:
+            with QSignalBlocker(self.zoom_slider):
+                self.zoom_slider.setValue(int(model.zoom * 100))
+            if self.image_label.scale_factor != model.zoom:
+                self.image_label.scale_factor = model.zoom
+                self.image_label.update_scaled_pixmap()
+            self.scroll_area.horizontalScrollBar().setValue(model.h_scroll)
+            self.scroll_area.verticalScrollBar().setValue(model.v_scroll)
+        finally:
+            self._applying_view_state = False
 
     def fit_to_view(self):
         # 缩放图像以完全适应视口，根据需要放大或缩小。
-        pixmap = self.image_label.original_pixmap
-        if pixmap is None or pixmap.isNull():
+        if not self.image_label.has_image():
             return
 
-        image_size = pixmap.size()
+        image_size = self.image_label.image_rect().size()
         # 为滚动区域的边框进行微调，以防止不必要的滚动条出现。
         viewport_size = self.scroll_area.viewport().size() - QSize(2, 2)
 
@@ -39,6 +39,8 @@ class BinarizationPage(QWidget):
         self.thresh_method_combo.addItem("全局阈值 (Global)", "global")
         self.thresh_method_combo.addItem("自适应阈值 (Adaptive)", "adaptive")
         self.thresh_method_combo.addItem("大津法 (Otsu)", "otsu")
+        self.thresh_method_combo.addItem("Sauvola 局部阈值", "sauvola")
+        self.thresh_method_combo.addItem("Wolf 局部阈值", "wolf")
         self.thresh_method_combo.currentIndexChanged.connect(self._on_thresh_method_changed)
         thresh_layout.addWidget(self.thresh_method_combo)
 
@@ -69,13 +71,33 @@ class BinarizationPage(QWidget):
             lambda val: self.parameters_changed.emit({'thresh_blocksize': val}))
         adaptive_layout.addWidget(self.thresh_blocksize_control)
 
+        # 常量 C 只用于自适应阈值
+        self.thresh_c_widget = QWidget()
+        thresh_c_layout = QVBoxLayout(self.thresh_c_widget)
+        thresh_c_layout.setContentsMargins(0, 0, 0, 0)
         self.thresh_c_label = QLabel("常量 C:")
-        adaptive_layout.addWidget(self.thresh_c_label)
+        thresh_c_layout.addWidget(self.thresh_c_label)
         self.thresh_c_control = SliderSpinBox(is_float=False)
         self.thresh_c_control.setRange(0, 50)
         self.thresh_c_control.value_changed_finished.connect(
             lambda val: self.parameters_changed.emit({'thresh_c': val}))
-        adaptive_layout.addWidget(self.thresh_c_control)
+        thresh_c_layout.addWidget(self.thresh_c_control)
+        adaptive_layout.addWidget(self.thresh_c_widget)
+
+        # 灵敏度 k 只用于 Sauvola / Wolf
+        self.thresh_k_widget = QWidget()
+        thresh_k_layout = QVBoxLayout(self.thresh_k_widget)
+        thresh_k_layout.setContentsMargins(0, 0, 0, 0)
+        self.thresh_k_label = QLabel("灵敏度 k:")
+        thresh_k_layout.addWidget(self.thresh_k_label)
+        self.thresh_k_control = SliderSpinBox(is_float=True)
+        self.thresh_k_control.setRange(0, 1.0)
+        self.thresh_k_control.setToolTip("k 越大，阈值越低，保留的笔画越少。\n"
+                                         "Sauvola 常用 0.2-0.5，Wolf 常用 0.5。")
+        self.thresh_k_control.value_changed_finished.connect(
+            lambda val: self.parameters_changed.emit({'thresh_k': val}))
+        thresh_k_layout.addWidget(self.thresh_k_control)
+        adaptive_layout.addWidget(self.thresh_k_widget)
         thresh_layout.addWidget(self.adaptive_params_widget)
         main_layout.addWidget(thresh_group)
 
@@ -126,10 +148,16 @@ class BinarizationPage(QWidget):
 
     def _on_thresh_method_changed(self):
         method = self.thresh_method_combo.currentData()
-        self.global_params_widget.setVisible(method == "global")
-        self.adaptive_params_widget.setVisible(method == "adaptive")
+        self._update_thresh_params_visibility(method)
         self.parameters_changed.emit({'thresh_method': method})
 
+    def _update_thresh_params_visibility(self, method):
+        # 根据方法显示/隐藏对应的参数面板
+        self.global_params_widget.setVisible(method == "global")
+        self.adaptive_params_widget.setVisible(method in ("adaptive", "sauvola", "wolf"))
+        self.thresh_c_widget.setVisible(method == "adaptive")
+        self.thresh_k_widget.setVisible(method in ("sauvola", "wolf"))
+
     def set_params(self, params: ProcessingParameters):
 
         blur_ksize = params.blur_ksize
@@ -144,9 +172,7 @@ class BinarizationPage(QWidget):
         index = self.thresh_method_combo.findData(method)
         self.thresh_method_combo.setCurrentIndex(index if index != -1 else 0)
 
-        # 根据方法显示/隐藏对应的参数面板
-        self.global_params_widget.setVisible(method == "global")
-        self.adaptive_params_widget.setVisible(method == "adaptive")
+        self._update_thresh_params_visibility(method)
 
         # 设置全局阈值参数
         thresh_value = params.thresh_value
@@ -159,6 +185,9 @@ class BinarizationPage(QWidget):
         c_val = params.thresh_c
         self.thresh_c_control.setValue(c_val)
 
+        # 设置 Sauvola / Wolf 参数
+        self.thresh_k_control.setValue(params.thresh_k)
+
     def configure_for_image(self, image):
         
         if image is None:
@@ -1,10 +1,15 @@
 # geometric_correction_page.py
-from PyQt5.QtCore import pyqtSignal, Qt
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QGroupBox, QHBoxLayout, QListWidget, QAbstractItemView, \
     QLabel, QMessageBox
 
-from core.param_utils import deserialize_rect_list
+from core.param_utils import deserialize_rect_list, normalize_angle
 from core.parameters import ProcessingParameters
+from view.slider_spinbox import SliderSpinBox
+
+# 角度微调停止多久之后才真正执行旋转（毫秒）。调整过程中只在界面上预览。
+ANGLE_COMMIT_DELAY_MS = 400
+
 
 
 class GeometricCorrectionPage(QWidget):
@@ -12,6 +17,8 @@ class GeometricCorrectionPage(QWidget):
     # 定义信号，通知主窗口用户希望执行什么操作
     signal_geometriccorrectionpage_angle_correction_requested = pyqtSignal() # 角度校正信号
     signal_geometriccorrectionpage_angle_reset_requested = pyqtSignal() # 角度重置信号
+    signal_geometriccorrectionpage_angle_preview_requested = pyqtSignal(float) # 微调过程中的角度，仅用于预览
+    signal_geometriccorrectionpage_angle_changed = pyqtSignal(float) # 微调结束后的角度，执行真正的旋转
 
     signal_geometriccorrectionpage_area_selection_requested = pyqtSignal() # 工作区选择信号
     signal_geometriccorrectionpage_area_selection_changed = pyqtSignal() # ？
@@ -25,6 +32,11 @@ class GeometricCorrectionPage(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._angle_commit_timer = QTimer(self)
+        self._angle_commit_timer.setSingleShot(True)
+        self._angle_commit_timer.setInterval(ANGLE_COMMIT_DELAY_MS)
+        self._angle_commit_timer.timeout.connect(self._commit_angle)
+        self._committed_angle = 0.0
         self.init_ui()
 
     def init_ui(self):
@@ -65,6 +77,15 @@ class GeometricCorrectionPage(QWidget):
         self.angle_label = QLabel("当前角度: 0.00°")
         tools_layout.addWidget(self.angle_label)
 
+        self.angle_fine_control = SliderSpinBox(is_float=True)
+        # 两点校正常见 90°/180° 的结果，范围覆盖整圈，避免被截断
+        self.angle_fine_control.setRange(-180.0, 180.0)
+        self.angle_fine_control.setSingleStep(0.1)
+        self.angle_fine_control.setToolTip("拖动滑块微调旋转角度，调整时实时预览，停止后再执行旋转。")
+        self.angle_fine_control.value_changing.connect(self._on_angle_changing)
+        self.angle_fine_control.value_changed_finished.connect(self._commit_angle)
+        tools_layout.addWidget(self.angle_fine_control)
+
         main_layout.addWidget(tools_group)
 
         # --- 工作区域组 ---
@@ -126,6 +147,18 @@ class GeometricCorrectionPage(QWidget):
         current_row = self.work_areas_list.row(selected_items[0])
         self.signal_geometriccorrectionpage_work_area_deleted.emit(current_row)
 
+    def _on_angle_changing(self, angle):
+        self.signal_geometriccorrectionpage_angle_preview_requested.emit(angle)
+        self._angle_commit_timer.start()
+
+    def _commit_angle(self):
+        self._angle_commit_timer.stop()
+        angle = self.angle_fine_control.value()
+        # 与参数中的角度比较（换算到同一范围），未调整时不触发旋转
+        if abs(normalize_angle(angle - self._committed_angle)) > 1e-6:
+            self._committed_angle = angle
+            self.signal_geometriccorrectionpage_angle_changed.emit(angle)
+
     def clear_work_area_selection(self):
         
         # 将当前行设置为-1会同时清除选中和焦点，并自动触发 currentRowChanged 信号
@@ -137,6 +170,13 @@ class GeometricCorrectionPage(QWidget):
         # 更新角度显示
         angle = params.rotation_angle
         self.angle_label.setText(f"当前角度: {angle:.2f}°")
+        self._angle_commit_timer.stop()
+        blocked = self.angle_fine_control.blockSignals(True)
+        try:
+            self.angle_fine_control.setValue(normalize_angle(angle))
+        finally:
+            self.angle_fine_control.blockSignals(blocked)
+        self._committed_angle = angle
 
         # 更新透视校正状态显示
         if params.perspective_points:
@@ -12,6 +12,8 @@ class SliderSpinBox(QWidget):
 
     # 当用户完成交互（释放滑块或完成输入）时，发射此信号
     value_changed_finished = pyqtSignal(float)  # 使用float以兼容整数和浮点数
+    # 交互过程中数值每次变化（拖动滑块、输入框步进）都发射，用于实时预览
+    value_changing = pyqtSignal(float)
 
     def __init__(self, is_float=False, parent=None):
         super().__init__(parent)
@@ -59,6 +61,7 @@ class SliderSpinBox(QWidget):
             self.spinbox.setValue(value)
         finally:
             self.spinbox.blockSignals(blocked)
+        self.value_changing.emit(self.value())
 
     def _update_slider_from_spinbox(self, spinbox_value):
         # 临时阻塞信号，防止无限循环
@@ -68,6 +71,7 @@ class SliderSpinBox(QWidget):
             self.slider.setValue(value)
         finally:
             self.slider.blockSignals(blocked)
+        self.value_changing.emit(self.value())
 
     def _emit_final_value(self):
         self.value_changed_finished.emit(self.value())
@@ -89,6 +93,10 @@ class SliderSpinBox(QWidget):
         step = (max_val - min_val) / 100.0
         self.spinbox.setSingleStep(step if self._is_float else max(1, round(step)))
 
+    def setSingleStep(self, step):
+        # 覆盖 setRange 按范围自动计算的步进
+        self.spinbox.setSingleStep(step)
+
     def setValue(self, value):
         self.spinbox.setValue(value)
 
@@ -0,0 +1,22 @@
+# src/view/view_state_model.py
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class ViewStateModel(QObject):
+    # 多个 ImageViewer 共享的缩放/滚动状态。
+    # 每个视图只把自己的变化写入模型，再由模型通知其他视图；数值没有变化时不发信号，
+    # 因此不会出现视图之间互相转发的信号循环。
+
+    signal_viewstatemodel_changed = pyqtSignal(object)  # 发起变化的视图（外部设置时为 None）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.zoom = 1.0
+        self.h_scroll = 0
+        self.v_scroll = 0
+
+    def update(self, source, zoom, h_scroll, v_scroll):
+        if (zoom, h_scroll, v_scroll) == (self.zoom, self.h_scroll, self.v_scroll):
+            return
+        self.zoom, self.h_scroll, self.v_scroll = zoom, h_scroll, v_scroll
+        self.signal_viewstatemodel_changed.emit(source)
@@ -1,13 +1,18 @@
 # zoomable_label.py
 
-from PyQt5.QtCore import Qt, pyqtSignal, QPoint, QRect, QRectF
-from PyQt5.QtGui import QPainter, QPen, QColor, QPixmap, QPainterPath
+import numpy as np
+from PyQt5.QtCore import Qt, pyqtSignal, QPoint, QRect, QRectF, QSize, QTimer
+from PyQt5.QtGui import QPainter, QPen, QColor, QPainterPath, QPolygon, QTransform
 from PyQt5.QtWidgets import QLabel
 
+from .image_pyramid import ImagePyramid
 from .interaction_states import (InteractionState, IdleState, AngleCorrectionState, AreaSelectionState,
                                  PerspectiveCorrectionState, EditAreaState,
                                  InteractionMode)
 
+# 缩放/平移停止多久之后改用平滑插值重绘（毫秒）
+SMOOTH_REPAINT_DELAY_MS = 150
+
 
 class ZoomableLabel(QLabel):
     # 定义信号，当交互完成时发射
@@ -19,8 +24,22 @@ class ZoomableLabel(QLabel):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setScaledContents(False)
-        self.original_pixmap = None
         self.scale_factor = 1.0
+        self._pyramid = ImagePyramid()
+        # 旋转预览的角度（度，与 rotate_image 的方向一致）。只在绘制时用 QTransform 旋转，
+        # 不重新执行流水线；新的处理结果显示时归零。
+        self.preview_rotation = 0.0
+
+        # 预览叠加层（core.overlay.OverlayLayer 的序列），按当前缩放以矢量方式绘制
+        self.overlays = ()
+        self._overlay_polygons = {}   # (层序号, 轮廓序号) -> QPolygon，首次绘制时才转换
+
+        # 缩放或平移过程中使用快速插值，停止后由定时器触发一次平滑重绘
+        self._fast_transform = False
+        self._smooth_timer = QTimer(self)
+        self._smooth_timer.setSingleShot(True)
+        self._smooth_timer.setInterval(SMOOTH_REPAINT_DELAY_MS)
+        self._smooth_timer.timeout.connect(self._on_interaction_idle)
 
         self.interaction_mode = InteractionMode.NONE
         self.current_state: InteractionState = IdleState(self)
@@ -70,7 +89,7 @@ class ZoomableLabel(QLabel):
 
     def _to_image_coords(self, pos: QPoint) -> QPoint:
         # 将控件内的点击坐标转换为原始图片的坐标
-        if self.original_pixmap is None or self.scale_factor == 0:
+        if not self.has_image() or self.scale_factor == 0:
             return pos
         return pos / self.scale_factor
 
@@ -90,29 +109,93 @@ class ZoomableLabel(QLabel):
         super().paintEvent(event)
 
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+        # 只绘制需要重绘的区域（滚动区域中即可见部分），不生成整张缩放后的图片
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, not self._fast_transform)
+        if self.preview_rotation:
+            painter.save()
+            transform = self._preview_transform()
+            painter.setTransform(transform)
+            self._pyramid.paint(painter, self.scale_factor,
+                                transform.inverted()[0].mapRect(QRectF(event.rect())).toAlignedRect())
+            painter.restore()
+        else:
+            self._pyramid.paint(painter, self.scale_factor, event.rect())
+
         painter.scale(self.scale_factor, self.scale_factor)
+        self._paint_overlays(painter, event.rect())
+
+        painter.setRenderHint(QPainter.Antialiasing)
 
         self._paint_work_areas(painter)
         self._paint_sample_rects(painter)
         self.current_state.paint(painter)
 
-    def set_pixmap(self, pixmap):
-        self.original_pixmap = pixmap
+    def set_image(self, cv_img, source_scale=1.0):
+        # 显示一张 OpenCV 图像（灰度或BGR）。图像被复制一次到金字塔第0层的缓冲中，
+        # 尺寸不变时复用已有的缓冲；之后的缩放都从金字塔中选取最接近的一层。
+        # source_scale < 1 表示图像是原图的缩小版本，按原图尺寸显示。
+        if cv_img is None:
+            self._pyramid.clear()
+        else:
+            self._pyramid.set_image(cv_img, source_scale)
+        self.preview_rotation = 0.0
         self.scale_factor = 1.0
         self.update_scaled_pixmap()
 
+    def set_pyramid(self, pyramid):
+        # 直接显示一个已建好的金字塔（例如对比窗口中多个视图共享同一张图），缩放比例不变
+        self._pyramid = pyramid if pyramid is not None else ImagePyramid()
+        self.preview_rotation = 0.0
+        self.set_overlays(None)
+        self.update_scaled_pixmap()
+
+    def set_preview_rotation(self, angle):
+        # 以控件中心为轴旋转显示的图像，用于调整角度时的实时预览
+        self.preview_rotation = angle
+        self.notify_view_changing()
+        self.update()
+
+    def _preview_transform(self):
+        center = QRectF(self.rect()).center()
+        transform = QTransform()
+        transform.translate(center.x(), center.y())
+        transform.rotate(-self.preview_rotation)  # rotate_image 的正角度为逆时针
+        transform.translate(-center.x(), -center.y())
+        return transform
+
+    def set_overlays(self, overlays):
+        self.overlays = overlays or ()
+        self._overlay_polygons = {}
+        self.update()
+
+    @property
+    def pyramid(self):
+        return self._pyramid
+
+    def has_image(self):
+        return not self._pyramid.is_null()
+
+    def image_rect(self):
+        return QRect(0, 0, self._pyramid.width, self._pyramid.height)
+
     def update_scaled_pixmap(self):
-        if self.original_pixmap is None or self.original_pixmap.isNull():
-            super().setPixmap(QPixmap())  # 传递一个空的QPixmap来清空标签
+        # 缩放比例改变后调整控件大小（供滚动区域计算滚动范围），图片本身在 paintEvent 中按可见区域绘制
+        if self._pyramid.is_null():
+            self.update()  # 清空显示
             return
-        scaled_pixmap = self.original_pixmap.scaled(
-            self.original_pixmap.size() * self.scale_factor,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation,
-        )
-        super().setPixmap(scaled_pixmap)
-        self.resize(scaled_pixmap.size())
+        self.resize(QSize(max(1, round(self._pyramid.width * self.scale_factor)),
+                          max(1, round(self._pyramid.height * self.scale_factor))))
+        self.notify_view_changing()
+        self.update()
+
+    def notify_view_changing(self):
+        # 缩放或平移正在进行：先用快速插值绘制，停止一段时间后再平滑重绘
+        self._fast_transform = True
+        self._smooth_timer.start()
+
+    def _on_interaction_idle(self):
+        self._fast_transform = False
+        self.update()
 
     def _get_handle_rects(self, area_index):
         if not (0 <= area_index < len(self.work_areas)):
@@ -197,7 +280,7 @@ class ZoomableLabel(QLabel):
 
         # 绘制蒙版
         if self.draw_overlay:
-            full_rect = self.original_pixmap.rect()
+            full_rect = self.image_rect()
             painter.setPen(Qt.NoPen)
             painter.setBrush(QColor(255, 0, 0, 80)) # 半透明红色
 
@@ -225,6 +308,31 @@ class ZoomableLabel(QLabel):
             painter.setBrush(Qt.NoBrush)
             painter.drawRect(rect)
 
+    def _paint_overlays(self, painter, exposed):
+        # 只绘制外接矩形与重绘区域相交的轮廓
+        if not self.overlays:
+            return
+        left, top = exposed.left() / self.scale_factor, exposed.top() / self.scale_factor
+        right, bottom = (exposed.right() + 1) / self.scale_factor, (exposed.bottom() + 1) / self.scale_factor
+
+        painter.save()
+        painter.translate(0.5, 0.5)  # 轮廓点是像素坐标，线画在像素中心
+        painter.setBrush(Qt.NoBrush)
+        for layer_index, layer in enumerate(self.overlays):
+            b = layer.bounds
+            visible = np.flatnonzero((b[:, 0] <= right) & (b[:, 0] + b[:, 2] >= left) &
+                                     (b[:, 1] <= bottom) & (b[:, 1] + b[:, 3] >= top))
+            if not len(visible):
+                continue
+            painter.setPen(QPen(QColor(*layer.color), max(layer.width, 1 / self.scale_factor)))
+            for i in visible:
+                polygon = self._overlay_polygons.get((layer_index, i))
+                if polygon is None:
+                    polygon = QPolygon(layer.polylines[i].ravel().tolist())
+                    self._overlay_polygons[(layer_index, i)] = polygon
+                painter.drawPolygon(polygon)
+        painter.restore()
+
     def _paint_sample_rects(self, painter):
         # 绘制标准字和最小符号的采样框
         pen = QPen(QColor(0, 255, 0), max(1, 2 / self.scale_factor), Qt.DashLine)